@@ -47,13 +47,16 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'main.middleware.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'main.middleware.PrincipalMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'main.middleware.AnonymousPageCacheMiddleware',
 ]
 
 ROOT_URLCONF = 'car_rental.urls'
@@ -195,5 +198,111 @@ LOGGING = {
             'level': 'DEBUG',
             'propagate': True,
         },
+        'main.performance': {
+            'handlers': ['file'],
+            'level': 'INFO',
+            'propagate': False,
+        },
     },
 }
+
+# Statistics charts
+CHART_ROOT = os.path.join(MEDIA_ROOT, 'charts')
+CHART_URL = MEDIA_URL + 'charts/'
+CHART_RENDER_WORKERS = 2
+CHART_MAX_FILES = 200  # least recently used charts beyond this are deleted
+
+# External content on the home page
+EXTERNAL_CONTENT_URLS = {
+    'cat_fact': 'https://catfact.ninja/fact',
+    'programming_joke': 'https://official-joke-api.appspot.com/jokes/programming/random',
+}
+EXTERNAL_CONTENT_TIMEOUT = (2, 3)  # connect, read (seconds)
+EXTERNAL_CONTENT_STALE_TTL = 60 * 60 * 24 * 7
+EXTERNAL_CONTENT_FAILURE_THRESHOLD = 3
+EXTERNAL_CONTENT_RESET_TIMEOUT = 60
+
+# Startup performance (manage.py startup_budget)
+STARTUP_IMPORT_BUDGET_MS = 1500
+STARTUP_IMPORT_MODULES = ['car_rental.urls', 'main.views', 'main.forms', 'main.admin']
+STARTUP_FORBIDDEN_IMPORTS = ['matplotlib', 'matplotlib.pyplot', 'requests', 'pytz']
+
+# Benchmarks (manage.py run_benchmarks)
+BENCHMARK_BASELINE = os.path.join(BASE_DIR, 'benchmarks', 'baseline.json')
+BENCHMARK_TOLERANCE = 0.2  # allowed slowdown of the median before it counts as a regression
+BENCHMARK_NOISE_FLOOR_MS = 0.5
+
+# Car catalog facets
+FACET_INDEX_TTL = 60 * 60
+
+# Keyset pagination: lifetime of cached approximate list totals
+KEYSET_COUNT_TTL = 60 * 5
+
+# Data export (employee/export/<kind>/, manage.py export_data)
+EXPORT_CHUNK_SIZE = 2000
+
+# Bulk import (manage.py import_data)
+IMPORT_CHUNK_SIZE = 1000
+
+# Image derivatives (main/images.py, manage.py generate_image_derivatives)
+IMAGE_DERIVATIVE_ROOT = os.path.join(MEDIA_ROOT, 'derivatives')
+IMAGE_DERIVATIVE_URL = MEDIA_URL + 'derivatives/'
+IMAGE_DERIVATIVE_WIDTHS = (320, 640, 1280)
+IMAGE_DERIVATIVE_FORMATS = ('webp', 'jpeg')
+IMAGE_DERIVATIVE_QUALITY = 80
+IMAGE_DERIVATIVE_WORKERS = 2
+
+# Content-addressed media storage (main/storage.py, manage.py dedupe_media)
+STORAGES = {
+    'default': {'BACKEND': 'main.storage.ContentAddressedStorage'},
+    # collectstatic пишет рядом .gz/.br варианты (main/fileserving.py)
+    'staticfiles': {'BACKEND': 'main.storage.CompressedStaticFilesStorage'},
+}
+MEDIA_CONTENT_DIR = 'content'
+MEDIA_CONTENT_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# Media and static file serving (main/fileserving.py)
+# None: файлы отдаёт Django; 'x-accel-redirect' (nginx) или 'x-sendfile' (Apache, lighttpd)
+FILE_SERVING_SENDFILE = None
+# internal-локации nginx, соответствующие MEDIA_ROOT и STATIC_ROOT
+FILE_SERVING_ACCEL_LOCATIONS = {'media': '/protected/media/', 'static': '/protected/static/'}
+FILE_SERVING_CACHE_CONTROL = 'public, max-age=3600'
+FILE_SERVING_COMPRESS_MIN_SIZE = 256  # bytes; smaller files are not precompressed
+
+# Cache: per-process LRU (L1) in front of a file-based cache shared by all workers (L2)
+CACHE_DIR = os.environ.get('CACHE_DIR', os.path.join(BASE_DIR, '.cache'))
+CACHES = {
+    'default': {
+        'BACKEND': 'main.tiered_cache.TieredCache',
+        'LOCATION': 'default',
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'L2': {
+                'BACKEND': 'main.tiered_cache.FileCache',
+                'LOCATION': CACHE_DIR,
+                'OPTIONS': {'MAX_ENTRIES': 10000, 'CULL_EVERY': 100},
+            },
+            'L1_MAX_ENTRIES': 1000,
+            'L1_TIMEOUT': 5,  # bound on how long a worker may miss another worker's write
+            'LOCK_TIMEOUT': 30,
+            'STALE_TIMEOUT': 60,
+        },
+    },
+}
+
+# Template fragment cache (main/fragments.py): fragments are invalidated by model signals,
+# the timeout only bounds how long unused versions stay in the cache
+FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Full-page cache for anonymous visitors (main/pagecache.py): URL name -> models shown on the page
+PAGE_CACHE_VIEWS = {
+    'main:home': ['main.Article'],
+    'main:news': ['main.Article'],
+    'main:faq': ['main.FAQ'],
+    'main:promos': ['main.Promo'],
+    'main:car_list': ['main.Car', 'main.CarModel', 'main.CarType', 'main.Rental'],
+    'main:car_detail': ['main.Car', 'main.CarModel', 'main.CarType'],
+}
+PAGE_CACHE_TIMEOUT = 60 * 5
+# Сколько хранится последняя удачная версия страницы на случай ошибки при рендеринге
+PAGE_CACHE_STALE_TIMEOUT = 60 * 60 * 24
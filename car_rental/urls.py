@@ -14,13 +14,18 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+import re
+
 from django.contrib import admin
 from django.urls import re_path, include
 from django.conf import settings
-from django.conf.urls.static import static
+from main.views import media_file, static_file
 
 urlpatterns = [
     re_path(r'^admin/', admin.site.urls),
     re_path(r'^', include('main.urls')),
     re_path(r'^api-auth/', include('rest_framework.urls')),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    # Range, ETag и X-Accel-Redirect: см. main/fileserving.py
+    re_path(rf'^{re.escape(settings.MEDIA_URL.lstrip("/"))}(?P<path>.+)$', media_file),
+    re_path(rf'^{re.escape(settings.STATIC_URL.lstrip("/"))}(?P<path>.+)$', static_file),
+]
@@ -1,8 +1,8 @@
 from django.contrib import admin
 from .models import (
     CarType, CarModel, Car, CarPark, Client, Discount, Penalty,
-    Rental, Article, CompanyInfo, FAQ, Employee, JobVacancy,
-    Review, Promo
+    Rental, RentalSlot, Invoice, InvoiceLine, Article, CompanyInfo, FAQ, Employee, JobVacancy,
+    Review, Promo, StoredFile
 )
 
 @admin.register(CarType)
@@ -50,6 +50,30 @@ class RentalAdmin(admin.ModelAdmin):
     list_filter = ['status']
     search_fields = ['client__user__username', 'car__license_plate']
 
+@admin.register(RentalSlot)
+class RentalSlotAdmin(admin.ModelAdmin):
+    list_display = ('car', 'day', 'rental')
+    list_filter = ('day',)
+    search_fields = ('car__license_plate',)
+
+class InvoiceLineInline(admin.TabularInline):
+    model = InvoiceLine
+    extra = 0
+    readonly_fields = ('kind', 'description', 'amount', 'penalty')
+    can_delete = False
+
+@admin.register(Invoice)
+class InvoiceAdmin(admin.ModelAdmin):
+    list_display = ('rental', 'base_amount', 'discount_amount', 'penalty_amount', 'total_amount', 'updated_at')
+    readonly_fields = ('rental', 'promo_code', 'base_amount', 'discount_amount', 'penalty_amount', 'total_amount')
+    inlines = [InvoiceLineInline]
+
+@admin.register(StoredFile)
+class StoredFileAdmin(admin.ModelAdmin):
+    list_display = ('name', 'size', 'ref_count', 'created_at')
+    readonly_fields = ('name', 'size', 'ref_count', 'created_at')
+    search_fields = ('name',)
+
 @admin.register(Article)
 class ArticleAdmin(admin.ModelAdmin):
     list_display = ('title', 'created_at', 'updated_at')
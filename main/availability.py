@@ -0,0 +1,59 @@
+"""Rental availability helpers shared by booking, search and rollups.
+
+A rental holds a car on the local days ``[first, last)`` of
+``rental_day_span``.  Whether a car is free is answered by the database:
+availability search excludes the cars returned by ``busy_car_ids``, and a
+booking is protected by the ``RentalSlot`` ledger (``main.booking``), whose
+unique ``(car, day)`` constraint rejects a second booking of the same day.
+"""
+from datetime import datetime, timedelta
+
+from django.utils import timezone
+
+from .models import Rental
+
+
+def to_local_date(value):
+    if isinstance(value, datetime):
+        if timezone.is_aware(value):
+            value = timezone.localtime(value)
+        return value.date()
+    return value
+
+
+def as_datetime(value):
+    """``value`` itself, or local midnight of a date, for ``DateTimeField`` lookups."""
+    if isinstance(value, datetime):
+        return value
+    return timezone.make_aware(datetime.combine(value, datetime.min.time()))
+
+
+def rental_day_span(start, end):
+    """Return the ``[first, last)`` range of days held between start and end.
+
+    A rental that ends exactly at midnight does not hold that day, which
+    matches the ``start_date__lt`` / ``expected_return_date__gt`` overlap
+    query used by ``RentalForm``.
+    """
+    first = to_local_date(start)
+    last = to_local_date(end)
+    if isinstance(end, datetime):
+        local_end = timezone.localtime(end) if timezone.is_aware(end) else end
+        if local_end.time() != datetime.min.time():
+            last += timedelta(days=1)
+    return first, last
+
+
+def busy_car_ids(start, end):
+    """``car_id`` subquery of the cars held by an active rental between start and end.
+
+    A subquery rather than a list of ids: in ``exclude(pk__in=...)`` a list
+    becomes one bound parameter per busy car, which at fleet size exceeds
+    SQLite's limit on query variables.  The query is a range scan on the
+    ``(status, start_date)`` index.
+    """
+    return Rental.objects.filter(
+        status='active',
+        start_date__lt=as_datetime(end),
+        expected_return_date__gt=as_datetime(start),
+    ).values('car_id')
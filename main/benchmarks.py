@@ -0,0 +1,239 @@
+"""Benchmarks for the hot paths of the site.
+
+Each benchmark runs against a dataset produced by ``datagen`` at one of the
+``SCALES`` and reports latency percentiles and the number of SQL queries per
+iteration.  ``compare`` checks a run against a stored baseline; the
+``run_benchmarks`` management command ties it together.
+"""
+import tempfile
+import time
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client as TestClient, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from . import datagen
+from .forms import RentalForm
+from .models import Car, CarType, Penalty, Rental
+
+SCALES = {
+    'small': {'cars': 50, 'clients': 200, 'rentals': 2000},
+    'medium': {'cars': 500, 'clients': 5000, 'rentals': 50000},
+    'large': {'cars': 5000, 'clients': 100000, 'rentals': 1000000},
+}
+
+BENCHMARKS = {}
+
+
+def register(cls):
+    BENCHMARKS[cls.name] = cls
+    return cls
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * q // 100))
+    return ordered[int(rank) - 1]
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Benchmark:
+    """One measured operation; ``before`` runs untimed ahead of each ``run``."""
+    name = None
+
+    def __init__(self, staff_client, client):
+        self.staff_client = staff_client
+        self.client = client
+        self.setup()
+
+    def setup(self):
+        pass
+
+    def before(self, i):
+        pass
+
+    def run(self, i):
+        raise NotImplementedError
+
+    def get(self, client, url, data=None):
+        response = client.get(url, data)
+        if response.status_code != 200:
+            raise AssertionError(f'{self.name}: GET {url} returned {response.status_code}')
+        return response
+
+
+@register
+class CarListBenchmark(Benchmark):
+    name = 'car_list'
+    sorts = ['price_asc', 'price_desc', '']
+
+    def setup(self):
+        self.type_ids = [None] + list(CarType.objects.values_list('pk', flat=True))
+
+    def run(self, i):
+        data = {'sort': self.sorts[i % len(self.sorts)]}
+        car_type = self.type_ids[i % len(self.type_ids)]
+        if car_type:
+            data['type'] = car_type
+        self.get(self.client, reverse('main:car_list'), data)
+
+
+@register
+class RentalFormCleanBenchmark(Benchmark):
+    name = 'rental_form_clean'
+
+    def setup(self):
+        self.car_ids = list(Car.objects.order_by('pk').values_list('pk', flat=True)[:100])
+
+    def run(self, i):
+        start = timezone.localdate() + timedelta(days=i % 20)
+        form = RentalForm(data={
+            'car': self.car_ids[i % len(self.car_ids)],
+            'start_date': start,
+            'end_date': start + timedelta(days=3),
+            'days': 4,
+        })
+        form.is_valid()
+
+
+@register
+class CalculateFinalAmountBenchmark(Benchmark):
+    name = 'calculate_final_amount'
+
+    def setup(self):
+        rentals = Rental.objects.filter(promo_code__isnull=False, penalties__isnull=False)
+        self.rental_ids = list(rentals.order_by('pk').values_list('pk', flat=True).distinct()[:50])
+        if not self.rental_ids:
+            self.rental_ids = list(Rental.objects.order_by('pk').values_list('pk', flat=True)[:50])
+
+    def before(self, i):
+        self.rental = Rental.objects.get(pk=self.rental_ids[i % len(self.rental_ids)])
+
+    def run(self, i):
+        self.rental.calculate_final_amount()
+
+
+@register
+class StatisticsBenchmark(Benchmark):
+    name = 'statistics'
+
+    def run(self, i):
+        self.get(self.staff_client, reverse('main:statistics'))
+
+
+@register
+class EmployeeClientSearchBenchmark(Benchmark):
+    name = 'employee_client_search'
+    terms = ['Ivan', 'petrova', '29', 'Sokol', '']
+
+    def run(self, i):
+        self.get(self.staff_client, reverse('main:employee_clients'), {'search': self.terms[i % len(self.terms)]})
+
+
+@register
+class CompleteRentalBenchmark(Benchmark):
+    name = 'complete_rental'
+
+    def setup(self):
+        self.rental_ids = list(Rental.objects.filter(status='active').order_by('pk').values_list('pk', flat=True))
+        self.penalty_id = Penalty.objects.values_list('pk', flat=True).first()
+
+    def before(self, i):
+        # Одни и те же аренды завершаются по кругу, поэтому возвращаем их в активное состояние
+        self.rental_id = self.rental_ids[i % len(self.rental_ids)]
+        rental = Rental.objects.get(pk=self.rental_id)
+        rental.penalties.clear()
+        Rental.objects.filter(pk=self.rental_id).update(status='active', actual_return_date=None)
+
+    def run(self, i):
+        response = self.staff_client.post(
+            reverse('main:complete_rental', kwargs={'pk': self.rental_id}),
+            {'penalties': [self.penalty_id] if i % 2 and self.penalty_id else [], 'notes': ''},
+        )
+        if response.status_code != 302:
+            raise AssertionError(f'{self.name}: POST returned {response.status_code}')
+
+
+def measure(benchmark, iterations, warmup):
+    timings, queries = [], []
+    for i in range(warmup + iterations):
+        benchmark.before(i)
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            started = time.perf_counter()
+            benchmark.run(i)
+            elapsed = time.perf_counter() - started
+        if i >= warmup:
+            timings.append(elapsed * 1000)
+            queries.append(counter.count)
+    return {
+        'p50_ms': round(percentile(timings, 50), 3),
+        'p95_ms': round(percentile(timings, 95), 3),
+        'p99_ms': round(percentile(timings, 99), 3),
+        'mean_ms': round(sum(timings) / len(timings), 3),
+        'queries': max(queries),
+    }
+
+
+def seed(sizes, seed=42, workers=1):
+    call_command('flush', interactive=False, verbosity=0)
+    cache.clear()
+    datagen.DatasetGenerator(seed=seed, workers=workers).generate(**sizes)
+    call_command('backfill_rollups', workers=workers, stdout=StringIO())
+
+
+def run_all(names=None, iterations=30, warmup=3, log=None):
+    """Run the selected benchmarks against the dataset currently in the database."""
+    log = log or (lambda message: None)
+    staff = User.objects.create_user(username='benchmark_staff', password='benchmark', is_staff=True)
+    staff_client = TestClient()
+    staff_client.force_login(staff)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as chart_root, \
+            override_settings(CHART_ROOT=chart_root, CHART_RENDER_WORKERS=0):
+        for name in names or BENCHMARKS:
+            benchmark = BENCHMARKS[name](staff_client, TestClient())
+            results[name] = measure(benchmark, iterations, warmup)
+            log(f'{name}: {results[name]}')
+    return results
+
+
+def compare(results, baseline, tolerance, noise_floor_ms=0.0):
+    """Return regression messages for cases present in both runs.
+
+    A case regresses when its median is more than ``tolerance`` slower than
+    the baseline (ignoring differences below ``noise_floor_ms``) or when it
+    issues more queries.
+    """
+    regressions = []
+    for scale, cases in results.items():
+        for name, current in cases.items():
+            previous = baseline.get(scale, {}).get(name)
+            if previous is None:
+                continue
+            limit = max(previous['p50_ms'] * (1 + tolerance), previous['p50_ms'] + noise_floor_ms)
+            if current['p50_ms'] > limit:
+                regressions.append(
+                    f'{scale}/{name}: p50 {current["p50_ms"]:.2f} ms vs baseline {previous["p50_ms"]:.2f} ms'
+                )
+            if current['queries'] > previous['queries']:
+                regressions.append(
+                    f'{scale}/{name}: {current["queries"]} queries vs baseline {previous["queries"]}'
+                )
+    return regressions
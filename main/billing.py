@@ -0,0 +1,128 @@
+"""Billing engine: one persisted invoice per rental.
+
+The invoice is computed once from the rental's base amount, promo code and
+penalties and stored with its line items and denormalized totals.  It is
+recomputed only when those inputs change (a new rental, a changed base
+amount or promo code, or ``m2m_changed`` on penalties, see signals.py);
+everything else reads the snapshot.  ``Rental.final_amount`` always mirrors
+``Invoice.total_amount``.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+
+from .models import Invoice, InvoiceLine, Rental
+
+CENT = Decimal('0.01')
+
+
+def to_money(value):
+    return Decimal(str(value or 0)).quantize(CENT)
+
+
+def discount_amount(base_amount, promo):
+    if promo is None:
+        return Decimal('0.00')
+    return (to_money(base_amount) * Decimal(promo.discount_percent) / 100).quantize(CENT)
+
+
+def compute_lines(rental, penalties=None):
+    base_amount = to_money(rental.base_amount)
+    lines = [InvoiceLine(kind='base', description=f'Аренда на {rental.days} дн.', amount=base_amount)]
+    promo = rental.promo_code
+    if promo is not None:
+        lines.append(InvoiceLine(
+            kind='discount',
+            description=f'Промокод {promo.code} (-{promo.discount_percent}%)',
+            amount=-discount_amount(base_amount, promo),
+        ))
+    if penalties is None:
+        penalties = rental.penalties.all() if rental.pk else []
+    for penalty in penalties:
+        lines.append(InvoiceLine(
+            kind='penalty', description=penalty.name, amount=to_money(penalty.amount), penalty=penalty,
+        ))
+    return lines
+
+
+def totals(lines):
+    def total(kind):
+        return sum((line.amount for line in lines if line.kind == kind), Decimal('0.00'))
+
+    base_amount, penalty_amount = total('base'), total('penalty')
+    discount = -total('discount')
+    return {
+        'base_amount': base_amount,
+        'discount_amount': discount,
+        'penalty_amount': penalty_amount,
+        'total_amount': base_amount - discount + penalty_amount,
+    }
+
+
+def cached_invoice(rental):
+    """Invoice already loaded with the rental (``select_related`` or a refresh), if any."""
+    return Rental.invoice.related.get_cached_value(rental, default=None)
+
+
+@transaction.atomic
+def refresh_invoice(rental):
+    """Recompute and store the rental's invoice; returns the saved invoice."""
+    lines = compute_lines(rental)
+    fields = {'promo_code_id': rental.promo_code_id, **totals(lines)}
+    invoice = cached_invoice(rental)
+    if invoice is not None:
+        for name, value in fields.items():
+            setattr(invoice, name, value)
+        invoice.save()
+    else:
+        invoice, _ = Invoice.objects.update_or_create(rental=rental, defaults=fields)
+    invoice.lines.all().delete()
+    for line in lines:
+        line.invoice = invoice
+    InvoiceLine.objects.bulk_create(lines)
+
+    rental.invoice = invoice
+    if rental.final_amount is None or to_money(rental.final_amount) != invoice.total_amount:
+        rental.final_amount = invoice.total_amount
+        rental.save(update_fields=['final_amount'])
+    return invoice
+
+
+def get_invoice(rental):
+    """Stored invoice of the rental, created on first access for older rentals."""
+    if rental.pk is None:
+        return Invoice(rental=rental, promo_code=rental.promo_code, **totals(compute_lines(rental)))
+    try:
+        return rental.invoice
+    except Invoice.DoesNotExist:
+        return refresh_invoice(rental)
+
+
+def refresh_if_stale(rental):
+    invoice = cached_invoice(rental)
+    if invoice is not None:
+        snapshot = (invoice.base_amount, invoice.promo_code_id)
+    else:
+        snapshot = Invoice.objects.filter(rental=rental).values_list('base_amount', 'promo_code_id').first()
+    if snapshot != (to_money(rental.base_amount), rental.promo_code_id):
+        refresh_invoice(rental)
+
+
+def bulk_create_invoices(rentals):
+    """Invoices for rentals just inserted with ``bulk_create`` (no penalties yet)."""
+    invoices, all_lines = [], []
+    for rental in rentals:
+        lines = compute_lines(rental, penalties=[])
+        invoices.append(Invoice(rental=rental, promo_code=rental.promo_code, **totals(lines)))
+        all_lines.append(lines)
+    Invoice.objects.bulk_create(invoices)
+    for invoice, lines in zip(invoices, all_lines):
+        for line in lines:
+            line.invoice = invoice
+    InvoiceLine.objects.bulk_create([line for lines in all_lines for line in lines])
+    return invoices
+
+
+def refresh_invoices(rental_ids):
+    for rental in Rental.objects.filter(pk__in=rental_ids).select_related('promo_code'):
+        refresh_invoice(rental)
@@ -0,0 +1,77 @@
+"""Reservation ledger: one ``RentalSlot`` row per (car, day).
+
+The unique constraint on ``(car, day)`` makes the database reject a second
+booking of the same car for the same day, so two concurrent requests that
+both pass ``RentalForm.clean`` cannot both commit.
+"""
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+
+from .availability import rental_day_span, to_local_date
+from .models import RentalSlot
+
+
+class BookingConflict(Exception):
+    pass
+
+
+def slot_days(rental):
+    day, last = rental_day_span(rental.start_date, rental.expected_return_date)
+    while day < last:
+        yield day
+        day += timedelta(days=1)
+
+
+def book_rental(rental):
+    """Save an active rental and reserve its slots in the same transaction.
+
+    Raises ``BookingConflict`` and leaves nothing saved if any of the days is
+    already held by another rental of the same car.
+    """
+    try:
+        with transaction.atomic():
+            rental.save()
+            try:
+                with transaction.atomic():
+                    RentalSlot.objects.bulk_create([
+                        RentalSlot(car_id=rental.car_id, rental=rental, day=day)
+                        for day in slot_days(rental)
+                    ])
+            except IntegrityError:
+                raise BookingConflict(f'Car {rental.car_id} is already booked for the selected dates.')
+    except BookingConflict:
+        rental.pk = None
+        rental._state.adding = True
+        raise
+
+
+def reserve_slots(rental):
+    """Reserve the days of a rental that is active again (e.g. a status reverted by staff).
+
+    Days the rental still holds are kept.  Raises ``BookingConflict`` if any
+    other day is held by another rental of the same car; call it inside the
+    transaction that saves the rental so the change is rolled back with it.
+    """
+    held = set(RentalSlot.objects.filter(rental=rental).values_list('day', flat=True))
+    try:
+        with transaction.atomic():
+            RentalSlot.objects.bulk_create([
+                RentalSlot(car_id=rental.car_id, rental=rental, day=day)
+                for day in slot_days(rental) if day not in held
+            ])
+    except IntegrityError:
+        raise BookingConflict(f'Car {rental.car_id} is already booked for the selected dates.')
+
+
+def release_slots(rental, from_date=None):
+    """Free the slots a finished rental no longer uses.
+
+    Days before ``from_date`` (the actual return by default) stay in the
+    ledger as history; everything from that day on becomes bookable again.
+    """
+    from_date = to_local_date(from_date or rental.actual_return_date)
+    slots = RentalSlot.objects.filter(rental=rental)
+    if from_date:
+        slots = slots.filter(day__gte=from_date)
+    return slots.delete()[0]
@@ -0,0 +1,185 @@
+"""Statistics chart rendering.
+
+Charts are keyed by a hash of their kind and input data and stored as PNG
+files under ``CHART_ROOT``.  A chart is rendered once, in a process pool so
+matplotlib never runs in the request thread, and served by URL afterwards.
+The request that finds a chart missing does not wait for it: the page goes
+out without the chart and a later request serves the file.  After each
+render the oldest files beyond ``CHART_MAX_FILES`` are deleted, since every
+change of the statistics produces a new file name.  The renderers use the
+object-oriented ``Figure`` API instead of pyplot, so they hold no global
+state even when rendered in-process.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+
+from django.conf import settings
+
+from . import instrumentation
+
+logger = logging.getLogger(__name__)
+
+# Увеличить при изменении внешнего вида графиков, чтобы сбросить кеш файлов
+CHART_STYLE_VERSION = 1
+
+_pool = None
+_pending = {}
+_lock = threading.Lock()
+
+
+def _save(fig, path):
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    fig.savefig(tmp_path, format='png', dpi=100, bbox_inches='tight')
+    os.replace(tmp_path, path)
+
+
+def render_car_type_chart(data, path):
+    """Bar chart for car type popularity."""
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(10, 6))
+    ax = fig.subplots()
+    names, counts = data['names'], data['counts']
+
+    bars = ax.bar(names, counts, color='#3498db', alpha=0.7, edgecolor='#2980b9', linewidth=1)
+    ax.set_title('Car Type Popularity', fontsize=16, fontweight='bold', pad=20)
+    ax.set_xlabel('Car Types', fontsize=12)
+    ax.set_ylabel('Number of Rentals', fontsize=12)
+    ax.tick_params(axis='x', labelrotation=45)
+    for label in ax.get_xticklabels():
+        label.set_horizontalalignment('right')
+    ax.grid(axis='y', alpha=0.3)
+
+    # Add value labels on bars
+    for bar, count in zip(bars, counts):
+        ax.text(bar.get_x() + bar.get_width()/2, bar.get_height() + 0.1,
+                str(count), ha='center', va='bottom', fontweight='bold')
+
+    fig.tight_layout()
+    _save(fig, path)
+
+
+def render_availability_chart(data, path):
+    """Pie chart for car availability."""
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(8, 8))
+    ax = fig.subplots()
+    sizes = [data['available'], data['rented']]
+
+    wedges, texts, autotexts = ax.pie(sizes, labels=['Available', 'Rented'], colors=['#2ecc71', '#e74c3c'],
+                                      autopct='%1.1f%%', startangle=90, textprops={'fontsize': 12})
+    for autotext in autotexts:
+        autotext.set_color('white')
+        autotext.set_fontweight('bold')
+        autotext.set_fontsize(14)
+
+    ax.set_title('Car Availability', fontsize=16, fontweight='bold', pad=20)
+    ax.axis('equal')
+    _save(fig, path)
+
+
+RENDERERS = {
+    'car_types': render_car_type_chart,
+    'availability': render_availability_chart,
+}
+
+
+def chart_name(kind, data):
+    payload = json.dumps([CHART_STYLE_VERSION, kind, data], sort_keys=True, default=str)
+    return f'{kind}-{hashlib.sha256(payload.encode()).hexdigest()[:32]}.png'
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        from concurrent.futures import ProcessPoolExecutor
+
+        _pool = ProcessPoolExecutor(max_workers=settings.CHART_RENDER_WORKERS)
+    return _pool
+
+
+def shutdown():
+    global _pool
+    with _lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
+
+
+def prune(max_files=None):
+    """Delete the least recently used chart files beyond ``max_files``."""
+    if max_files is None:
+        max_files = settings.CHART_MAX_FILES
+    try:
+        entries = [entry for entry in os.scandir(settings.CHART_ROOT) if entry.name.endswith('.png')]
+    except FileNotFoundError:
+        return 0
+    if len(entries) <= max_files:
+        return 0
+    entries.sort(key=lambda entry: entry.stat().st_mtime)
+    removed = 0
+    for entry in entries[:len(entries) - max_files]:
+        try:
+            os.remove(entry.path)
+            removed += 1
+        except FileNotFoundError:
+            pass  # удалил другой процесс
+    return removed
+
+
+def _finished(kind, path, future):
+    with _lock:
+        _pending.pop(path, None)
+    if future.exception() is not None:
+        logger.error('Failed to render %s chart', kind, exc_info=future.exception())
+        return
+    prune()
+
+
+def _render(kind, data, path):
+    """Start rendering ``path``; returns its future, or None once rendered in-process."""
+    with _lock:
+        future = _pending.get(path)
+        if future is not None:
+            return future
+        if settings.CHART_RENDER_WORKERS:
+            future = _pending[path] = _get_pool().submit(RENDERERS[kind], data, path)
+    if future is None:
+        # Без пула (CHART_RENDER_WORKERS = 0) график рисуется сразу
+        RENDERERS[kind](data, path)
+        prune()
+        return None
+    # Вне блокировки: у уже завершённой задачи колбэк вызывается сразу
+    future.add_done_callback(lambda future: _finished(kind, path, future))
+    return future
+
+
+def chart_url(kind, data):
+    """Return the URL of the chart for ``data``, or None while it is being rendered.
+
+    A missing chart is rendered in the background and the call returns
+    without waiting, so the page is sent without the chart.  Rendering
+    errors are logged and also give None.
+    """
+    name = chart_name(kind, data)
+    path = os.path.join(settings.CHART_ROOT, name)
+    try:
+        # Время изменения служит отметкой использования для prune
+        os.utime(path)
+        exists = True
+    except FileNotFoundError:
+        exists = False
+    instrumentation.record_cache(exists)
+    if exists:
+        return f'{settings.CHART_URL}{name}'
+    os.makedirs(settings.CHART_ROOT, exist_ok=True)
+    try:
+        future = _render(kind, data, path)
+    except Exception:
+        logger.exception('Failed to render %s chart', kind)
+        return None
+    return None if future is not None else f'{settings.CHART_URL}{name}'
@@ -0,0 +1,119 @@
+"""Conditional GET for article, car, promotion and review pages.
+
+``ConditionalGetMixin`` validates a page before the view does any work.
+The view reports when the data it shows last changed: ``updated_at`` of a
+row (one indexed lookup) or the latest ``updated_at`` of its tables (an
+index seek per table, usually answered from the cache, see
+``cached_latest_update``).  The mixin answers ``If-None-Match`` and
+``If-Modified-Since`` with 304 when nothing changed, so revalidating
+browsers and crawlers cost no rendering.
+
+``Last-Modified`` cannot see deleted rows and bulk writes that bypass
+``save()``.  The ``ETag`` therefore also includes the fragment version
+tokens of the page's models (``main.fragments``), which the model signals
+replace on every save and delete, and the viewer's role, because staff and
+signed-in users see controls and promotions anonymous visitors do not.
+"""
+from django.conf import settings
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.cache import cache
+from django.db.models import Max, Q, Subquery
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+from . import fragments
+
+
+def latest(*timestamps):
+    """Latest of ``timestamps`` ignoring ``None``; ``None`` if there are none."""
+    timestamps = [timestamp for timestamp in timestamps if timestamp is not None]
+    return max(timestamps) if timestamps else None
+
+
+def latest_update(model, *related):
+    """Latest ``updated_at`` of the tables of ``model`` and ``related``, in one query.
+
+    Each table is read with ``ORDER BY updated_at DESC LIMIT 1``, a seek on
+    its index; ``None`` when ``model`` has no rows.
+    """
+    latest_rows = {
+        f'{other._meta.model_name}_updated_at': Subquery(other.objects.order_by('-updated_at').values('updated_at')[:1])
+        for other in related
+    }
+    row = model.objects.order_by('-updated_at').annotate(**latest_rows).values_list(
+        'updated_at', *latest_rows).first()
+    return latest(*row) if row else None
+
+
+def cached_latest_update(model, *related):
+    """``latest_update`` kept in the cache until one of the tables changes.
+
+    The key includes the fragment versions of the models, which the signals
+    replace on every save and delete, so list pages usually validate without
+    a query.
+    """
+    key = fragments.fragment_key('latest_update', [model._meta.label, *(other._meta.label for other in related)])
+    return cache.get_or_set(key, lambda: latest_update(model, *related), settings.FRAGMENT_CACHE_TIMEOUT)
+
+
+def promos_changed_at():
+    """When the list of active promotions last changed.
+
+    Promotions also start and end without being saved, so the latest
+    ``valid_from``/``valid_until`` already passed counts as a change.
+    """
+    from .models import Promo
+
+    now = timezone.now()
+    state = Promo.objects.aggregate(
+        updated=Max('updated_at'),
+        started=Max('valid_from', filter=Q(valid_from__lte=now)),
+        ended=Max('valid_until', filter=Q(valid_until__lte=now)),
+    )
+    return latest(*state.values())
+
+
+def viewer_role(user):
+    if not user.is_authenticated:
+        return 'anonymous'
+    return 'staff' if user.is_staff else 'user'
+
+
+class ConditionalGetMixin:
+    """Answer conditional GET requests with 304 before rendering.
+
+    Views set ``conditional_dependencies`` (model labels or instances, as in
+    ``{% cachefragment %}``) and implement ``get_last_modified``.
+    """
+    conditional_dependencies = ()
+
+    def get_conditional_dependencies(self):
+        return self.conditional_dependencies
+
+    def get_last_modified(self):
+        """Time of the latest change shown on the page, ``None`` to skip validation."""
+        return None
+
+    def get(self, request, *args, **kwargs):
+        # Одноразовое сообщение не должно потеряться в ответе 304
+        if CookieStorage.cookie_name in request.COOKIES:
+            return super().get(request, *args, **kwargs)
+        last_modified = self.get_last_modified()
+        if last_modified is None:
+            return super().get(request, *args, **kwargs)
+        timestamp = int(last_modified.timestamp())
+        key = fragments.fragment_key(
+            'conditional', self.get_conditional_dependencies(),
+            [last_modified.isoformat(), viewer_role(request.user)],
+        )
+        etag = '"%s"' % key.rsplit(':', 1)[1]
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(timestamp)
+            # Страница зависит от роли пользователя, а роль определяется по cookie сессии
+            patch_vary_headers(response, ['Cookie'])
+        return response
@@ -0,0 +1,346 @@
+"""Synthetic data generator for performance work.
+
+Rows are generated in chunks, each from its own ``random.Random`` seeded
+with ``(seed, kind, chunk)``, so the output does not depend on how chunks are
+spread over worker processes.  Workers only build plain tuples; the parent
+process writes them with ``bulk_create`` (SQLite allows a single writer), so
+no model signals fire: invoices are written here alongside the rentals, and
+rollups must be rebuilt afterwards.  ``clear_synthetic_data`` deletes the same
+way, with plain ``DELETE`` statements instead of the signal-sending
+``delete()`` that loads every row.
+"""
+import multiprocessing
+import random
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import facets, fragments, rollups
+from .booking import slot_days
+from .models import (
+    Car, CarModel, CarPark, CarType, Client, Invoice, InvoiceLine, Penalty, Promo, Rental, RentalSlot, Review
+)
+
+USERNAME_PREFIX = 'synthetic_'
+PLATE_PREFIX = 'SX'
+RENTAL_SPAN_DAYS = 10
+
+CAR_TYPES = ['Sedan', 'SUV', 'Hatchback', 'Coupe', 'Minivan', 'Pickup']
+MANUFACTURERS = {
+    'Toyota': ['Camry', 'Corolla', 'RAV4', 'Land Cruiser'],
+    'BMW': ['320i', 'X5', 'M8', '530d'],
+    'Mercedes': ['C200', 'E300', 'G63', 'GLE'],
+    'Volkswagen': ['Golf', 'Passat', 'Tiguan', 'Polo'],
+    'Lada': ['Vesta', 'Granta', 'Niva'],
+    'Tesla': ['Model 3', 'Model Y', 'Model S'],
+    'Porsche': ['Cayenne', 'Macan', '911'],
+}
+FIRST_NAMES = ['Ivan', 'Anna', 'Pavel', 'Olga', 'Sergey', 'Maria', 'Dmitry', 'Elena', 'Alexey', 'Natalia']
+LAST_NAMES = ['Ivanov', 'Petrova', 'Sidorov', 'Kuznetsova', 'Smirnov', 'Popova', 'Volkov', 'Sokolova']
+OPERATORS = ['29', '33', '44', '25']
+PENALTIES = [
+    ('Late return', Decimal('50.00')),
+    ('Dirty interior', Decimal('30.00')),
+    ('Scratch', Decimal('120.00')),
+    ('Empty tank', Decimal('40.00')),
+    ('Traffic fine', Decimal('80.00')),
+]
+
+
+def chunk_rng(seed, kind, index):
+    return random.Random(f'{seed}:{kind}:{index}')
+
+
+def chunk_ranges(total, chunk_size):
+    return [(start, min(start + chunk_size, total)) for start in range(0, total, chunk_size)]
+
+
+def car_rows(seed, chunk, start, end, model_ids):
+    rng = chunk_rng(seed, 'car', chunk)
+    rows = []
+    for index in range(start, end):
+        value = rng.randint(8000, 150000)
+        rows.append((
+            f'{PLATE_PREFIX}{index:08d}',
+            rng.choice(model_ids),
+            rng.randint(2005, 2025),
+            value,
+            round(value / 400 + rng.randint(10, 40), 2),
+            rng.random() > 0.1,
+        ))
+    return rows
+
+
+def client_rows(seed, chunk, start, end, today):
+    rng = chunk_rng(seed, 'client', chunk)
+    rows = []
+    for index in range(start, end):
+        first_name, last_name = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        rows.append((
+            f'{USERNAME_PREFIX}{index:08d}',
+            first_name,
+            last_name,
+            f'{USERNAME_PREFIX}{index:08d}@example.com',
+            rng.randint(0, 5 * 365),
+            '+375 ({}) {:03d}-{:02d}-{:02d}'.format(
+                rng.choice(OPERATORS), rng.randint(0, 999), rng.randint(0, 99), rng.randint(0, 99)
+            ),
+            today - timedelta(days=rng.randint(18 * 365, 70 * 365)),
+            f'Minsk, street {rng.randint(1, 300)}, {rng.randint(1, 200)}',
+        ))
+    return rows
+
+
+def rental_rows(seed, chunk, start, end, params):
+    """Rental ``i`` goes to car ``i % cars``; each car's rentals follow one another."""
+    rng = chunk_rng(seed, 'rental', chunk)
+    car_ids, client_ids = params['car_ids'], params['client_ids']
+    rates, promos = params['rates'], params['promos']
+    penalty_ids = params['penalty_ids']
+    origin, today = params['origin'], params['today']
+    rows = []
+    for index in range(start, end):
+        car_position = index % len(car_ids)
+        slot = index // len(car_ids)
+        start_day = origin + timedelta(days=slot * RENTAL_SPAN_DAYS + rng.randint(0, 2))
+        days = rng.randint(1, RENTAL_SPAN_DAYS - 3)
+        end_day = start_day + timedelta(days=days)
+        base_amount = rates[car_position] * days
+
+        promo = rng.choice(promos) if promos and rng.random() < 0.15 else None
+        discount = (base_amount * Decimal(promo[1]) / 100).quantize(Decimal('0.01')) if promo else Decimal('0.00')
+        penalties = rng.sample(penalty_ids, rng.randint(1, 2)) if end_day <= today and rng.random() < 0.1 else []
+        penalty_amount = sum((params['penalties'][pid][1] for pid in penalties), Decimal('0'))
+
+        if end_day > today:
+            status = 'active'
+        else:
+            status = 'cancelled' if rng.random() < 0.1 else 'completed'
+        rows.append((
+            car_ids[car_position],
+            rng.choice(client_ids),
+            start_day,
+            days,
+            end_day,
+            end_day if status != 'active' else None,
+            base_amount,
+            base_amount - discount + penalty_amount,
+            status,
+            promo[0] if promo else None,
+            penalties,
+            discount,
+            penalty_amount,
+        ))
+    return rows
+
+
+# Общие для всех чанков аргументы (списки id машин и клиентов) попадают в процесс
+# один раз через initializer, а не сериализуются с каждым заданием
+_shared_args = ()
+
+
+def _init_worker(args):
+    global _shared_args
+    _shared_args = args
+
+
+def _run_chunk(func, seed, chunk, start, end):
+    return func(seed, chunk, start, end, *_shared_args)
+
+
+def _aware(day):
+    return timezone.make_aware(datetime.combine(day, time(10, 0)))
+
+
+class DatasetGenerator:
+    def __init__(self, seed=42, chunk_size=5000, workers=1, log=None):
+        self.seed = seed
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self.log = log or (lambda message: None)
+        self.today = timezone.localdate()
+
+    def _map(self, func, kind, total, *args):
+        """Yield generated chunks in order, using worker processes when allowed."""
+        ranges = chunk_ranges(total, self.chunk_size)
+        jobs = [(self.seed, chunk, start, end) for chunk, (start, end) in enumerate(ranges)]
+        if self.workers > 1 and len(jobs) > 1 and 'fork' in multiprocessing.get_all_start_methods():
+            connections.close_all()
+            context = multiprocessing.get_context('fork')
+            with ProcessPoolExecutor(min(self.workers, len(jobs)), mp_context=context,
+                                     initializer=_init_worker, initargs=(args,)) as pool:
+                yield from pool.map(_run_chunk, *zip(*((func,) + job for job in jobs)))
+        else:
+            for job in jobs:
+                yield func(*job, *args)
+
+    def reference_data(self):
+        car_types = {
+            name: CarType.objects.get_or_create(name=name, defaults={'description': f'{name} cars'})[0]
+            for name in CAR_TYPES
+        }
+        rng = chunk_rng(self.seed, 'reference', 0)
+        model_ids = []
+        for manufacturer, names in MANUFACTURERS.items():
+            for name in names:
+                car_model, _ = CarModel.objects.get_or_create(
+                    manufacturer=manufacturer, name=name,
+                    defaults={'car_type': car_types[rng.choice(CAR_TYPES)], 'description': f'{manufacturer} {name}'},
+                )
+                model_ids.append(car_model.pk)
+        penalties = {}
+        for name, amount in PENALTIES:
+            penalty, _ = Penalty.objects.get_or_create(name=name, defaults={'amount': amount})
+            penalties[penalty.pk] = (penalty.name, penalty.amount)
+        promos = []
+        for percent in (5, 10, 15, 20, 25):
+            promo, _ = Promo.objects.get_or_create(code=f'SYNTH{percent}', defaults={
+                'description': f'Synthetic {percent}% discount',
+                'discount_percent': percent,
+                'valid_from': timezone.now() - timedelta(days=5 * 365),
+                'valid_until': timezone.now() + timedelta(days=365),
+            })
+            promos.append((promo.pk, promo.discount_percent, promo.code))
+        return sorted(model_ids), penalties, promos
+
+    def generate_cars(self, total, model_ids):
+        for rows in self._map(car_rows, 'car', total, model_ids):
+            Car.objects.bulk_create([
+                Car(license_plate=plate, model_id=model_id, year=year, value=value,
+                    daily_rate=rate, is_available=available)
+                for plate, model_id, year, value, rate, available in rows
+            ])
+            self.log(f'cars: +{len(rows)}')
+
+    def generate_clients(self, total):
+        password = make_password('synthetic')
+        for rows in self._map(client_rows, 'client', total, self.today):
+            with transaction.atomic():
+                users = User.objects.bulk_create([
+                    User(username=username, first_name=first_name, last_name=last_name, email=email,
+                         password=password, date_joined=_aware(self.today - timedelta(days=joined_days_ago)))
+                    for username, first_name, last_name, email, joined_days_ago, _, _, _ in rows
+                ])
+                clients = [
+                    Client(user=user, phone=phone, birth_date=birth_date, address=address)
+                    for user, (_, _, _, _, _, phone, birth_date, address) in zip(users, rows)
+                ]
+                # bulk_create не вызывает save(), поэтому поля поиска заполняются здесь
+                for client in clients:
+                    client.refresh_lookup_fields()
+                Client.objects.bulk_create(clients)
+            self.log(f'clients: +{len(rows)}')
+
+    def generate_rentals(self, total, penalties, promos):
+        cars = list(Car.objects.filter(license_plate__startswith=PLATE_PREFIX)
+                    .order_by('pk').values_list('pk', 'daily_rate'))
+        client_ids = list(Client.objects.filter(user__username__startswith=USERNAME_PREFIX)
+                          .order_by('pk').values_list('pk', flat=True))
+        if not cars or not client_ids:
+            return
+        rentals_per_car = -(-total // len(cars))
+        params = {
+            'car_ids': [pk for pk, _ in cars],
+            'rates': [rate for _, rate in cars],
+            'client_ids': client_ids,
+            'promos': promos,
+            'penalty_ids': sorted(penalties),
+            'penalties': penalties,
+            'today': self.today,
+            # Последние аренды каждой машины приходятся на ближайшие дни
+            'origin': self.today - timedelta(days=(rentals_per_car - 1) * RENTAL_SPAN_DAYS),
+        }
+        PenaltyLink = Rental.penalties.through
+        for rows in self._map(rental_rows, 'rental', total, params):
+            with transaction.atomic():
+                rentals = Rental.objects.bulk_create([
+                    Rental(car_id=car_id, client_id=client_id, start_date=_aware(start_day), days=days,
+                           expected_return_date=_aware(end_day),
+                           actual_return_date=_aware(returned) if returned else None,
+                           base_amount=base_amount, final_amount=final_amount, status=status,
+                           promo_code_id=promo_id)
+                    for car_id, client_id, start_day, days, end_day, returned, base_amount,
+                    final_amount, status, promo_id, _, _, _ in rows
+                ])
+                PenaltyLink.objects.bulk_create([
+                    PenaltyLink(rental_id=rental.pk, penalty_id=penalty_id)
+                    for rental, row in zip(rentals, rows)
+                    for penalty_id in row[10]
+                ])
+                self.create_invoices(rentals, rows, penalties, promos)
+                RentalSlot.objects.bulk_create([
+                    RentalSlot(car_id=rental.car_id, rental_id=rental.pk, day=day)
+                    for rental in rentals if rental.status == 'active'
+                    for day in slot_days(rental)
+                ], ignore_conflicts=True)
+            self.log(f'rentals: +{len(rows)}')
+
+    def create_invoices(self, rentals, rows, penalties, promos):
+        promo_codes = {pk: (percent, code) for pk, percent, code in promos}
+        invoices = Invoice.objects.bulk_create([
+            Invoice(rental_id=rental.pk, promo_code_id=rental.promo_code_id, base_amount=rental.base_amount,
+                    discount_amount=row[11], penalty_amount=row[12], total_amount=rental.final_amount)
+            for rental, row in zip(rentals, rows)
+        ])
+        lines = []
+        for invoice, rental, row in zip(invoices, rentals, rows):
+            lines.append(InvoiceLine(invoice_id=invoice.pk, kind='base', description=f'Аренда на {rental.days} дн.',
+                                     amount=rental.base_amount))
+            if rental.promo_code_id:
+                percent, code = promo_codes[rental.promo_code_id]
+                lines.append(InvoiceLine(invoice_id=invoice.pk, kind='discount',
+                                         description=f'Промокод {code} (-{percent}%)', amount=-row[11]))
+            for penalty_id in row[10]:
+                name, amount = penalties[penalty_id]
+                lines.append(InvoiceLine(invoice_id=invoice.pk, kind='penalty', description=name,
+                                         amount=amount, penalty_id=penalty_id))
+        InvoiceLine.objects.bulk_create(lines)
+
+    def generate(self, cars=0, clients=0, rentals=0):
+        model_ids, penalties, promos = self.reference_data()
+        self.generate_cars(cars, model_ids)
+        self.generate_clients(clients)
+        self.generate_rentals(rentals, penalties, promos)
+        facets.add_cars(Car.objects.filter(license_plate__startswith=PLATE_PREFIX))
+        fragments.reset()
+
+
+def _raw_delete(queryset):
+    """``DELETE ... WHERE`` without loading rows, cascades or signals."""
+    queryset._raw_delete(queryset.db)
+
+
+def clear_synthetic_data(rebuild_rollups=True):
+    """Delete the synthetic cars, clients and their rentals.
+
+    Dependent rows are deleted explicitly, children first, since a raw delete
+    does not cascade.  ``rebuild_rollups=False`` leaves the rollups to the
+    caller, e.g. ``generate_dataset`` rebuilds them after generating anyway.
+    """
+    synthetic_cars = Car.objects.filter(license_plate__startswith=PLATE_PREFIX).values('pk')
+    synthetic_clients = Client.objects.filter(user__username__startswith=USERNAME_PREFIX).values('pk')
+    synthetic_users = User.objects.filter(username__startswith=USERNAME_PREFIX).values('pk')
+    rentals = Rental.objects.filter(Q(client__in=synthetic_clients) | Q(car__in=synthetic_cars)).values('pk')
+    with transaction.atomic():
+        facets.add_cars(Car.objects.filter(pk__in=synthetic_cars), sign=-1)
+        _raw_delete(InvoiceLine.objects.filter(invoice__rental__in=rentals))
+        _raw_delete(Invoice.objects.filter(rental__in=rentals))
+        _raw_delete(Rental.penalties.through.objects.filter(rental__in=rentals))
+        _raw_delete(RentalSlot.objects.filter(Q(rental__in=rentals) | Q(car__in=synthetic_cars)))
+        _raw_delete(Rental.objects.filter(pk__in=rentals))
+        _raw_delete(CarPark.cars.through.objects.filter(car__in=synthetic_cars))
+        _raw_delete(Car.objects.filter(pk__in=synthetic_cars))
+        _raw_delete(Review.objects.filter(client__in=synthetic_clients))
+        _raw_delete(Client.objects.filter(pk__in=synthetic_clients))
+        _raw_delete(User.groups.through.objects.filter(user__in=synthetic_users))
+        _raw_delete(User.user_permissions.through.objects.filter(user__in=synthetic_users))
+        _raw_delete(User.objects.filter(pk__in=synthetic_users))
+    if rebuild_rollups:
+        rollups.rebuild()
+    fragments.reset()
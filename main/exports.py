@@ -0,0 +1,132 @@
+"""Streaming exports of rentals, clients and the fleet as CSV or JSON Lines.
+
+Rows are read with ``values_list()`` projections through
+``QuerySet.iterator(chunk_size=...)`` and encoded one at a time, so memory
+use does not depend on the number of rows.  Rental penalty and discount
+totals come from the persisted invoices (see billing.py) instead of being
+aggregated per export.  Both ``ExportView`` and ``manage.py export_data``
+consume ``stream``.
+"""
+import csv
+import json
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Car, Client, Rental
+
+FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'jsonl': ('application/x-ndjson', 'jsonl'),
+}
+
+
+class Export:
+    """Columns as ``(header, lookup)`` pairs and the field used for date ranges."""
+
+    def __init__(self, model, columns, date_field=None):
+        self.model = model
+        self.columns = columns
+        self.date_field = date_field
+
+    @property
+    def headers(self):
+        return [header for header, _ in self.columns]
+
+    def queryset(self, date_from=None, date_to=None):
+        queryset = self.model.objects.all()
+        if self.date_field:
+            # Границы как диапазон по самому полю, без __date, чтобы работал индекс
+            if date_from:
+                queryset = queryset.filter(**{f'{self.date_field}__gte': day_start(date_from)})
+            if date_to:
+                queryset = queryset.filter(**{f'{self.date_field}__lt': day_start(date_to + timedelta(days=1))})
+        return queryset.order_by('pk').values_list(*(lookup for _, lookup in self.columns))
+
+
+EXPORTS = {
+    'rentals': Export(Rental, [
+        ('id', 'id'),
+        ('status', 'status'),
+        ('start_date', 'start_date'),
+        ('expected_return_date', 'expected_return_date'),
+        ('actual_return_date', 'actual_return_date'),
+        ('days', 'days'),
+        ('car_id', 'car_id'),
+        ('license_plate', 'car__license_plate'),
+        ('manufacturer', 'car__model__manufacturer'),
+        ('model', 'car__model__name'),
+        ('client_id', 'client_id'),
+        ('client_username', 'client__user__username'),
+        ('client_first_name', 'client__user__first_name'),
+        ('client_last_name', 'client__user__last_name'),
+        ('promo_code', 'promo_code__code'),
+        ('base_amount', 'base_amount'),
+        ('discount_amount', 'invoice__discount_amount'),
+        ('penalty_amount', 'invoice__penalty_amount'),
+        ('final_amount', 'final_amount'),
+    ], date_field='start_date'),
+    'clients': Export(Client, [
+        ('id', 'id'),
+        ('username', 'user__username'),
+        ('first_name', 'user__first_name'),
+        ('last_name', 'user__last_name'),
+        ('email', 'user__email'),
+        ('phone', 'phone'),
+        ('birth_date', 'birth_date'),
+        ('address', 'address'),
+        ('date_joined', 'user__date_joined'),
+    ], date_field='user__date_joined'),
+    'cars': Export(Car, [
+        ('id', 'id'),
+        ('license_plate', 'license_plate'),
+        ('manufacturer', 'model__manufacturer'),
+        ('model', 'model__name'),
+        ('car_type', 'model__car_type__name'),
+        ('year', 'year'),
+        ('value', 'value'),
+        ('daily_rate', 'daily_rate'),
+        ('is_available', 'is_available'),
+    ]),
+}
+
+
+def day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+class Echo:
+    """File-like object whose ``write`` returns the line instead of buffering it."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(headers, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(headers)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def json_value(value):
+    # Даты в ISO 8601, Decimal строкой, чтобы не терять точность
+    return value.isoformat() if hasattr(value, 'isoformat') else str(value)
+
+
+def jsonl_lines(headers, rows):
+    for row in rows:
+        yield json.dumps(dict(zip(headers, row)), default=json_value, ensure_ascii=False) + '\n'
+
+
+def stream(kind, fmt='csv', date_from=None, date_to=None, chunk_size=None):
+    """Yield the export as text lines."""
+    export = EXPORTS[kind]
+    rows = export.queryset(date_from, date_to).iterator(chunk_size=chunk_size or settings.EXPORT_CHUNK_SIZE)
+    encode = csv_lines if fmt == 'csv' else jsonl_lines
+    return encode(export.headers, rows)
+
+
+def filename(kind, fmt):
+    return f'{kind}-{timezone.localdate():%Y%m%d}.{FORMATS[fmt][1]}'
@@ -0,0 +1,166 @@
+"""External content for public pages (cat facts, programming jokes).
+
+Pages never wait on the network: ``ExternalContent.get`` answers from the
+cache, falls back to a default value on a cold cache, and schedules a refresh
+on a small background thread pool once the cached value is older than its TTL
+(stale-while-revalidate).  Fetches share one pooled HTTP session with strict
+connect/read timeouts, and each source has a circuit breaker that stops
+calling an upstream after repeated failures.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import instrumentation
+
+logger = logging.getLogger(__name__)
+
+_session = None
+_session_lock = threading.Lock()
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='external-content')
+
+
+def get_session():
+    global _session
+    with _session_lock:
+        if _session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=4, max_retries=0)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _session = session
+    return _session
+
+
+class CircuitBreaker:
+    """Opens after ``failure_threshold`` consecutive failures.
+
+    While open every call is refused; after ``reset_timeout`` seconds one
+    trial call is let through, and its outcome closes or re-opens the breaker.
+    """
+
+    def __init__(self, failure_threshold=3, reset_timeout=60):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        return self.opened_at is not None
+
+    def allow(self):
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at >= self.reset_timeout:
+                # Полуоткрытое состояние: пропускаем одну пробную попытку
+                self.opened_at = time.monotonic()
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+class ExternalContent:
+    def __init__(self, name, parse, ttl, fallback=None):
+        self.name = name
+        self.parse = parse
+        self.ttl = ttl
+        self.fallback = fallback
+        self.breaker = CircuitBreaker(
+            failure_threshold=settings.EXTERNAL_CONTENT_FAILURE_THRESHOLD,
+            reset_timeout=settings.EXTERNAL_CONTENT_RESET_TIMEOUT,
+        )
+        self._future = None
+        self._lock = threading.Lock()
+
+    @property
+    def cache_key(self):
+        return f'external_content:{self.name}'
+
+    @property
+    def url(self):
+        return settings.EXTERNAL_CONTENT_URLS[self.name]
+
+    def get(self):
+        """Return the cached value (possibly stale) without blocking on the network."""
+        entry = cache.get(self.cache_key)
+        if entry is None:
+            self.refresh_async()
+            return self.fallback
+        if time.time() - entry['fetched_at'] > self.ttl:
+            self.refresh_async()
+        return entry['value']
+
+    def refresh_async(self):
+        """Schedule a background refresh unless one is already running.
+
+        Returns the scheduled future, or None when the refresh is skipped.
+        """
+        with self._lock:
+            if self._future is not None and not self._future.done():
+                return None
+            if not self.breaker.allow():
+                return None
+            # Между процессами обновление выполняет только тот, кто взял блокировку
+            if not cache.add(f'{self.cache_key}:refreshing', True, sum(settings.EXTERNAL_CONTENT_TIMEOUT)):
+                return None
+            self._future = _executor.submit(self.refresh)
+            return self._future
+
+    def refresh(self):
+        started = time.perf_counter()
+        try:
+            response = get_session().get(self.url, timeout=settings.EXTERNAL_CONTENT_TIMEOUT)
+            response.raise_for_status()
+            value = self.parse(response.json())
+        except Exception as e:
+            self.breaker.record_failure()
+            logger.warning('Failed to fetch %s from %s: %s', self.name, self.url, e)
+            return None
+        finally:
+            # Вызов с потока запроса попадает в его метрики, в фоновом пуле это no-op
+            instrumentation.record_http(time.perf_counter() - started)
+            cache.delete(f'{self.cache_key}:refreshing')
+        self.breaker.record_success()
+        cache.set(self.cache_key, {'value': value, 'fetched_at': time.time()},
+                  settings.EXTERNAL_CONTENT_STALE_TTL)
+        return value
+
+
+def parse_cat_fact(data):
+    return data['fact']
+
+
+def parse_joke(data):
+    joke = data[0]  # API returns array with one joke
+    return {
+        'setup': joke['setup'],
+        'punchline': joke['punchline'],
+        'updated': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    }
+
+
+cat_facts = ExternalContent(
+    'cat_fact', parse_cat_fact, ttl=60 * 60 * 24, fallback="Did you know? Cats are amazing!"
+)
+programming_jokes = ExternalContent('programming_joke', parse_joke, ttl=60 * 60)
@@ -0,0 +1,177 @@
+"""Facet index for the car catalog.
+
+Car counts per type, manufacturer, year and daily rate are kept in the
+``FacetCount`` table and updated in place by the ``Car``, ``CarModel`` and
+``CarType`` signals in ``main.signals``: each change adds or subtracts with
+``UPDATE ... SET count = count + n`` in the transaction that changes the
+car, so concurrent workers cannot lose each other's updates and no change
+needs a recount of the fleet.  Bulk writes (imports, ``generate_dataset``)
+add the grouped counts of the cars they wrote with ``add_cars``.
+
+A catalog page reads the counts from the cache as one snapshot, built from
+the few rows of ``FacetCount``.  A change drops the snapshot once it is
+committed, and it is also rebuilt every ``FACET_INDEX_TTL`` seconds.
+"""
+import time
+from decimal import Decimal
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+
+from .models import Car, FacetCount
+
+CACHE_KEY = 'catalog_facets'
+FACET_FIELDS = ('model__car_type_id', 'model__car_type__name', 'model__manufacturer', 'year', 'daily_rate')
+
+
+class FacetSnapshot:
+    def __init__(self, built_at=None):
+        self.built_at = built_at or time.time()
+        self.total = 0
+        # Снимок распаковывается из кеша на каждый запрос, поэтому внутри только
+        # dict и int: цены хранятся в центах, Decimal и Counter медленно читаются из pickle
+        self.types = {}
+        self.type_names = {}
+        self.manufacturers = {}
+        self.years = {}
+        self.rates = {}
+
+    def add(self, facet, value, label, count):
+        if facet == 'type':
+            self.types[int(value)] = count
+            self.type_names[int(value)] = label
+            self.total += count
+        elif facet == 'manufacturer':
+            self.manufacturers[value] = count
+        elif facet == 'year':
+            self.years[int(value)] = count
+        elif facet == 'rate':
+            self.rates[int(value)] = count
+
+    @property
+    def type_choices(self):
+        """``(id, name, count)`` sorted by name."""
+        return sorted(
+            ((type_id, self.type_names[type_id], count) for type_id, count in self.types.items()),
+            key=lambda choice: choice[1],
+        )
+
+    @property
+    def manufacturer_choices(self):
+        return sorted(self.manufacturers.items())
+
+    @property
+    def price_min(self):
+        return Decimal(min(self.rates)).scaleb(-2) if self.rates else None
+
+    @property
+    def price_max(self):
+        return Decimal(max(self.rates)).scaleb(-2) if self.rates else None
+
+    @property
+    def year_min(self):
+        return min(self.years) if self.years else None
+
+    @property
+    def year_max(self):
+        return max(self.years) if self.years else None
+
+    def count_for(self, filters):
+        """Number of cars matching ``filters`` when the facets alone can tell, else None."""
+        active = {name: value for name, value in filters.items() if value not in (None, '')}
+        if not active:
+            return self.total
+        if active.keys() == {'type'}:
+            return self.types.get(int(active['type']), 0)
+        if active.keys() == {'manufacturer'}:
+            return self.manufacturers.get(active['manufacturer'], 0)
+        return None
+
+
+def stored_key(pk):
+    """Facet values of a car as currently stored in the database."""
+    return Car.objects.filter(pk=pk).values_list(*FACET_FIELDS).first()
+
+
+def facet_values(key):
+    """``(facet, value, label)`` rows of a car key; ``None`` parts are skipped."""
+    type_id, type_name, manufacturer, year, rate = key
+    values = [
+        ('type', type_id, type_name),
+        ('manufacturer', manufacturer, ''),
+        ('year', year, ''),
+        ('rate', None if rate is None else int(Decimal(rate) * 100), ''),
+    ]
+    return [(facet, str(value), label) for facet, value, label in values if value is not None]
+
+
+def grouped(queryset):
+    return queryset.values(*FACET_FIELDS).annotate(count=Count('pk')).order_by().values_list(
+        *FACET_FIELDS, 'count'
+    )
+
+
+def deltas(rows):
+    """Sum ``(*key, count)`` rows into ``{(facet, value): (label, delta)}``."""
+    result = {}
+    for *key, count in rows:
+        for facet, value, label in facet_values(key):
+            previous = result.get((facet, value), (label, 0))[1]
+            result[(facet, value)] = (label, previous + count)
+    return result
+
+
+def adjust(changes):
+    """Add ``changes`` (see ``deltas``) to the stored counts, each row atomically."""
+    for (facet, value), (label, delta) in changes.items():
+        if not delta:
+            continue
+        rows = FacetCount.objects.filter(facet=facet, value=value)
+        if rows.update(count=F('count') + delta):
+            continue
+        try:
+            with transaction.atomic():
+                FacetCount.objects.create(facet=facet, value=value, label=label, count=delta)
+        except IntegrityError:
+            rows.update(count=F('count') + delta)  # строку успел создать другой процесс
+    transaction.on_commit(invalidate)
+
+
+def move(old_key, new_key, count=1):
+    """Move ``count`` cars from ``old_key`` to ``new_key`` (either may be None)."""
+    rows = []
+    if old_key is not None:
+        rows.append((*old_key, -count))
+    if new_key is not None:
+        rows.append((*new_key, count))
+    adjust(deltas(rows))
+
+
+def add_cars(queryset, sign=1):
+    """Count the cars of ``queryset`` in (``sign=-1``: out of) the facets, for bulk writes."""
+    adjust(deltas((*key, sign * count) for *key, count in grouped(queryset)))
+
+
+def rename_type(type_id, name):
+    FacetCount.objects.filter(facet='type', value=str(type_id)).update(label=name)
+    transaction.on_commit(invalidate)
+
+
+def build():
+    snapshot = FacetSnapshot()
+    for row in FacetCount.objects.filter(count__gt=0).values_list('facet', 'value', 'label', 'count'):
+        snapshot.add(*row)
+    return snapshot
+
+
+def get():
+    snapshot = cache.get(CACHE_KEY)
+    if snapshot is None:
+        # После сброса снимок строит один процесс, остальные ждут его результата
+        snapshot = cache.get_or_set(CACHE_KEY, build, settings.FACET_INDEX_TTL)
+    return snapshot
+
+
+def invalidate():
+    cache.delete(CACHE_KEY)
@@ -0,0 +1,222 @@
+"""Serving media and collected static files.
+
+``serve_file`` replaces ``django.views.static.serve``:
+
+* conditional GET: a strong ``ETag`` (mtime and size) and ``Last-Modified``
+  are sent, and ``If-None-Match``/``If-Modified-Since`` are answered with
+  304 without opening the file;
+* single ``Range`` requests (with ``If-Range``) are answered with 206, so
+  browsers can resume downloads and seek without re-fetching the file;
+* ``.br`` and ``.gz`` variants written at build time (see
+  ``CompressedStaticFilesStorage``) are served to clients that accept them;
+* with ``FILE_SERVING_SENDFILE`` set, only the headers are produced and the
+  body is handed off to the front proxy (``X-Accel-Redirect`` for nginx,
+  ``X-Sendfile`` for Apache/lighttpd), so the app worker is freed at once.
+
+Full responses use ``FileResponse``, which lets the WSGI server send the
+file with ``sendfile()`` when it supports ``wsgi.file_wrapper``.
+"""
+import gzip
+import mimetypes
+import os
+import re
+import stat
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, parse_http_date_safe
+
+try:
+    import brotli
+except ImportError:  # brotli необязателен: без него создаются только .gz
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = {'.css', '.js', '.mjs', '.json', '.map', '.svg', '.html', '.txt', '.xml'}
+# Порядок предпочтения при выборе варианта
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+ARCHIVE_TYPES = {'bzip2': 'application/x-bzip', 'gzip': 'application/gzip', 'xz': 'application/x-xz'}
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+BLOCK_SIZE = 64 * 1024
+
+
+def content_type_for(path):
+    content_type, encoding = mimetypes.guess_type(path)
+    # Как FileResponse: архив .gz отдаётся как файл, а не как сжатое тело
+    return ARCHIVE_TYPES.get(encoding, content_type) or 'application/octet-stream'
+
+
+def etag_for(st):
+    return f'"{st.st_mtime_ns:x}-{st.st_size:x}"'
+
+
+def is_compressible(path):
+    return os.path.splitext(path)[1].lower() in COMPRESSIBLE_EXTENSIONS
+
+
+def accepted_encodings(request):
+    header = request.META.get('HTTP_ACCEPT_ENCODING', '')
+    accepted = set()
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        if params.strip().replace(' ', '') in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+def choose_variant(request, path):
+    """``(path, encoding)`` of the best precompressed variant the client accepts."""
+    if not is_compressible(path) or 'HTTP_RANGE' in request.META:
+        return path, None
+    accepted = accepted_encodings(request)
+    for encoding, suffix in ENCODINGS:
+        if encoding in accepted and os.path.isfile(path + suffix):
+            return path + suffix, encoding
+    return path, None
+
+
+def parse_range(header, size):
+    """``(start, end)`` inclusive for a single byte range, ``None`` to ignore it.
+
+    Raises ``ValueError`` when the range cannot be satisfied.
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match or not any(match.groups()):
+        return None  # несколько диапазонов или чужие единицы: отдаём файл целиком
+    first, last = match.groups()
+    if not first:
+        length = int(last)
+        if length == 0:
+            raise ValueError('empty suffix range')
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or (last and int(last) < start):
+        raise ValueError('range not satisfiable')
+    return start, end
+
+
+def if_range_matches(request, etag, mtime):
+    value = request.META.get('HTTP_IF_RANGE')
+    if value is None:
+        return True
+    if value.startswith('"') or value.startswith('W/'):
+        return value == etag
+    return parse_http_date_safe(value) == int(mtime)
+
+
+def read_range(path, start, length):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(BLOCK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def sendfile_response(path, document_root, accel_location):
+    """Headers only; the front proxy sends the body (and handles ``Range``)."""
+    response = HttpResponse()
+    if settings.FILE_SERVING_SENDFILE == 'x-accel-redirect':
+        relative = os.path.relpath(path, document_root).replace(os.sep, '/')
+        response['X-Accel-Redirect'] = accel_location + quote(relative)
+    else:
+        response['X-Sendfile'] = path
+    return response
+
+
+def serve_file(request, path, document_root, cache_control=None, accel_location=None):
+    """Serve ``path`` (relative to ``document_root``) for a GET or HEAD request."""
+    try:
+        fullpath = safe_join(document_root, path)
+    except SuspiciousFileOperation:
+        raise Http404('Invalid path')
+    variant, encoding = choose_variant(request, fullpath)
+    try:
+        st = os.stat(variant)
+    except (OSError, ValueError):  # ValueError: нулевой байт в пути
+        raise Http404('File does not exist')
+    if not stat.S_ISREG(st.st_mode):
+        raise Http404('File does not exist')
+
+    etag, mtime = etag_for(st), st.st_mtime
+    response = get_conditional_response(request, etag=etag, last_modified=int(mtime))
+    if response is None:
+        if settings.FILE_SERVING_SENDFILE:
+            response = sendfile_response(variant, document_root, accel_location)
+        else:
+            response = file_response(request, variant, st, etag, mtime)
+        if response.status_code != 416:
+            response['Content-Type'] = content_type_for(fullpath)
+            if encoding:
+                response['Content-Encoding'] = encoding
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(mtime)
+    if cache_control:
+        response['Cache-Control'] = cache_control
+    if is_compressible(fullpath):
+        patch_vary_headers(response, ['Accept-Encoding'])
+    return response
+
+
+def file_response(request, path, st, etag, mtime):
+    size = st.st_size
+    byte_range = None
+    if 'HTTP_RANGE' in request.META and if_range_matches(request, etag, mtime):
+        try:
+            byte_range = parse_range(request.META['HTTP_RANGE'], size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+    if byte_range is None:
+        response = FileResponse(open(path, 'rb'), filename=os.path.basename(request.path))
+    else:
+        start, end = byte_range
+        response = StreamingHttpResponse(read_range(path, start, end - start + 1), status=206)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        size = end - start + 1
+    response['Content-Length'] = str(size)
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def compress_file(path, min_size=None, force=False):
+    """Write ``.gz`` (and ``.br`` when brotli is installed) next to ``path``.
+
+    A variant is kept only if it is smaller than the original; returns the
+    paths written.
+    """
+    min_size = settings.FILE_SERVING_COMPRESS_MIN_SIZE if min_size is None else min_size
+    if not is_compressible(path) or os.path.getsize(path) < min_size:
+        return []
+    source_mtime = os.path.getmtime(path)
+    data = None
+    written = []
+    for encoding, suffix in ENCODINGS:
+        if encoding == 'br' and brotli is None:
+            continue
+        target = path + suffix
+        if not force and os.path.exists(target) and os.path.getmtime(target) >= source_mtime:
+            continue
+        if data is None:
+            with open(path, 'rb') as f:
+                data = f.read()
+        # mtime=0: одинаковый результат при каждой сборке
+        compressed = brotli.compress(data) if encoding == 'br' else gzip.compress(data, 9, mtime=0)
+        if len(compressed) >= len(data):
+            if os.path.exists(target):
+                os.remove(target)
+            continue
+        tmp_path = f'{target}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(compressed)
+        os.replace(tmp_path, target)
+        written.append(target)
+    return written
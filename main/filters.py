@@ -0,0 +1,50 @@
+import django_filters
+
+from .availability import busy_car_ids
+from .models import Car
+
+
+class CarFilter(django_filters.FilterSet):
+    SORT_CHOICES = [
+        ('price_asc', 'По возрастанию цены'),
+        ('price_desc', 'По убыванию цены'),
+        ('year_desc', 'Сначала новые'),
+    ]
+    SORT_ORDER = {
+        'price_asc': ('daily_rate', 'pk'),
+        'price_desc': ('-daily_rate', 'pk'),
+        'year_desc': ('-year', 'pk'),
+    }
+
+    # Варианты для type/manufacturer берутся из индекса фасетов, а не из базы
+    type = django_filters.NumberFilter(field_name='model__car_type_id', label='Категория')
+    manufacturer = django_filters.CharFilter(field_name='model__manufacturer', label='Производитель')
+    price_min = django_filters.NumberFilter(field_name='daily_rate', lookup_expr='gte', label='Цена от')
+    price_max = django_filters.NumberFilter(field_name='daily_rate', lookup_expr='lte', label='Цена до')
+    year_min = django_filters.NumberFilter(field_name='year', lookup_expr='gte', label='Год от')
+    year_max = django_filters.NumberFilter(field_name='year', lookup_expr='lte', label='Год до')
+    available_from = django_filters.DateFilter(method='filter_noop', label='Свободен с')
+    available_to = django_filters.DateFilter(method='filter_noop', label='Свободен по')
+    sort = django_filters.ChoiceFilter(choices=SORT_CHOICES, method='filter_noop', label='Сортировка')
+
+    class Meta:
+        model = Car
+        fields = []
+
+    def filter_noop(self, queryset, name, value):
+        # Окно доступности и сортировка применяются в filter_queryset
+        return queryset
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        data = self.form.cleaned_data
+        start, end = data.get('available_from'), data.get('available_to')
+        if start and end and end > start:
+            queryset = queryset.exclude(pk__in=busy_car_ids(start, end))
+        return queryset.order_by(*self.SORT_ORDER.get(data.get('sort'), ('model__name', 'pk')))
+
+    @property
+    def active_filters(self):
+        """Cleaned filter values (invalid ones are dropped), without sorting."""
+        self.errors
+        return {name: value for name, value in self.form.cleaned_data.items() if name != 'sort'}
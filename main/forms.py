@@ -1,11 +1,14 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm
+from django.contrib.auth.validators import UnicodeUsernameValidator
 from django.contrib.auth.models import User
 from django.core.validators import RegexValidator
 from datetime import date, datetime
 from dateutil.relativedelta import relativedelta
 import logging
 from .models import Client, Employee, Rental, Car, CarModel, CarType, Promo, Penalty
+from .availability import as_datetime
+from .billing import get_invoice
 
 logger = logging.getLogger(__name__)
 
@@ -143,7 +146,7 @@ class RentalForm(forms.ModelForm):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         # Показываем все машины, так как их доступность будет проверяться для конкретных дат
-        self.fields['car'].queryset = Car.objects.all()
+        self.fields['car'].queryset = Car.objects.for_choices()
         self.fields['car'].empty_label = 'Выберите автомобиль'
         self.fields['car'].label_from_instance = lambda obj: f"{obj.model.name} ({obj.license_plate}) - ${obj.daily_rate}/день"
 
@@ -167,16 +170,13 @@ class RentalForm(forms.ModelForm):
             cleaned_data['days'] = delta.days + 1
 
             # Проверяем, не арендована ли машина на выбранные даты
-            conflicting_rentals = Rental.objects.filter(
+            busy_periods = list(Rental.objects.filter(
                 car=car,
                 status='active',
-                start_date__lt=end_date,
-                expected_return_date__gt=start_date
-            )
-
-            if conflicting_rentals.exists():
-                # Получаем все занятые периоды для этой машины
-                busy_periods = conflicting_rentals.values_list('start_date', 'expected_return_date')
+                start_date__lt=as_datetime(end_date),
+                expected_return_date__gt=as_datetime(start_date)
+            ).values_list('start_date', 'expected_return_date'))
+            if busy_periods:
                 busy_periods_str = [
                     f"с {start.strftime('%d.%m.%Y')} по {end.strftime('%d.%m.%Y')}"
                     for start, end in busy_periods
@@ -269,23 +269,71 @@ class RentalCompleteForm(forms.ModelForm):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         if self.instance:
+            invoice = get_invoice(self.instance)
             self.fields['base_amount'] = forms.DecimalField(
                 disabled=True,
-                initial=self.instance.base_amount,
+                initial=invoice.base_amount,
                 label='Базовая стоимость'
             )
             self.fields['discount_amount'] = forms.DecimalField(
                 disabled=True,
-                initial=self.instance.calculate_discount_amount(),
+                initial=invoice.discount_amount,
                 label='Сумма скидки'
             )
             self.fields['penalty_amount'] = forms.DecimalField(
                 disabled=True,
-                initial=self.instance.calculate_penalty_amount(),
+                initial=invoice.penalty_amount,
                 label='Сумма штрафов'
             )
             self.fields['final_amount'] = forms.DecimalField(
                 disabled=True,
-                initial=self.instance.calculate_final_amount(),
+                initial=invoice.total_amount,
                 label='Итоговая сумма'
-            ) 
\ No newline at end of file
+            )
+
+class ExportForm(forms.Form):
+    format = forms.ChoiceField(choices=[('csv', 'CSV'), ('jsonl', 'JSON Lines')], required=False)
+    date_from = forms.DateField(required=False, label='С')
+    date_to = forms.DateField(required=False, label='По')
+
+    def clean(self):
+        cleaned_data = super().clean()
+        cleaned_data['format'] = cleaned_data.get('format') or 'csv'
+        date_from, date_to = cleaned_data.get('date_from'), cleaned_data.get('date_to')
+        if date_from and date_to and date_from > date_to:
+            raise forms.ValidationError('Начальная дата позже конечной.')
+        return cleaned_data
+
+# Формы построчной проверки для массового импорта (main/imports.py).
+# Внешние ключи в них не входят: импорт находит их одним запросом на пачку строк.
+class CarImportForm(CarForm):
+    class Meta(CarForm.Meta):
+        fields = ['license_plate', 'year', 'value', 'daily_rate', 'is_available']
+
+class CarModelImportForm(CarModelForm):
+    class Meta(CarModelForm.Meta):
+        fields = ['name', 'manufacturer', 'description']
+
+class ClientImportForm(ClientForm):
+    username = forms.CharField(max_length=150, validators=[UnicodeUsernameValidator()])
+    first_name = forms.CharField(max_length=150, required=False)
+    last_name = forms.CharField(max_length=150, required=False)
+    email = forms.EmailField(required=False)
+
+class RentalImportForm(forms.Form):
+    """Historical rental: Rental.clean() is not run because start dates are in the past."""
+    start_date = forms.DateTimeField()
+    expected_return_date = forms.DateTimeField()
+    actual_return_date = forms.DateTimeField(required=False)
+    days = forms.IntegerField(min_value=1, max_value=30)
+    status = forms.ChoiceField(choices=[choice for choice in Rental.STATUS_CHOICES if choice[0] != 'active'])
+    base_amount = forms.DecimalField(max_digits=8, decimal_places=2, min_value=0)
+    notes = forms.CharField(required=False)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        start = cleaned_data.get('start_date')
+        for name in ('expected_return_date', 'actual_return_date'):
+            if start and cleaned_data.get(name) and cleaned_data[name] < start:
+                self.add_error(name, 'Дата раньше начала аренды.')
+        return cleaned_data
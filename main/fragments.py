@@ -0,0 +1,77 @@
+"""Cached template fragments invalidated by model changes.
+
+A fragment declares what it depends on with the ``cachefragment`` tag
+(``main.templatetags.fragment_extras``): model instances (``car``) and whole
+models (``"main.CarType"``).  Each dependency has a version token in the
+cache, and the fragment is stored under a key built from those tokens, so a
+change only has to replace the token:
+
+* ``post_save``/``post_delete`` of a tracked model (see ``main.signals``)
+  replace the token of the instance and of its model, so a car card is
+  re-rendered only when that car changes, while a list depending on
+  ``"main.Car"`` is re-rendered on any car change;
+* bulk writes that bypass the signals (``bulk_create``, ``update``, flush)
+  call ``reset``, which replaces a global token that every fragment key
+  includes.
+
+Old fragments are not deleted; they are no longer looked up and expire
+after ``FRAGMENT_CACHE_TIMEOUT``.  A missing token (evicted or never set)
+is replaced by a new one, never reset to a known value, so eviction cannot
+bring back an outdated fragment.
+"""
+import hashlib
+import uuid
+
+from django.core.cache import cache
+from django.db import models
+
+VERSION_PREFIX = 'fragment_version'
+GENERATION_KEY = 'fragment_generation'
+
+
+def model_label(dependency):
+    if isinstance(dependency, str):
+        return dependency.lower()
+    return dependency._meta.label_lower
+
+
+def dependency_key(dependency, pk=None):
+    if isinstance(dependency, models.Model):
+        pk = dependency.pk
+    if pk is not None:
+        return f'{VERSION_PREFIX}:{model_label(dependency)}:{pk}'
+    return f'{VERSION_PREFIX}:{model_label(dependency)}'
+
+
+def new_token():
+    return uuid.uuid4().hex
+
+
+def versions(keys):
+    """Current tokens for ``keys``, creating the missing ones."""
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            token = new_token()
+            # Если другой процесс успел создать метку раньше, берём его
+            found[key] = token if cache.add(key, token, None) else cache.get(key, token)
+    return [found[key] for key in keys]
+
+
+def fragment_key(name, dependencies, vary_on=()):
+    keys = [GENERATION_KEY] + [dependency_key(dependency) for dependency in dependencies]
+    digest = hashlib.md5(repr((keys, versions(keys), [str(value) for value in vary_on])).encode()).hexdigest()
+    return f'fragment:{name}:{digest}'
+
+
+def bump(model, pk=None):
+    """Invalidate fragments depending on ``model`` and on its instance ``pk``."""
+    keys = [dependency_key(model_label(model))]
+    if pk is not None:
+        keys.append(dependency_key(model, pk))
+    cache.set_many({key: new_token() for key in keys}, None)
+
+
+def reset():
+    """Invalidate every fragment, after changes made without model signals."""
+    cache.set(GENERATION_KEY, new_token(), None)
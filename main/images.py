@@ -0,0 +1,202 @@
+"""Resized WebP and JPEG derivatives of uploaded photos.
+
+For every car, article and employee photo a set of widths
+(``IMAGE_DERIVATIVE_WIDTHS``, never larger than the original) is rendered
+in each of ``IMAGE_DERIVATIVE_FORMATS`` under ``IMAGE_DERIVATIVE_ROOT``.
+The EXIF orientation is applied and all metadata dropped.  Rendering runs
+in a process pool after the upload is committed, like the statistics
+charts, so the request that saves the photo does not wait for Pillow.
+
+The original's dimensions are stored on the model (``image_width`` and
+``image_height``, ``photo_*`` for employees) when it is saved; derivative
+names and sizes follow from them, so the ``responsive_image`` template tag
+builds ``srcset`` markup without queries.  ``manage.py
+generate_image_derivatives`` backfills existing uploads.
+"""
+import glob
+import logging
+import os
+import threading
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Увеличить при изменении параметров обработки, чтобы пересоздать производные
+DERIVATIVE_VERSION = 1
+
+EXTENSIONS = {'webp': 'webp', 'jpeg': 'jpg'}
+CONTENT_TYPES = {'webp': 'image/webp', 'jpeg': 'image/jpeg'}
+EXIF_ORIENTATION = 0x0112
+
+_pool = None
+_lock = threading.Lock()
+
+
+def dimension_fields(field_name):
+    return f'{field_name}_width', f'{field_name}_height'
+
+
+def derivative_widths(width):
+    """Widths rendered for an original ``width`` pixels wide (no upscaling)."""
+    return sorted({min(target, width) for target in settings.IMAGE_DERIVATIVE_WIDTHS})
+
+
+def derivative_name(name, width, fmt):
+    base, _ = os.path.splitext(name)
+    return f'{base}-v{DERIVATIVE_VERSION}-{width}w.{EXTENSIONS[fmt]}'
+
+
+def derivative_path(name, width, fmt):
+    return os.path.join(settings.IMAGE_DERIVATIVE_ROOT, derivative_name(name, width, fmt))
+
+
+def derivative_url(name, width, fmt):
+    return f'{settings.IMAGE_DERIVATIVE_URL}{derivative_name(name, width, fmt)}'
+
+
+def derivative_files(name):
+    """Paths of every derivative of ``name`` on disk, of any version, width and format."""
+    base = os.path.join(settings.IMAGE_DERIVATIVE_ROOT, os.path.splitext(name)[0])
+    return glob.glob(f'{glob.escape(base)}-v*w.*')
+
+
+def remove_derivatives(name):
+    for path in derivative_files(name):
+        os.remove(path)
+
+
+def scaled_height(width, height, target):
+    return max(1, round(height * target / width))
+
+
+def render(source, targets, quality):
+    """Write every ``(path, width, fmt)`` in ``targets`` from the image at ``source``.
+
+    Runs in a worker process; returns the paths written.
+    """
+    from PIL import Image, ImageOps
+
+    written = []
+    with Image.open(source) as original:
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+        for path, width, fmt in targets:
+            resized = image if width >= image.width else image.resize(
+                (width, scaled_height(image.width, image.height, width)), Image.LANCZOS
+            )
+            if fmt == 'jpeg' and resized.mode != 'RGB':
+                resized = resized.convert('RGB')
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f'{path}.{os.getpid()}.tmp'
+            # exif не передаётся, поэтому метаданные (в том числе GPS) в производные не попадают
+            resized.save(tmp_path, format=fmt.upper(), quality=quality, optimize=fmt == 'jpeg')
+            os.replace(tmp_path, path)
+            written.append(path)
+    return written
+
+
+def pending_targets(name, width, force=False):
+    targets = []
+    for size in derivative_widths(width):
+        for fmt in settings.IMAGE_DERIVATIVE_FORMATS:
+            path = derivative_path(name, size, fmt)
+            if force or not os.path.exists(path):
+                targets.append((path, size, fmt))
+    return targets
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        from concurrent.futures import ProcessPoolExecutor
+
+        _pool = ProcessPoolExecutor(max_workers=settings.IMAGE_DERIVATIVE_WORKERS)
+    return _pool
+
+
+def shutdown():
+    global _pool
+    with _lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
+
+
+def _log_failure(future):
+    if future.exception() is not None:
+        logger.error('Failed to render image derivatives', exc_info=future.exception())
+
+
+def schedule(fieldfile, width, force=False):
+    """Render the missing derivatives of ``fieldfile`` in the background.
+
+    With ``IMAGE_DERIVATIVE_WORKERS = 0`` they are rendered in-process.
+    """
+    if not fieldfile or not width:
+        return None
+    targets = pending_targets(fieldfile.name, width, force)
+    if not targets:
+        return None
+    if not settings.IMAGE_DERIVATIVE_WORKERS:
+        try:
+            render(fieldfile.path, targets, settings.IMAGE_DERIVATIVE_QUALITY)
+        except Exception:
+            logger.exception('Failed to render image derivatives of %s', fieldfile.name)
+        return None
+    with _lock:
+        future = _get_pool().submit(render, fieldfile.path, targets, settings.IMAGE_DERIVATIVE_QUALITY)
+    future.add_done_callback(_log_failure)
+    return future
+
+
+def read_dimensions(fieldfile):
+    """Displayed ``(width, height)`` of an uploaded or stored image.
+
+    Only the header is read.  EXIF orientations 5-8 (rotated by 90°) swap the
+    sides, the same way ``render`` applies them.
+    """
+    from PIL import Image
+
+    committed = fieldfile._committed
+    try:
+        source = fieldfile.path if committed else fieldfile.file
+        if not committed:
+            source.seek(0)
+        with Image.open(source) as image:
+            width, height = image.size
+            if image.getexif().get(EXIF_ORIENTATION) in (5, 6, 7, 8):
+                width, height = height, width
+        return width, height
+    except (OSError, ValueError):
+        return None, None
+    finally:
+        if not committed:
+            fieldfile.file.seek(0)
+
+
+def sources(fieldfile, width, height):
+    """Markup data for a stored image: ``{'fallback', 'sources', 'width', 'height'}``.
+
+    Only derivatives already on disk are listed; until they are rendered the
+    original is used.
+    """
+    data = {'fallback': fieldfile.url, 'sources': [], 'width': width, 'height': height}
+    if not width or not height:
+        return data
+    for fmt in settings.IMAGE_DERIVATIVE_FORMATS:
+        candidates = [
+            (size, derivative_url(fieldfile.name, size, fmt))
+            for size in derivative_widths(width)
+            if os.path.exists(derivative_path(fieldfile.name, size, fmt))
+        ]
+        if not candidates:
+            continue
+        srcset = ', '.join(f'{url} {size}w' for size, url in candidates)
+        if fmt == 'jpeg':
+            data['srcset'] = srcset
+            data['fallback'] = candidates[len(candidates) // 2][1]
+        else:
+            data['sources'].append({'type': CONTENT_TYPES[fmt], 'srcset': srcset})
+    return data
@@ -0,0 +1,322 @@
+"""Bulk import of car models, cars, clients and historical rentals.
+
+Input is CSV (with a header row) or JSON Lines and is read as a stream in
+chunks of ``IMPORT_CHUNK_SIZE`` rows.  Every row is validated with the same
+form the site uses for manual entry (minus foreign keys), foreign keys are
+resolved with one query per chunk, and the valid rows of a chunk are
+written with ``bulk_create`` inside one transaction.  Invalid rows do not
+stop the import; they are collected in an ``ImportReport`` with the line
+number and the form errors.
+
+``bulk_create`` bypasses ``save()`` and the model signals, so each importer
+takes over their work: invoices for rentals, lookup columns for clients,
+the search index for car models and cache and fragment invalidation at the
+end.  Column names follow the exports in ``main.exports``, so an export can
+be imported into another branch's database.
+"""
+import csv
+import json
+from abc import ABC, abstractmethod
+from itertools import islice
+
+from django import forms
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from . import billing, facets, fragments, search
+from .forms import CarImportForm, CarModelImportForm, ClientImportForm, RentalImportForm
+from .models import Car, CarModel, CarType, Client, Promo, Rental
+
+
+class ImportReport:
+    def __init__(self):
+        self.imported = 0
+        self.errors = []  # (line, {field: [messages]})
+
+    def add_error(self, line, errors):
+        self.errors.append((line, errors))
+
+    def write_csv(self, output):
+        writer = csv.writer(output)
+        writer.writerow(['line', 'field', 'message'])
+        for line, errors in self.errors:
+            for field, messages in errors.items():
+                for message in messages:
+                    writer.writerow([line, field, message])
+
+
+def read_rows(stream, fmt):
+    """Yield ``(line, data, error)`` for every record of a CSV or JSON Lines stream."""
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for data in reader:
+            yield reader.line_num, data, None
+        return
+    for line, text in enumerate(stream, 1):
+        if not text.strip():
+            continue
+        try:
+            data = json.loads(text)
+        except ValueError as exc:
+            yield line, None, f'Invalid JSON: {exc}'
+            continue
+        if not isinstance(data, dict):
+            yield line, None, 'Expected a JSON object'
+            continue
+        yield line, data, None
+
+
+def bind(form, data):
+    """Re-bind ``form`` to a new row, with a fresh instance for model forms."""
+    form.data = data
+    form.is_bound = True
+    form._errors = None
+    if isinstance(form, forms.BaseModelForm):
+        form.instance = form._meta.model()
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+class Importer(ABC):
+    form_class = None
+
+    def __init__(self, chunk_size=None, dry_run=False):
+        self.chunk_size = chunk_size or settings.IMPORT_CHUNK_SIZE
+        self.dry_run = dry_run
+        self.report = ImportReport()
+
+    def run(self, rows):
+        for chunk in chunked(rows, self.chunk_size):
+            self.import_chunk(chunk)
+        if self.report.imported and not self.dry_run:
+            self.finish()
+        return self.report
+
+    def import_chunk(self, chunk):
+        # Конструктор формы глубоко копирует поля и виджеты; одна форма на пачку,
+        # перепривязанная к каждой строке, в разы дешевле новой формы на строку
+        form = self.form_class()
+        valid = []
+        for line, data, error in chunk:
+            if error:
+                self.report.add_error(line, {'__all__': [error]})
+                continue
+            bind(form, data)
+            if not form.is_valid():
+                self.report.add_error(line, {field: list(messages) for field, messages in form.errors.items()})
+                continue
+            valid.append((line, data, form.cleaned_data, getattr(form, 'instance', None)))
+
+        refs = self.resolve([data for _, data, _, _ in valid])
+        instances = []
+        for line, data, cleaned_data, instance in valid:
+            try:
+                instances.append(self.build(instance, cleaned_data, data, refs))
+            except ValidationError as exc:
+                self.report.add_error(line, exc.message_dict)
+        if instances and not self.dry_run:
+            with transaction.atomic():
+                self.save(instances)
+        self.report.imported += len(instances)
+
+    def resolve(self, rows):
+        """Foreign keys and existing rows referenced by a chunk, fetched in bulk."""
+        return {}
+
+    @abstractmethod
+    def build(self, instance, cleaned_data, data, refs):
+        """Model instance for one valid row; raises ValidationError for bad references."""
+
+    @abstractmethod
+    def save(self, instances):
+        """Write the built instances of a chunk; called inside a transaction."""
+
+    def finish(self):
+        pass
+
+
+def values(rows, name):
+    return {str(row.get(name) or '').strip() for row in rows} - {''}
+
+
+def duplicate(field, message):
+    return ValidationError({field: [message]})
+
+
+class CarModelImporter(Importer):
+    """Columns: name, manufacturer, car_type (name), description."""
+    form_class = CarModelImportForm
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.seen = set()
+
+    def resolve(self, rows):
+        return {
+            'car_types': dict(CarType.objects.filter(name__in=values(rows, 'car_type')).values_list('name', 'pk')),
+            'existing': set(CarModel.objects.filter(
+                manufacturer__in=values(rows, 'manufacturer'), name__in=values(rows, 'name'),
+            ).values_list('manufacturer', 'name')),
+        }
+
+    def build(self, car_model, cleaned_data, data, refs):
+        car_model.car_type_id = refs['car_types'].get(str(data.get('car_type') or '').strip())
+        if car_model.car_type_id is None:
+            raise ValidationError({'car_type': ['Unknown car type.']})
+        key = (car_model.manufacturer, car_model.name)
+        if key in refs['existing'] or key in self.seen:
+            raise duplicate('name', 'This car model already exists.')
+        self.seen.add(key)
+        return car_model
+
+    def save(self, instances):
+        CarModel.objects.bulk_create(instances)
+        for car_model in instances:
+            search.index(car_model)
+
+    def finish(self):
+        fragments.bump(CarModel)
+
+
+class CarImporter(Importer):
+    """Columns: license_plate, manufacturer and model (names) or model_id, year, value, daily_rate, is_available."""
+    form_class = CarImportForm
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.seen = set()
+
+    def resolve(self, rows):
+        models = CarModel.objects.filter(manufacturer__in=values(rows, 'manufacturer'), name__in=values(rows, 'model'))
+        return {
+            'models': {(manufacturer, name): pk for pk, manufacturer, name
+                       in models.values_list('pk', 'manufacturer', 'name')},
+            'model_ids': set(CarModel.objects.filter(pk__in=[
+                int(pk) for pk in values(rows, 'model_id') if pk.isdigit()
+            ]).values_list('pk', flat=True)),
+            'existing': set(Car.objects.filter(
+                license_plate__in=values(rows, 'license_plate')
+            ).values_list('license_plate', flat=True)),
+        }
+
+    def build(self, car, cleaned_data, data, refs):
+        model_id = str(data.get('model_id') or '').strip()
+        if model_id:
+            car.model_id = int(model_id) if model_id.isdigit() and int(model_id) in refs['model_ids'] else None
+        else:
+            key = (str(data.get('manufacturer') or '').strip(), str(data.get('model') or '').strip())
+            car.model_id = refs['models'].get(key)
+        if car.model_id is None:
+            raise ValidationError({'model': ['Unknown car model.']})
+        if car.license_plate in refs['existing'] or car.license_plate in self.seen:
+            raise duplicate('license_plate', 'A car with this license plate already exists.')
+        self.seen.add(car.license_plate)
+        return car
+
+    def save(self, instances):
+        Car.objects.bulk_create(instances)
+        facets.add_cars(Car.objects.filter(pk__in=[car.pk for car in instances]))
+
+    def finish(self):
+        fragments.bump(Car)
+
+
+class ClientImporter(Importer):
+    """Columns: username, first_name, last_name, email, phone, birth_date, address.
+
+    Imported users get an unusable password and set their own through password reset.
+    """
+    form_class = ClientImportForm
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.seen = set()
+        self.password = make_password(None)
+
+    def resolve(self, rows):
+        return {'existing': set(User.objects.filter(
+            username__in=values(rows, 'username')
+        ).values_list('username', flat=True))}
+
+    def build(self, client, cleaned_data, data, refs):
+        username = cleaned_data['username']
+        if username in refs['existing'] or username in self.seen:
+            raise duplicate('username', 'A user with that username already exists.')
+        self.seen.add(username)
+        client.user = User(
+            username=username, first_name=cleaned_data['first_name'],
+            last_name=cleaned_data['last_name'], email=cleaned_data['email'], password=self.password,
+        )
+        return client
+
+    def save(self, instances):
+        users = User.objects.bulk_create([client.user for client in instances])
+        for client, user in zip(instances, users):
+            client.user = user
+            client.refresh_lookup_fields()
+        Client.objects.bulk_create(instances)
+
+    def finish(self):
+        fragments.bump(User)
+
+
+class RentalImporter(Importer):
+    """Completed or cancelled rentals.
+
+    Columns: license_plate, client_username, promo_code, start_date,
+    expected_return_date, actual_return_date, days, status, base_amount,
+    notes.  The final amount is computed by the billing engine; historical
+    penalties are not imported.
+    """
+    form_class = RentalImportForm
+
+    def resolve(self, rows):
+        cars = {}
+        for plate, pk in Car.objects.filter(license_plate__in=values(rows, 'license_plate')).values_list(
+                'license_plate', 'pk'):
+            # Номер не уникален в модели: неоднозначные номера отклоняем
+            cars[plate] = None if plate in cars else pk
+        return {
+            'cars': cars,
+            'clients': dict(Client.objects.filter(
+                user__username__in=values(rows, 'client_username')
+            ).values_list('user__username', 'pk')),
+            'promos': {promo.code: promo for promo in Promo.objects.filter(code__in=values(rows, 'promo_code'))},
+        }
+
+    def build(self, instance, cleaned_data, data, refs):
+        errors = {}
+        car_id = refs['cars'].get(str(data.get('license_plate') or '').strip())
+        if car_id is None:
+            errors['license_plate'] = ['Unknown or ambiguous license plate.']
+        client_id = refs['clients'].get(str(data.get('client_username') or '').strip())
+        if client_id is None:
+            errors['client_username'] = ['Unknown client.']
+        code = str(data.get('promo_code') or '').strip()
+        promo = refs['promos'].get(code)
+        if code and promo is None:
+            errors['promo_code'] = ['Unknown promo code.']
+        if errors:
+            raise ValidationError(errors)
+        rental = Rental(car_id=car_id, client_id=client_id, promo_code=promo, **cleaned_data)
+        rental.final_amount = billing.totals(billing.compute_lines(rental, penalties=[]))['total_amount']
+        return rental
+
+    def save(self, instances):
+        Rental.objects.bulk_create(instances)
+        billing.bulk_create_invoices(instances)
+
+
+IMPORTERS = {
+    'car_models': CarModelImporter,
+    'cars': CarImporter,
+    'clients': ClientImporter,
+    'rentals': RentalImporter,
+}
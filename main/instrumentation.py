@@ -0,0 +1,85 @@
+"""Per-request performance counters.
+
+``PerformanceMiddleware`` installs a ``RequestMetrics`` object for the
+duration of each request.  Cache lookups are reported by the cache backend
+(``main.tiered_cache.TieredCache``) through ``record_cache``, so every
+``cache.get``/``get_or_set`` made while handling the request is counted.
+Outbound HTTP calls made on the request thread are reported through
+``record_http``; when a request makes none, ``http`` reads 0.  Outside a
+request (shell, management commands, background threads such as the
+external content fetch executor) the record functions are no-ops.
+"""
+import contextvars
+import time
+
+_current = contextvars.ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.template_time = 0.0
+        self.http_calls = 0
+        self.http_time = 0.0
+
+    def db_wrapper(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_queries += 1
+            self.db_time += time.perf_counter() - start
+
+    def as_dict(self):
+        return {
+            'db_queries': self.db_queries,
+            'db_ms': round(self.db_time * 1000, 2),
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            'template_ms': round(self.template_time * 1000, 2),
+            'http_calls': self.http_calls,
+            'http_ms': round(self.http_time * 1000, 2),
+        }
+
+    def server_timing(self, total_time):
+        """Value for the ``Server-Timing`` response header."""
+        return ', '.join([
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.db_queries} queries"',
+            f'cache;desc="{self.cache_hits} hits, {self.cache_misses} misses"',
+            f'tpl;dur={self.template_time * 1000:.1f}',
+            f'http;dur={self.http_time * 1000:.1f};desc="{self.http_calls} calls"',
+            f'total;dur={total_time * 1000:.1f}',
+        ])
+
+
+def current_metrics():
+    return _current.get()
+
+
+def activate(metrics):
+    return _current.set(metrics)
+
+
+def deactivate(token):
+    _current.reset(token)
+
+
+def record_cache(hit):
+    metrics = _current.get()
+    if metrics is None:
+        return
+    if hit:
+        metrics.cache_hits += 1
+    else:
+        metrics.cache_misses += 1
+
+
+def record_http(duration):
+    metrics = _current.get()
+    if metrics is None:
+        return
+    metrics.http_calls += 1
+    metrics.http_time += duration
@@ -0,0 +1,92 @@
+"""Client lookup for the employee screens.
+
+Search runs against normalized copies kept on ``Client`` (``phone_digits``
+and the lowercased first name, last name and email, see ``Client.save``).
+Every term becomes a range condition ``column >= prefix AND column < next``
+instead of ``LIKE``/``icontains``, so SQLite answers it from the column
+index without scanning or joining ``auth_user``.  Results are ordered by
+primary key and paged with a keyset (``after``), never with ``OFFSET``.
+"""
+from django.db.models import Q
+
+from .models import Client, digits_only, normalize_text
+
+# Все телефоны хранятся в формате +375 (XX) XXX-XX-XX
+PHONE_COUNTRY_CODE = '375'
+MIN_PHONE_DIGITS = 2
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+
+
+def prefix_range(column, prefix):
+    """``Q`` matching values of ``column`` that start with ``prefix``."""
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return Q(**{f'{column}__gte': prefix, f'{column}__lt': upper})
+
+
+def phone_condition(digits):
+    condition = prefix_range('phone_digits', digits)
+    if not digits.startswith(PHONE_COUNTRY_CODE):
+        # «29 123» набирают без кода страны
+        condition |= prefix_range('phone_digits', PHONE_COUNTRY_CODE + digits)
+    return condition
+
+
+def word_condition(word):
+    return (prefix_range('first_name_lower', word) | prefix_range('last_name_lower', word)
+            | prefix_range('email_lower', word))
+
+
+def build_condition(text):
+    """``Q`` for a typed query, or None when there is nothing to search for.
+
+    A query with ``@`` is an email prefix, a query of digits and phone
+    punctuation is a phone prefix; otherwise each word must be a prefix of
+    the first name, last name or email ("ivan pet" finds Ivan Petrov and
+    Petrov Ivan alike).
+    """
+    text = normalize_text(text)
+    if not text:
+        return None
+    if '@' in text:
+        return prefix_range('email_lower', text)
+    digits = digits_only(text)
+    if digits and not any(char.isalpha() for char in text):
+        return phone_condition(digits) if len(digits) >= MIN_PHONE_DIGITS else None
+    condition = Q()
+    for word in text.split():
+        condition &= word_condition(word)
+    return condition
+
+
+def search(text, after=None, limit=DEFAULT_LIMIT):
+    """Clients matching ``text`` with ``pk > after``, ordered by pk."""
+    condition = build_condition(text)
+    if condition is None:
+        return Client.objects.none()
+    queryset = Client.objects.for_listing().filter(condition)
+    if after:
+        queryset = queryset.filter(pk__gt=after)
+    return queryset.order_by('pk')[:limit]
+
+
+def lookup(text, after=None, limit=DEFAULT_LIMIT):
+    """One page of typeahead results: ``{'results': [...], 'next_after': pk or None}``."""
+    limit = max(1, min(int(limit), MAX_LIMIT))
+    # Лишняя строка показывает, есть ли следующая страница, без COUNT(*)
+    clients = list(search(text, after, limit + 1))
+    has_next = len(clients) > limit
+    clients = clients[:limit]
+    return {
+        'results': [serialize(client) for client in clients],
+        'next_after': clients[-1].pk if has_next else None,
+    }
+
+
+def serialize(client):
+    return {
+        'id': client.pk,
+        'name': client.user.get_full_name() or client.user.username,
+        'phone': client.phone,
+        'email': client.user.email,
+    }
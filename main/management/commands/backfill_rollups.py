@@ -0,0 +1,55 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.models import Max, Min
+
+from main import rollups
+from main.models import Rental
+
+
+def aggregate_chunk(bounds):
+    low, high = bounds
+    return rollups.aggregate_rentals(Rental.objects.filter(pk__gte=low, pk__lt=high))
+
+
+class Command(BaseCommand):
+    help = 'Rebuild daily/weekly/monthly rental rollups from the Rental table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=50000,
+                            help='Number of rental ids aggregated per chunk')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Number of worker processes (1 aggregates in-process)')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        chunk_size = options['chunk_size']
+        bounds = Rental.objects.aggregate(low=Min('pk'), high=Max('pk'))
+        if bounds['low'] is None:
+            rollups.replace_rollups({}, {})
+            self.stdout.write(self.style.SUCCESS('No rentals found, rollups cleared.'))
+            return
+
+        chunks = [
+            (low, low + chunk_size)
+            for low in range(bounds['low'], bounds['high'] + 1, chunk_size)
+        ]
+        workers = min(options['workers'], len(chunks))
+        if workers > 1 and 'fork' in multiprocessing.get_all_start_methods():
+            # Дочерние процессы не должны делить открытое соединение с родителем
+            connections.close_all()
+            with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('fork')) as pool:
+                parts = list(pool.map(aggregate_chunk, chunks))
+        else:
+            parts = [aggregate_chunk(chunk) for chunk in chunks]
+
+        totals, type_counts = rollups.merge_aggregates(parts)
+        rollups.replace_rollups(totals, type_counts)
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {len(totals)} rollup buckets from {len(chunks)} chunks '
+            f'in {time.monotonic() - started:.2f}s.'
+        ))
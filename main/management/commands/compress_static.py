@@ -0,0 +1,29 @@
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from main import fileserving
+
+
+class Command(BaseCommand):
+    help = 'Write gzip (and brotli, if installed) variants of the files in STATIC_ROOT'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Rewrite variants that are up to date')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        files = written = 0
+        for directory, _, names in os.walk(settings.STATIC_ROOT):
+            for name in names:
+                if name.endswith(('.gz', '.br')):
+                    continue
+                files += 1
+                written += len(fileserving.compress_file(os.path.join(directory, name), force=options['force']))
+        if fileserving.brotli is None:
+            self.stdout.write('brotli is not installed, only gzip variants are written')
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote {written} compressed variants for {files} files in {time.monotonic() - started:.2f}s.'
+        ))
@@ -0,0 +1,113 @@
+import os
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from main import fragments, images, storage
+from main.models import Article, Car, Employee, StoredFile
+
+IMAGE_MODELS = [(Car, 'image'), (Article, 'image'), (Employee, 'photo')]
+
+
+def move_derivatives(old, new):
+    """Reuse the derivatives rendered for ``old`` under the content name ``new``."""
+    old_base = os.path.join(settings.IMAGE_DERIVATIVE_ROOT, os.path.splitext(old)[0])
+    new_base = os.path.join(settings.IMAGE_DERIVATIVE_ROOT, os.path.splitext(new)[0])
+    for path in images.derivative_files(old):
+        target = new_base + path[len(old_base):]
+        if os.path.exists(target):
+            os.remove(path)
+        else:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.replace(path, target)
+
+
+class Command(BaseCommand):
+    help = ('Move car, article and employee photos into the content-addressed storage, '
+            'merge duplicates and recount file references')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--delete-originals', action='store_true',
+                            help='Delete the moved files from their old location')
+        parser.add_argument('--prune', action='store_true',
+                            help='Delete stored files no photo refers to')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        moved, missing, originals = 0, 0, set()
+        names = {}  # старое имя -> имя по хешу, файл читается один раз
+        for model, field in IMAGE_MODELS:
+            # update() не заполняет auto_now, а по updated_at страницы отдают Last-Modified
+            touched = {'updated_at': timezone.now()} if any(
+                f.name == 'updated_at' for f in model._meta.concrete_fields) else {}
+            for pk, name in model.objects.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True}).values_list(
+                    'pk', field).iterator(chunk_size=500):
+                if storage.is_content_name(name):
+                    continue
+                if name not in names:
+                    if not default_storage.exists(name):
+                        missing += 1
+                        self.stderr.write(f'{model.__name__} {pk}: {name} is missing')
+                        continue
+                    with default_storage.open(name) as source:
+                        names[name] = default_storage.save(name, File(source, name=name))
+                    move_derivatives(name, names[name])
+                    originals.add(name)
+                model.objects.filter(pk=pk).update(**{field: names[name]}, **touched)
+                moved += 1
+
+        if moved:
+            fragments.reset()  # имена фото изменены через update(), в обход сигналов
+        stored = self.recount()
+        deleted = 0
+        if options['delete_originals']:
+            for name in originals:
+                default_storage.delete(name)
+                deleted += 1
+        if options['prune']:
+            deleted += self.prune(stored)
+
+        sizes = StoredFile.objects.values_list('size', flat=True)
+        self.stdout.write(self.style.SUCCESS(
+            f'Moved {moved} photos into {len(set(names.values()))} stored files ({missing} missing), '
+            f'{len(stored)} files with {sum(stored.values())} references, {sum(sizes)} bytes, '
+            f'{deleted} files deleted in {time.monotonic() - started:.2f}s.'
+        ))
+
+    def recount(self):
+        """Rebuild ``StoredFile`` from the photos that refer to each stored file."""
+        counts = Counter()
+        for model, field in IMAGE_MODELS:
+            counts.update(name for name in model.objects.values_list(field, flat=True) if storage.is_content_name(name))
+        with transaction.atomic():
+            existing = {stored.name: stored for stored in StoredFile.objects.all()}
+            changed, created = [], []
+            for name, count in counts.items():
+                stored = existing.pop(name, None)
+                if stored is None:
+                    created.append(StoredFile(name=name, size=storage.stored_size(name), ref_count=count))
+                elif stored.ref_count != count:
+                    stored.ref_count = count
+                    changed.append(stored)
+            StoredFile.objects.bulk_create(created, batch_size=500)
+            StoredFile.objects.bulk_update(changed, ['ref_count'], batch_size=500)
+            StoredFile.objects.filter(pk__in=[stored.pk for stored in existing.values()]).delete()
+        return counts
+
+    def prune(self, referenced):
+        root = default_storage.path(settings.MEDIA_CONTENT_DIR)
+        deleted = 0
+        for directory, _, files in os.walk(root):
+            for filename in files:
+                name = os.path.relpath(os.path.join(directory, filename), default_storage.location).replace(os.sep, '/')
+                if name not in referenced and not filename.endswith('.upload'):
+                    default_storage.delete(name)
+                    images.remove_derivatives(name)
+                    deleted += 1
+        return deleted
@@ -0,0 +1,36 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from main import exports
+
+
+class Command(BaseCommand):
+    help = 'Stream rentals, clients or cars to a CSV or JSON Lines file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(exports.EXPORTS))
+        parser.add_argument('--format', choices=sorted(exports.FORMATS), default='csv')
+        parser.add_argument('--from', dest='date_from', type=date.fromisoformat,
+                            help='First day to include (YYYY-MM-DD)')
+        parser.add_argument('--to', dest='date_to', type=date.fromisoformat,
+                            help='Last day to include (YYYY-MM-DD)')
+        parser.add_argument('--output', help='File to write; defaults to stdout')
+        parser.add_argument('--chunk-size', type=int, default=None,
+                            help='Rows fetched from the database per batch')
+
+    def handle(self, *args, **options):
+        if options['date_from'] and options['date_to'] and options['date_from'] > options['date_to']:
+            raise CommandError('--from is after --to')
+        lines = exports.stream(options['kind'], options['format'], options['date_from'],
+                               options['date_to'], chunk_size=options['chunk_size'])
+        if not options['output']:
+            for line in lines:
+                self.stdout.write(line, ending='')
+            return
+        count = -1 if options['format'] == 'csv' else 0  # строка заголовков CSV не считается
+        with open(options['output'], 'w', newline='', encoding='utf-8') as output:
+            for line in lines:
+                output.write(line)
+                count += 1
+        self.stdout.write(self.style.SUCCESS(f'Exported {count} {options["kind"]} to {options["output"]}.'))
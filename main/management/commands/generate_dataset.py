@@ -0,0 +1,53 @@
+import os
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth.models import User
+
+from main import datagen
+
+
+class Command(BaseCommand):
+    help = 'Generate a deterministic synthetic dataset (cars, clients, rentals with penalties and promos)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cars', type=int, default=1000)
+        parser.add_argument('--clients', type=int, default=10000)
+        parser.add_argument('--rentals', type=int, default=50000)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--chunk-size', type=int, default=5000,
+                            help='Rows generated and inserted per chunk')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Number of generator processes (1 generates in-process)')
+        parser.add_argument('--clear', action='store_true',
+                            help='Delete previously generated synthetic data first')
+        parser.add_argument('--skip-rollups', action='store_true',
+                            help='Do not rebuild rental rollups afterwards')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        if options['clear']:
+            # Сводки пересчитываются после генерации (или пропускаются по --skip-rollups)
+            datagen.clear_synthetic_data(rebuild_rollups=False)
+        elif User.objects.filter(username__startswith=datagen.USERNAME_PREFIX).exists():
+            raise CommandError('Synthetic data already exists, use --clear to regenerate it')
+        if options['rentals'] and not (options['cars'] and options['clients']):
+            raise CommandError('Rentals need at least one car and one client')
+
+        verbose = options['verbosity'] > 1
+        generator = datagen.DatasetGenerator(
+            seed=options['seed'],
+            chunk_size=options['chunk_size'],
+            workers=options['workers'],
+            log=self.stdout.write if verbose else None,
+        )
+        generator.generate(cars=options['cars'], clients=options['clients'], rentals=options['rentals'])
+        self.stdout.write(
+            f'Generated {options["cars"]} cars, {options["clients"]} clients and '
+            f'{options["rentals"]} rentals in {time.monotonic() - started:.2f}s.'
+        )
+
+        if not options['skip_rollups']:
+            call_command('backfill_rollups', workers=options['workers'], stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS('Synthetic dataset is ready.'))
@@ -0,0 +1,76 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from main import fragments, images
+from main.models import Article, Car, Employee
+
+IMAGE_MODELS = [(Car, 'image'), (Article, 'image'), (Employee, 'photo')]
+
+
+def render_job(job):
+    source, targets = job
+    try:
+        return len(images.render(source, targets, settings.IMAGE_DERIVATIVE_QUALITY)), None
+    except Exception as exc:
+        return 0, f'{source}: {exc}'
+
+
+class Command(BaseCommand):
+    help = 'Record dimensions and render WebP/JPEG derivatives for existing car, article and employee photos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Number of render processes (1 renders in-process)')
+        parser.add_argument('--force', action='store_true',
+                            help='Re-render derivatives that already exist')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        jobs, missing, recorded = [], 0, 0
+        for model, field in IMAGE_MODELS:
+            width_field, height_field = images.dimension_fields(field)
+            changed = []
+            for instance in model.objects.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True}).only(
+                    'pk', field, width_field, height_field).iterator(chunk_size=500):
+                fieldfile = getattr(instance, field)
+                if not os.path.exists(fieldfile.path):
+                    missing += 1
+                    continue
+                if getattr(instance, width_field) is None or options['force']:
+                    width, height = images.read_dimensions(fieldfile)
+                    setattr(instance, width_field, width)
+                    setattr(instance, height_field, height)
+                    changed.append(instance)
+                width = getattr(instance, width_field)
+                targets = images.pending_targets(fieldfile.name, width, options['force']) if width else []
+                if targets:
+                    jobs.append((fieldfile.path, targets))
+            model.objects.bulk_update(changed, [width_field, height_field], batch_size=500)
+            recorded += len(changed)
+            self.stdout.write(f'{model._meta.verbose_name_plural}: {len(changed)} dimensions recorded')
+
+        workers = min(options['workers'], len(jobs))
+        if workers > 1 and 'fork' in multiprocessing.get_all_start_methods():
+            connections.close_all()
+            with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('fork')) as pool:
+                results = list(pool.map(render_job, jobs))
+        else:
+            results = [render_job(job) for job in jobs]
+
+        # bulk_update и новые производные (srcset) обходят сигналы моделей
+        if recorded or any(count for count, _ in results):
+            fragments.reset()
+
+        for _, error in results:
+            if error:
+                self.stderr.write(error)
+        self.stdout.write(self.style.SUCCESS(
+            f'Rendered {sum(count for count, _ in results)} derivatives for {len(jobs)} images '
+            f'({missing} files missing) in {time.monotonic() - started:.2f}s.'
+        ))
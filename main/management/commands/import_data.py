@@ -0,0 +1,56 @@
+import os
+import sys
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from main import imports
+
+MAX_PRINTED_ERRORS = 20
+
+
+class Command(BaseCommand):
+    help = 'Bulk import car models, cars, clients or historical rentals from CSV or JSON Lines'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(imports.IMPORTERS))
+        parser.add_argument('path', help="Input file, or '-' for stdin")
+        parser.add_argument('--format', choices=['csv', 'jsonl'],
+                            help='Input format; guessed from the file extension by default')
+        parser.add_argument('--chunk-size', type=int, default=None,
+                            help='Rows validated and inserted per transaction')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Validate only, write nothing')
+        parser.add_argument('--errors', help='Write the per-row error report to this CSV file')
+        parser.add_argument('--skip-rollups', action='store_true',
+                            help='Do not rebuild rental rollups after importing rentals')
+
+    def handle(self, *args, **options):
+        fmt = options['format'] or ('jsonl' if options['path'].endswith(('.jsonl', '.ndjson')) else 'csv')
+        if options['path'] != '-' and not os.path.exists(options['path']):
+            raise CommandError(f'{options["path"]} does not exist')
+
+        started = time.monotonic()
+        importer = imports.IMPORTERS[options['kind']](chunk_size=options['chunk_size'], dry_run=options['dry_run'])
+        if options['path'] == '-':
+            report = importer.run(imports.read_rows(sys.stdin, fmt))
+        else:
+            with open(options['path'], newline='', encoding='utf-8-sig') as stream:
+                report = importer.run(imports.read_rows(stream, fmt))
+
+        verb = 'Validated' if options['dry_run'] else 'Imported'
+        self.stdout.write(
+            f'{verb} {report.imported} {options["kind"]}, {len(report.errors)} rows rejected '
+            f'in {time.monotonic() - started:.2f}s.'
+        )
+        for line, errors in report.errors[:MAX_PRINTED_ERRORS]:
+            messages = '; '.join(f'{field}: {" ".join(text)}' for field, text in errors.items())
+            self.stderr.write(f'line {line}: {messages}')
+        if options['errors']:
+            with open(options['errors'], 'w', newline='', encoding='utf-8') as output:
+                report.write_csv(output)
+
+        if options['kind'] == 'rentals' and report.imported and not options['dry_run'] \
+                and not options['skip_rollups']:
+            call_command('backfill_rollups', stdout=self.stdout)
@@ -0,0 +1,21 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from main import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index for car models, articles and FAQ'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000,
+                            help='Rows read and inserted per batch')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        log = self.stdout.write if options['verbosity'] > 1 else None
+        total = search.rebuild(chunk_size=options['chunk_size'], log=log)
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {total} documents in {time.monotonic() - started:.2f}s.'
+        ))
@@ -0,0 +1,99 @@
+import json
+import os
+import platform
+from datetime import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+
+from main import benchmarks
+
+
+class Command(BaseCommand):
+    help = 'Run the hot-path benchmarks on a throwaway database and compare them with the stored baseline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', action='append', dest='scales', choices=list(benchmarks.SCALES),
+                            help='Dataset scale to benchmark (repeatable, default: small and medium)')
+        parser.add_argument('--benchmark', action='append', dest='names', choices=list(benchmarks.BENCHMARKS),
+                            help='Benchmark to run (repeatable, default: all)')
+        parser.add_argument('--iterations', type=int, default=30)
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Processes used to generate the datasets')
+        parser.add_argument('--baseline', default=settings.BENCHMARK_BASELINE)
+        parser.add_argument('--tolerance', type=float, default=settings.BENCHMARK_TOLERANCE)
+        parser.add_argument('--output', help='Also write the results to this JSON file')
+        parser.add_argument('--update-baseline', action='store_true',
+                            help='Store the results as the new baseline instead of comparing')
+
+    def handle(self, *args, **options):
+        scales = options['scales'] or ['small', 'medium']
+        log = self.stdout.write if options['verbosity'] > 1 else None
+
+        setup_test_environment(debug=False)
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            results = {}
+            for scale in scales:
+                self.stdout.write(f'Seeding {scale} dataset {benchmarks.SCALES[scale]}...')
+                benchmarks.seed(benchmarks.SCALES[scale], seed=options['seed'], workers=options['workers'])
+                results[scale] = benchmarks.run_all(
+                    names=options['names'],
+                    iterations=options['iterations'], warmup=options['warmup'], log=log,
+                )
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        self.report(results)
+        if options['output']:
+            self.write_json(options['output'], results)
+
+        if options['update_baseline']:
+            self.write_json(options['baseline'], self.merge_baseline(options['baseline'], results))
+            self.stdout.write(self.style.SUCCESS(f'Baseline written to {options["baseline"]}'))
+            return
+
+        if not os.path.exists(options['baseline']):
+            self.stdout.write(self.style.WARNING('No baseline found, run with --update-baseline to create one.'))
+            return
+        with open(options['baseline']) as f:
+            baseline = json.load(f)['results']
+        regressions = benchmarks.compare(
+            results, baseline, options['tolerance'], settings.BENCHMARK_NOISE_FLOOR_MS
+        )
+        if regressions:
+            raise CommandError('Performance regressions:\n  ' + '\n  '.join(regressions))
+        self.stdout.write(self.style.SUCCESS('No regressions against the baseline.'))
+
+    def report(self, results):
+        self.stdout.write(f'{"scale":<8} {"benchmark":<24} {"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9} {"queries":>8}')
+        for scale, cases in results.items():
+            for name, result in cases.items():
+                self.stdout.write(
+                    f'{scale:<8} {name:<24} {result["p50_ms"]:>9.2f} {result["p95_ms"]:>9.2f} '
+                    f'{result["p99_ms"]:>9.2f} {result["queries"]:>8}'
+                )
+
+    def merge_baseline(self, path, results):
+        merged = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                merged = json.load(f)['results']
+        for scale, cases in results.items():
+            merged.setdefault(scale, {}).update(cases)
+        return merged
+
+    def write_json(self, path, results):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump({
+                'created': datetime.now().isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'machine': platform.machine(),
+                'results': results,
+            }, f, indent=2, sort_keys=True)
+            f.write('\n')
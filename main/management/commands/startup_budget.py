@@ -0,0 +1,67 @@
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+STARTUP_SCRIPT = 'import django; django.setup(); {imports}'
+
+
+def parse_importtime(output):
+    """Parse ``python -X importtime`` output into ``{module: (self_us, cumulative_us)}``."""
+    timings = {}
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, module = line[len('import time:'):].split('|')
+        timings[module.strip()] = (int(self_us), int(cumulative_us))
+    return timings
+
+
+class Command(BaseCommand):
+    help = 'Measure cold-start import time and fail when it exceeds the startup budget'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--budget-ms', type=float, default=None,
+                            help='Total import time budget (defaults to STARTUP_IMPORT_BUDGET_MS)')
+        parser.add_argument('--top', type=int, default=15,
+                            help='Number of slowest modules to report')
+        parser.add_argument('--module', action='append', dest='modules',
+                            help='Module imported after django.setup() (repeatable)')
+
+    def handle(self, *args, **options):
+        budget_ms = options['budget_ms'] or settings.STARTUP_IMPORT_BUDGET_MS
+        modules = options['modules'] or settings.STARTUP_IMPORT_MODULES
+        script = STARTUP_SCRIPT.format(imports='; '.join(f'import {module}' for module in modules))
+
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get(
+            'DJANGO_SETTINGS_MODULE', 'car_rental.settings'
+        ))
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', script],
+            capture_output=True, text=True, env=env, cwd=settings.BASE_DIR,
+        )
+        if result.returncode != 0:
+            raise CommandError(f'Startup failed:\n{result.stderr[-2000:]}')
+
+        timings = parse_importtime(result.stderr)
+        total_ms = sum(self_us for self_us, _ in timings.values()) / 1000
+
+        self.stdout.write(f'{"cumulative ms":>14} {"self ms":>9}  module')
+        slowest = sorted(timings.items(), key=lambda item: item[1][1], reverse=True)
+        for module, (self_us, cumulative_us) in slowest[:options['top']]:
+            self.stdout.write(f'{cumulative_us / 1000:>14.1f} {self_us / 1000:>9.1f}  {module}')
+        self.stdout.write(f'Total import time: {total_ms:.1f} ms (budget {budget_ms:.0f} ms)')
+
+        forbidden = [
+            module for module in settings.STARTUP_FORBIDDEN_IMPORTS
+            if module in timings
+        ]
+        if forbidden:
+            raise CommandError(
+                f'Modules that must be imported lazily were loaded at startup: {", ".join(forbidden)}'
+            )
+        if total_ms > budget_ms:
+            raise CommandError(f'Startup import time {total_ms:.1f} ms exceeds budget of {budget_ms:.0f} ms')
+        self.stdout.write(self.style.SUCCESS('Startup import time is within budget.'))
@@ -0,0 +1,129 @@
+import json
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+
+from . import instrumentation, pagecache, principal
+
+logger = logging.getLogger('main.performance')
+page_cache_logger = logging.getLogger('main.pagecache')
+
+
+class PerformanceMiddleware:
+    """Measure each request and report it as ``Server-Timing`` and a log line.
+
+    The log line is a JSON object keyed by the resolved URL name
+    (``main:car_list``), so regressions can be found by grepping production
+    logs per view.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = instrumentation.RequestMetrics()
+        token = instrumentation.activate(metrics)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics.db_wrapper))
+                response = self.get_response(request)
+        finally:
+            instrumentation.deactivate(token)
+        total_time = time.perf_counter() - start
+
+        response['Server-Timing'] = metrics.server_timing(total_time)
+        match = getattr(request, 'resolver_match', None)
+        record = {
+            'url_name': match.view_name if match else None,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': round(total_time * 1000, 2),
+            **metrics.as_dict(),
+        }
+        logger.info(json.dumps(record), extra={'performance': record})
+        return response
+
+    def process_template_response(self, request, response):
+        # Рендеринг TemplateResponse начинается сразу после этого хука
+        metrics = instrumentation.current_metrics()
+        if metrics is not None:
+            started = time.perf_counter()
+
+            def finish_render(rendered):
+                metrics.template_time += time.perf_counter() - started
+
+            response.add_post_render_callback(finish_render)
+        return response
+
+
+class PrincipalMiddleware:
+    """Set ``request.principal`` (``main.principal``).
+
+    Goes after ``AuthenticationMiddleware``.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.principal = principal.Principal(request.user)
+        return self.get_response(request)
+
+
+class AnonymousPageCacheMiddleware:
+    """Serve ``PAGE_CACHE_VIEWS`` to anonymous visitors from the cache.
+
+    Goes last in ``MIDDLEWARE``: ``process_view`` needs the resolved URL name,
+    and a cached page skips the view together with the middleware after it.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        page = getattr(request, 'cached_page', None)
+        if page is None or response.has_header(pagecache.STATUS_HEADER):
+            return response
+        try:
+            if response.status_code >= 500 and page.entry is not None:
+                page_cache_logger.warning('Serving stale %s after status %s', request.path, response.status_code)
+                return page.response('STALE')
+            page.store(response)
+        finally:
+            page.unlock()
+        response[pagecache.STATUS_HEADER] = 'MISS'
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        dependencies = settings.PAGE_CACHE_VIEWS.get(request.resolver_match.view_name)
+        if dependencies is None or request.method not in ('GET', 'HEAD') or not pagecache.is_anonymous(request):
+            return None
+        page = pagecache.CachedPage(request, dependencies)
+        if page.is_fresh:
+            # ETag и Last-Modified сохранены вместе со страницей (main.conditional)
+            response = page.response('HIT')
+            return get_conditional_response(
+                request, etag=response.get('ETag'),
+                last_modified=parse_http_date_safe(response.get('Last-Modified', '')), response=response,
+            )
+        if not page.lock() and page.entry is not None:
+            return page.response('STALE')  # страницу уже перерисовывает другой процесс
+        request.cached_page = page
+        return None
+
+    def process_exception(self, request, exception):
+        page = getattr(request, 'cached_page', None)
+        if page is None or page.entry is None:
+            return None
+        page.unlock()
+        page_cache_logger.warning('Serving stale %s after %r', request.path, exception)
+        return page.response('STALE')
@@ -0,0 +1,51 @@
+# Generated by Django 5.0.1 on 2026-10-17 04:03
+
+import django.db.models.deletion
+from datetime import datetime, timedelta
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def reserve_active_rentals(apps, schema_editor):
+    Rental = apps.get_model('main', 'Rental')
+    RentalSlot = apps.get_model('main', 'RentalSlot')
+    today = timezone.localdate()
+    slots = []
+    for rental in Rental.objects.filter(status='active').iterator():
+        start = timezone.localtime(rental.start_date)
+        end = timezone.localtime(rental.expected_return_date)
+        last = end.date() + timedelta(days=1) if end.time() != datetime.min.time() else end.date()
+        day = max(start.date(), today)
+        while day < last:
+            slots.append(RentalSlot(car_id=rental.car_id, rental_id=rental.pk, day=day))
+            day += timedelta(days=1)
+    # Уже существующие пересечения нельзя исправить задним числом — пропускаем их
+    RentalSlot.objects.bulk_create(slots, batch_size=500, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0009_remove_car_last_maintenance_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RentalSlot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('car', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='main.car')),
+                ('rental', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='slots', to='main.rental')),
+            ],
+            options={
+                'verbose_name': 'Бронь на день',
+                'verbose_name_plural': 'Брони на день',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='rentalslot',
+            constraint=models.UniqueConstraint(fields=('car', 'day'), name='unique_car_day_slot'),
+        ),
+        migrations.RunPython(reserve_active_rentals, migrations.RunPython.noop),
+    ]
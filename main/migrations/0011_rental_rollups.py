@@ -0,0 +1,50 @@
+# Generated by Django 5.0.1 on 2026-10-17 04:05
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0010_rentalslot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RentalRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('day', 'Day'), ('week', 'Week'), ('month', 'Month')], max_length=5)),
+                ('bucket_start', models.DateField()),
+                ('rental_count', models.IntegerField(default=0)),
+                ('total_days', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+            ],
+            options={
+                'ordering': ['period', 'bucket_start'],
+            },
+        ),
+        migrations.CreateModel(
+            name='CarTypeRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('day', 'Day'), ('week', 'Week'), ('month', 'Month')], max_length=5)),
+                ('bucket_start', models.DateField()),
+                ('rental_count', models.IntegerField(default=0)),
+                ('car_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='main.cartype')),
+            ],
+            options={
+                'ordering': ['period', 'bucket_start'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='rentalrollup',
+            constraint=models.UniqueConstraint(fields=('period', 'bucket_start'), name='unique_rental_rollup_bucket'),
+        ),
+        migrations.AddConstraint(
+            model_name='cartyperollup',
+            constraint=models.UniqueConstraint(fields=('period', 'bucket_start', 'car_type'), name='unique_car_type_rollup_bucket'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+from django.db import migrations
+
+
+CREATE_INDEX = """
+CREATE VIRTUAL TABLE main_search_index USING fts5(
+    kind UNINDEXED,
+    object_id UNINDEXED,
+    title,
+    body,
+    tokenize = 'unicode61 remove_diacritics 2',
+    prefix = '2 3'
+)
+"""
+
+POPULATE_INDEX = [
+    """INSERT INTO main_search_index (kind, object_id, title, body)
+       SELECT 'car_model', id, manufacturer || ' ' || name, description FROM main_carmodel""",
+    """INSERT INTO main_search_index (kind, object_id, title, body)
+       SELECT 'article', id, title, content FROM main_article""",
+    """INSERT INTO main_search_index (kind, object_id, title, body)
+       SELECT 'faq', id, question, answer FROM main_faq""",
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0012_invoices'),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE_INDEX, reverse_sql='DROP TABLE main_search_index'),
+        migrations.RunSQL(POPULATE_INDEX, reverse_sql=migrations.RunSQL.noop),
+    ]
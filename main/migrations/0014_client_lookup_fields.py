@@ -0,0 +1,53 @@
+# Generated by Django 5.0.1 on 2026-10-17 04:40
+
+import re
+
+from django.db import migrations, models
+
+FIELDS = ['phone_digits', 'first_name_lower', 'last_name_lower', 'email_lower']
+
+
+def fill_lookup_fields(apps, schema_editor):
+    Client = apps.get_model('main', 'Client')
+    batch = []
+    for client in Client.objects.select_related('user').order_by('pk').iterator(chunk_size=2000):
+        client.phone_digits = re.sub(r'\D', '', client.phone or '')
+        client.first_name_lower = (client.user.first_name or '').strip().lower()
+        client.last_name_lower = (client.user.last_name or '').strip().lower()
+        client.email_lower = (client.user.email or '').strip().lower()
+        batch.append(client)
+        if len(batch) >= 2000:
+            Client.objects.bulk_update(batch, FIELDS)
+            batch = []
+    Client.objects.bulk_update(batch, FIELDS)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0013_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='client',
+            name='email_lower',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=254),
+        ),
+        migrations.AddField(
+            model_name='client',
+            name='first_name_lower',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=150),
+        ),
+        migrations.AddField(
+            model_name='client',
+            name='last_name_lower',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=150),
+        ),
+        migrations.AddField(
+            model_name='client',
+            name='phone_digits',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=20),
+        ),
+        migrations.RunPython(fill_lookup_fields, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.0.1 on 2026-10-17 04:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0014_client_lookup_fields'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='rental',
+            index=models.Index(fields=['start_date', 'id'], name='rental_start_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rental',
+            index=models.Index(fields=['client', 'start_date', 'id'], name='rental_client_start_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rental',
+            index=models.Index(fields=['status', 'start_date', 'id'], name='rental_status_start_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['created_at', 'id'], name='review_created_id_idx'),
+        ),
+        # Список клиентов сортируется по auth_user.date_joined: индекс на чужую таблицу создаём вручную
+        migrations.RunSQL(
+            'CREATE INDEX IF NOT EXISTS main_user_joined_id_idx ON auth_user (date_joined, id)',
+            'DROP INDEX IF EXISTS main_user_joined_id_idx',
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.0.1 on 2026-10-17 06:07
+
+from collections import Counter
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_facets(apps, schema_editor):
+    Car = apps.get_model('main', 'Car')
+    FacetCount = apps.get_model('main', 'FacetCount')
+    counts, labels = Counter(), {}
+    rows = Car.objects.values('model__car_type_id', 'model__car_type__name', 'model__manufacturer', 'year',
+                              'daily_rate').annotate(count=Count('pk')).order_by().values_list(
+        'model__car_type_id', 'model__car_type__name', 'model__manufacturer', 'year', 'daily_rate', 'count')
+    for type_id, type_name, manufacturer, year, rate, count in rows:
+        labels[('type', str(type_id))] = type_name
+        for facet, value in (('type', type_id), ('manufacturer', manufacturer), ('year', year),
+                             ('rate', int(Decimal(rate) * 100))):
+            counts[(facet, str(value))] += count
+    FacetCount.objects.bulk_create([
+        FacetCount(facet=facet, value=value, label=labels.get((facet, value), ''), count=count)
+        for (facet, value), count in counts.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0018_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FacetCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('facet', models.CharField(choices=[('type', 'Car type'), ('manufacturer', 'Manufacturer'), ('year', 'Year'), ('rate', 'Daily rate, cents')], max_length=12)),
+                ('value', models.CharField(max_length=100)),
+                ('label', models.CharField(blank=True, max_length=100)),
+                ('count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='facetcount',
+            constraint=models.UniqueConstraint(fields=('facet', 'value'), name='unique_facet_value'),
+        ),
+        migrations.RunPython(count_facets, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,57 @@
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import migrations
+from django.utils import timezone
+
+PERIODS = ('day', 'week', 'month')
+
+
+def bucket_start(period, day):
+    if period == 'week':
+        return day - timedelta(days=day.weekday())
+    if period == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def fill_rollups(apps, schema_editor):
+    # Копия main.rollups.rebuild на исторических моделях: 0011 создала пустые таблицы
+    Rental = apps.get_model('main', 'Rental')
+    RentalRollup = apps.get_model('main', 'RentalRollup')
+    CarTypeRollup = apps.get_model('main', 'CarTypeRollup')
+    totals = defaultdict(lambda: [0, 0, Decimal('0.00')])
+    type_counts = defaultdict(int)
+    rows = Rental.objects.values_list('start_date', 'days', 'final_amount', 'car__model__car_type_id')
+    for start, days, amount, car_type_id in rows.iterator(chunk_size=2000):
+        day = timezone.localtime(start).date() if timezone.is_aware(start) else start.date()
+        for period in PERIODS:
+            key = (period, bucket_start(period, day))
+            bucket = totals[key]
+            bucket[0] += 1
+            bucket[1] += days
+            bucket[2] += amount or 0
+            if car_type_id is not None:
+                type_counts[key + (car_type_id,)] += 1
+    RentalRollup.objects.all().delete()
+    CarTypeRollup.objects.all().delete()
+    RentalRollup.objects.bulk_create([
+        RentalRollup(period=period, bucket_start=start, rental_count=count, total_days=days, revenue=revenue)
+        for (period, start), (count, days, revenue) in totals.items()
+    ], batch_size=1000)
+    CarTypeRollup.objects.bulk_create([
+        CarTypeRollup(period=period, bucket_start=start, car_type_id=car_type_id, rental_count=count)
+        for (period, start, car_type_id), count in type_counts.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0019_facet_counts'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_rollups, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,4 @@
+import re
 from django.db import models
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator, RegexValidator
@@ -9,15 +10,47 @@ from decimal import Decimal
 class CarType(models.Model):
     name = models.CharField(max_length=50)
     description = models.TextField()
+    # Для Last-Modified (main/conditional.py)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return self.name
 
+class CarQuerySet(models.QuerySet):
+    def for_catalog(self):
+        """Cars with the model and type shown on catalog cards and detail pages."""
+        return self.select_related('model__car_type')
+
+    def for_choices(self):
+        """Only the columns needed to label a car in a form dropdown."""
+        return self.select_related('model').only(
+            'license_plate', 'daily_rate', 'model__name', 'model__manufacturer'
+        )
+
+class ClientQuerySet(models.QuerySet):
+    def for_listing(self):
+        return self.select_related('user')
+
+class RentalQuerySet(models.QuerySet):
+    def for_listing(self):
+        """Rentals with the car, model and client user rendered in rental tables."""
+        return self.select_related('car__model', 'client__user')
+
+    def for_detail(self):
+        return self.select_related(
+            'car__model__car_type', 'client__user', 'promo_code', 'invoice'
+        ).prefetch_related('penalties')
+
+class ReviewQuerySet(models.QuerySet):
+    def for_listing(self):
+        return self.select_related('client__user')
+
 class CarModel(models.Model):
     name = models.CharField(max_length=50)
     manufacturer = models.CharField(max_length=50)
     car_type = models.ForeignKey(CarType, on_delete=models.CASCADE)
     description = models.TextField()
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return f"{self.manufacturer} {self.name}"
@@ -30,6 +63,12 @@ class Car(models.Model):
     daily_rate = models.DecimalField(max_digits=6, decimal_places=2)
     is_available = models.BooleanField(default=True)
     image = models.ImageField(upload_to='cars/', null=True, blank=True)
+    # Размеры оригинала для responsive_image (main/images.py)
+    image_width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    image_height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    objects = CarQuerySet.as_manager()
     
     def __str__(self):
         return f"{self.model} ({self.license_plate})"
@@ -64,6 +103,12 @@ class CarPark(models.Model):
     def __str__(self):
         return self.name
 
+def digits_only(value):
+    return re.sub(r'\D', '', value or '')
+
+def normalize_text(value):
+    return (value or '').strip().lower()
+
 class Client(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     phone = models.CharField(max_length=20, validators=[
@@ -74,6 +119,27 @@ class Client(models.Model):
     ])
     birth_date = models.DateField()
     address = models.TextField()
+    # Нормализованные копии для поиска по префиксу (см. main/lookup.py)
+    phone_digits = models.CharField(max_length=20, blank=True, db_index=True, editable=False)
+    first_name_lower = models.CharField(max_length=150, blank=True, db_index=True, editable=False)
+    last_name_lower = models.CharField(max_length=150, blank=True, db_index=True, editable=False)
+    email_lower = models.CharField(max_length=254, blank=True, db_index=True, editable=False)
+
+    LOOKUP_FIELDS = ['phone_digits', 'first_name_lower', 'last_name_lower', 'email_lower']
+
+    objects = ClientQuerySet.as_manager()
+
+    def refresh_lookup_fields(self):
+        self.phone_digits = digits_only(self.phone)
+        self.first_name_lower = normalize_text(self.user.first_name)
+        self.last_name_lower = normalize_text(self.user.last_name)
+        self.email_lower = normalize_text(self.user.email)
+
+    def save(self, *args, **kwargs):
+        self.refresh_lookup_fields()
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = set(kwargs['update_fields']) | set(self.LOOKUP_FIELDS)
+        super().save(*args, **kwargs)
 
     def clean(self):
         if self.birth_date:
@@ -118,27 +184,28 @@ class Rental(models.Model):
     penalties = models.ManyToManyField(Penalty, blank=True)
     notes = models.TextField(blank=True, verbose_name='Заметки')
 
+    objects = RentalQuerySet.as_manager()
+
     def clean(self):
         if self.start_date and self.start_date < timezone.now():
             raise ValidationError('Start date cannot be in the past.')
 
+    # Суммы берутся из сохранённого счёта (см. main/billing.py)
     def calculate_discount_amount(self):
-        if not self.promo_code:
-            return Decimal('0.00')
-        discount_multiplier = Decimal(str(self.promo_code.discount_percent)) / Decimal('100')
-        return self.base_amount * discount_multiplier
+        from .billing import get_invoice
+        return get_invoice(self).discount_amount
 
     def calculate_penalty_amount(self):
-        return sum(penalty.amount for penalty in self.penalties.all())
+        from .billing import get_invoice
+        return get_invoice(self).penalty_amount
 
     def calculate_final_amount(self):
-        discount_amount = self.calculate_discount_amount()
-        penalty_amount = self.calculate_penalty_amount()
-        return self.base_amount - discount_amount + penalty_amount
+        from .billing import get_invoice
+        return get_invoice(self).total_amount
 
     def update_final_amount(self):
-        self.final_amount = self.calculate_final_amount()
-        self.save()
+        from .billing import refresh_invoice
+        refresh_invoice(self)
 
     def __str__(self):
         return f"{self.car} - {self.client} ({self.start_date})"
@@ -146,13 +213,152 @@ class Rental(models.Model):
     class Meta:
         verbose_name = 'Аренда'
         verbose_name_plural = 'Аренды'
+        # Ключи курсорной пагинации списков аренд (main/pagination.py)
+        indexes = [
+            models.Index(fields=['start_date', 'id'], name='rental_start_id_idx'),
+            models.Index(fields=['client', 'start_date', 'id'], name='rental_client_start_id_idx'),
+            models.Index(fields=['status', 'start_date', 'id'], name='rental_status_start_id_idx'),
+        ]
+
+class Invoice(models.Model):
+    rental = models.OneToOneField(Rental, on_delete=models.CASCADE, related_name='invoice')
+    promo_code = models.ForeignKey('Promo', on_delete=models.SET_NULL, null=True, blank=True)
+    base_amount = models.DecimalField(max_digits=10, decimal_places=2)
+    discount_amount = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal('0.00'))
+    penalty_amount = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal('0.00'))
+    total_amount = models.DecimalField(max_digits=10, decimal_places=2)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Счёт #{self.pk} - {self.rental_id} (${self.total_amount})"
+
+    class Meta:
+        verbose_name = 'Счёт'
+        verbose_name_plural = 'Счета'
+
+class InvoiceLine(models.Model):
+    KIND_CHOICES = [
+        ('base', 'Аренда'),
+        ('discount', 'Скидка'),
+        ('penalty', 'Штраф'),
+    ]
+
+    invoice = models.ForeignKey(Invoice, on_delete=models.CASCADE, related_name='lines')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    description = models.CharField(max_length=200)
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    penalty = models.ForeignKey(Penalty, on_delete=models.SET_NULL, null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.description}: ${self.amount}"
+
+    class Meta:
+        verbose_name = 'Строка счёта'
+        verbose_name_plural = 'Строки счёта'
+        ordering = ['id']
+
+class RentalSlot(models.Model):
+    car = models.ForeignKey(Car, on_delete=models.CASCADE)
+    rental = models.ForeignKey(Rental, on_delete=models.CASCADE, related_name='slots')
+    day = models.DateField()
+
+    def __str__(self):
+        return f"{self.car} - {self.day}"
+
+    class Meta:
+        verbose_name = 'Бронь на день'
+        verbose_name_plural = 'Брони на день'
+        constraints = [
+            models.UniqueConstraint(fields=['car', 'day'], name='unique_car_day_slot')
+        ]
+
+class RentalRollup(models.Model):
+    PERIOD_CHOICES = [
+        ('day', 'Day'),
+        ('week', 'Week'),
+        ('month', 'Month')
+    ]
+
+    period = models.CharField(max_length=5, choices=PERIOD_CHOICES)
+    bucket_start = models.DateField()
+    rental_count = models.IntegerField(default=0)
+    total_days = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+
+    @property
+    def avg_days(self):
+        return self.total_days / self.rental_count if self.rental_count else 0
+
+    def __str__(self):
+        return f"{self.period} {self.bucket_start}: {self.rental_count}"
+
+    class Meta:
+        ordering = ['period', 'bucket_start']
+        constraints = [
+            models.UniqueConstraint(fields=['period', 'bucket_start'], name='unique_rental_rollup_bucket')
+        ]
+
+class CarTypeRollup(models.Model):
+    period = models.CharField(max_length=5, choices=RentalRollup.PERIOD_CHOICES)
+    bucket_start = models.DateField()
+    car_type = models.ForeignKey(CarType, on_delete=models.CASCADE, related_name='rollups')
+    rental_count = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.car_type} {self.period} {self.bucket_start}: {self.rental_count}"
+
+    class Meta:
+        ordering = ['period', 'bucket_start']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['period', 'bucket_start', 'car_type'], name='unique_car_type_rollup_bucket'
+            )
+        ]
+
+class FacetCount(models.Model):
+    """Number of cars with one value of a catalog facet (see ``main.facets``)."""
+    FACET_CHOICES = [
+        ('type', 'Car type'),
+        ('manufacturer', 'Manufacturer'),
+        ('year', 'Year'),
+        ('rate', 'Daily rate, cents'),
+    ]
+
+    facet = models.CharField(max_length=12, choices=FACET_CHOICES)
+    value = models.CharField(max_length=100)
+    label = models.CharField(max_length=100, blank=True)
+    count = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.facet}={self.value}: {self.count}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['facet', 'value'], name='unique_facet_value')
+        ]
+
+class StoredFile(models.Model):
+    """A file of the content-addressed media storage and how many photos refer to it."""
+    name = models.CharField(max_length=255, unique=True)
+    size = models.PositiveBigIntegerField(default=0)
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count})"
+
+    class Meta:
+        verbose_name = 'Файл хранилища'
+        verbose_name_plural = 'Файлы хранилища'
 
 class Article(models.Model):
     title = models.CharField(max_length=200)
     content = models.TextField()
     image = models.ImageField(upload_to='articles/', null=True, blank=True)
+    image_width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    image_height = models.PositiveIntegerField(null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return self.title
@@ -178,6 +384,8 @@ class Employee(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     position = models.CharField(max_length=100)
     photo = models.ImageField(upload_to='employees/', null=True, blank=True)
+    photo_width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    photo_height = models.PositiveIntegerField(null=True, blank=True, editable=False)
     phone_regex = RegexValidator(
         regex=r'^\+375 \((?:29|33|44|25)\) [0-9]{3}-[0-9]{2}-[0-9]{2}$',
         message="Phone number must be entered in the format: '+375 (29) XXX-XX-XX'"
@@ -209,10 +417,16 @@ class Review(models.Model):
     rating = models.IntegerField(validators=[MinValueValidator(1), MaxValueValidator(5)])
     text = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    objects = ReviewQuerySet.as_manager()
 
     def __str__(self):
         return f"{self.client} - {self.rating}/5"
 
+    class Meta:
+        indexes = [models.Index(fields=['created_at', 'id'], name='review_created_id_idx')]
+
 class Promo(models.Model):
     code = models.CharField(max_length=20, unique=True)
     description = models.TextField()
@@ -220,6 +434,7 @@ class Promo(models.Model):
     valid_from = models.DateTimeField()
     valid_until = models.DateTimeField()
     is_active = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def clean(self):
         if self.valid_until <= self.valid_from:
@@ -0,0 +1,92 @@
+"""Full-page cache for anonymous visitors.
+
+Public pages (``PAGE_CACHE_VIEWS``) look the same to every anonymous
+visitor, so ``main.middleware.AnonymousPageCacheMiddleware`` stores the
+rendered page by host, path and query string and answers later requests
+from the cache without touching the database.  Requests from authenticated
+users, and from visitors with pending flash messages, bypass the cache.
+
+Each page lists the models it shows.  A stored page carries the version of
+those models (the fragment version tokens of ``main.fragments``, bumped by
+the model signals), so a content change makes it stale at once;
+``PAGE_CACHE_TIMEOUT`` bounds the staleness of what the signals do not see
+(promotions starting, external content on the home page).
+
+A stale page is kept for ``PAGE_CACHE_STALE_TIMEOUT`` and is used:
+
+* while another worker re-renders it, so a burst of requests right after a
+  change renders the page once instead of once per request;
+* when rendering fails (``database is locked`` from SQLite under write load,
+  a template error), instead of a 500 page.
+"""
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.cache import cache
+from django.http import HttpResponse
+
+from . import fragments
+
+STATUS_HEADER = 'X-Page-Cache'
+STORED_HEADERS = ('Content-Type', 'Content-Language', 'ETag', 'Last-Modified', 'Vary')
+RENDER_LOCK_TIMEOUT = 30
+
+
+def page_key(request):
+    # Порядок параметров не влияет на страницу, поэтому не должен влиять на ключ
+    query = urlencode(sorted((name, value) for name, values in request.GET.lists() for value in values))
+    url = f'{request.get_host()}{request.path}?{query}'
+    return f'page:{hashlib.md5(url.encode()).hexdigest()}'
+
+
+def is_anonymous(request):
+    """Whether the page of ``request`` can be shared with other visitors."""
+    if CookieStorage.cookie_name in request.COOKIES:
+        return False  # сообщение показывается один раз и только этому посетителю
+    if settings.SESSION_COOKIE_NAME not in request.COOKIES:
+        return True  # без сессии пользователь анонимен, запрос к базе не нужен
+    return not request.user.is_authenticated
+
+
+class CachedPage:
+    def __init__(self, request, dependencies):
+        self.key = page_key(request)
+        self.version = fragments.fragment_key('page', dependencies)
+        self.entry = cache.get(self.key)
+        self.locked = False
+
+    @property
+    def is_fresh(self):
+        return (
+            self.entry is not None and self.entry['version'] == self.version
+            and time.time() - self.entry['stored_at'] < settings.PAGE_CACHE_TIMEOUT
+        )
+
+    def lock(self):
+        """Take the right to re-render the page; ``False`` if another worker has it."""
+        self.locked = cache.add(f'{self.key}:render', True, RENDER_LOCK_TIMEOUT)
+        return self.locked
+
+    def unlock(self):
+        if self.locked:
+            cache.delete(f'{self.key}:render')
+            self.locked = False
+
+    def store(self, response):
+        if response.status_code != 200 or response.streaming or response.cookies:
+            return
+        self.entry = {
+            'version': self.version,
+            'stored_at': time.time(),
+            'content': response.content,
+            'headers': {name: response[name] for name in STORED_HEADERS if response.has_header(name)},
+        }
+        cache.set(self.key, self.entry, settings.PAGE_CACHE_STALE_TIMEOUT)
+
+    def response(self, status):
+        response = HttpResponse(self.entry['content'], headers=self.entry['headers'])
+        response[STATUS_HEADER] = status
+        return response
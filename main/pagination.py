@@ -0,0 +1,176 @@
+import base64
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.http import Http404
+from django.utils.functional import cached_property
+
+
+class PrecountedPaginator(Paginator):
+    """Paginator that trusts a count known in advance instead of running COUNT(*)."""
+
+    def __init__(self, *args, known_count=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.known_count = known_count
+
+    @cached_property
+    def count(self):
+        if self.known_count is not None:
+            return self.known_count
+        return super().count
+
+
+class KeysetPage:
+    """One page of a keyset-paginated list; links carry a cursor instead of a page number."""
+
+    def __init__(self, object_list, has_next, has_previous, next_url, previous_url, first_url,
+                 count=None, count_is_approximate=False):
+        self.object_list = object_list
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self.next_url = next_url
+        self.previous_url = previous_url
+        self.first_url = first_url
+        self.count = count
+        self.count_is_approximate = count_is_approximate
+
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def encode_cursor(values):
+    # str(), а не DjangoJSONEncoder: тот обрезает микросекунды, и курсор перестал бы совпадать с ключом
+    payload = json.dumps(values, default=str, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def keyset_field(model, path):
+    """Model field at the end of a keyset path such as ``-user__date_joined``."""
+    *relations, name = path.lstrip('-').split('__')
+    for relation in relations:
+        model = model._meta.get_field(relation).related_model
+    return model._meta.get_field(name)
+
+
+def decode_cursor(cursor, model, fields):
+    """Values of a cursor converted by the fields of ``model`` it was made from.
+
+    The cursor comes from the query string, so anything that does not convert
+    to the field types is a 404 rather than an error in the page query.
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        raise Http404('Invalid cursor')
+    if not isinstance(values, list) or len(values) != len(fields):
+        raise Http404('Invalid cursor')
+    try:
+        values = [keyset_field(model, path).to_python(value) for path, value in zip(fields, values)]
+    except (ValidationError, TypeError, ValueError):
+        raise Http404('Invalid cursor')
+    if None in values:
+        raise Http404('Invalid cursor')  # ключи не бывают NULL, а сравнение с NULL ничего не выберет
+    return values
+
+
+def keyset_condition(fields, values, forward=True):
+    """``Q`` selecting rows strictly after ``values`` in the order given by ``fields``.
+
+    For ``('-start_date', '-id')`` that is ``start_date < a OR (start_date = a AND id < b)``.
+    """
+    condition = Q()
+    for position in reversed(range(len(fields))):
+        name = fields[position].lstrip('-')
+        descending = fields[position].startswith('-') == forward
+        step = Q(**{f'{name}__{"lt" if descending else "gt"}': values[position]})
+        if position < len(fields) - 1:
+            step |= Q(**{name: values[position]}) & condition
+        condition = step
+    return condition
+
+
+def reverse_ordering(fields):
+    return [name[1:] if name.startswith('-') else f'-{name}' for name in fields]
+
+
+class KeysetPaginationMixin:
+    """Cursor pagination for a ``ListView`` ordered on an indexed key.
+
+    ``keyset_fields`` must end with a unique column (``id``) so that the order
+    is total.  A page is ``WHERE key > cursor ORDER BY key LIMIT n + 1``: the
+    cost does not depend on how deep the page is and no ``COUNT(*)`` runs.
+    ``count_mode`` adds a total to the context: ``'exact'`` counts on every
+    request, ``'approximate'`` reuses a count cached for
+    ``KEYSET_COUNT_TTL`` seconds, ``None`` shows no total.
+    """
+    keyset_fields = ('-id',)
+    count_mode = 'approximate'
+    cursor_param = 'cursor'
+    direction_param = 'direction'
+
+    def get_keyset_fields(self):
+        return self.keyset_fields
+
+    def paginate_queryset(self, queryset, page_size):
+        fields = list(self.get_keyset_fields())
+        cursor = self.request.GET.get(self.cursor_param)
+        backward = self.request.GET.get(self.direction_param) == 'prev'
+        page_queryset = queryset.order_by(*(reverse_ordering(fields) if backward else fields))
+        if cursor:
+            page_queryset = page_queryset.filter(
+                keyset_condition(fields, decode_cursor(cursor, queryset.model, fields), forward=not backward)
+            )
+        rows = list(page_queryset[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if backward:
+            rows.reverse()
+        has_next, has_previous = (bool(cursor), has_more) if backward else (has_more, bool(cursor))
+
+        count, approximate = self.get_total_count(queryset)
+        page = KeysetPage(
+            rows, has_next, has_previous,
+            next_url=self.page_url(self.cursor_for(rows[-1], fields)) if has_next and rows else None,
+            previous_url=self.page_url(self.cursor_for(rows[0], fields), 'prev') if has_previous and rows else None,
+            first_url=self.page_url(None),
+            count=count, count_is_approximate=approximate,
+        )
+        return page, page, rows, page.has_other_pages()
+
+    def cursor_for(self, obj, fields):
+        values = []
+        for field in fields:
+            value = obj
+            for part in field.lstrip('-').split('__'):
+                value = getattr(value, part)
+            values.append(value)
+        return encode_cursor(values)
+
+    def page_url(self, cursor, direction=None):
+        params = self.request.GET.copy()
+        for name in (self.cursor_param, self.direction_param, 'page'):
+            params.pop(name, None)
+        if cursor:
+            params[self.cursor_param] = cursor
+        if direction:
+            params[self.direction_param] = direction
+        return f'?{params.urlencode()}' if params else '?'
+
+    def get_total_count(self, queryset):
+        if self.count_mode is None:
+            return None, False
+        if self.count_mode == 'exact':
+            return queryset.count(), False
+        key = 'keyset_count:' + hashlib.md5(str(queryset.order_by().query).encode()).hexdigest()
+        return cache.get_or_set(key, queryset.count, settings.KEYSET_COUNT_TTL), True
@@ -0,0 +1,88 @@
+"""Who is making the request, resolved once per request.
+
+``PrincipalMiddleware`` sets ``request.principal``.  Nothing is loaded
+until it is used: ``is_staff`` comes from the user already loaded by the
+session, and the first access to ``employee`` or ``client`` loads both
+profiles in one query.  The profiles are cached on ``request.user`` too, so
+``request.user.client`` and ``hasattr(request.user, 'employee')`` after it
+do not query again.
+
+Permission checks use ``principal.has_staff_access`` through
+``StaffEmployeeRequiredMixin`` (views) and ``staff_employee_required``
+(function views) instead of evaluating the relations themselves.
+"""
+from functools import wraps
+
+from django.contrib.auth.models import User
+from django.contrib.auth.views import redirect_to_login
+from django.core.exceptions import ObjectDoesNotExist
+from django.utils.functional import cached_property
+
+PROFILE_RELATIONS = ('employee', 'client')
+
+
+class Principal:
+    """Role and profiles of the request user; the profiles load on first use."""
+
+    def __init__(self, user):
+        self.user = user
+
+    @property
+    def is_authenticated(self):
+        return self.user.is_authenticated
+
+    @property
+    def is_staff(self):
+        return self.user.is_authenticated and self.user.is_staff
+
+    @cached_property
+    def profiles(self):
+        if not self.user.is_authenticated:
+            return dict.fromkeys(PROFILE_RELATIONS)
+        return load_profiles(self.user)
+
+    @property
+    def employee(self):
+        return self.profiles['employee']
+
+    @property
+    def client(self):
+        return self.profiles['client']
+
+    @property
+    def is_employee(self):
+        return self.employee is not None
+
+    @property
+    def has_staff_access(self):
+        """Staff users and employees manage cars, rentals and clients."""
+        # is_staff проверяется первым: сотруднику-администратору профиль не нужен
+        return self.is_staff or self.is_employee
+
+
+def load_profiles(user):
+    """Employee and client profiles of ``user`` in one query, cached on ``user``."""
+    loaded = User.objects.select_related(*PROFILE_RELATIONS).get(pk=user.pk)
+    profiles = {}
+    for name in PROFILE_RELATIONS:
+        relation = getattr(User, name).related
+        try:
+            profile = getattr(loaded, name)
+        except ObjectDoesNotExist:
+            profile = None
+        else:
+            relation.field.set_cached_value(profile, user)
+        # Отсутствующий профиль тоже кешируется: hasattr(user, 'employee') не пойдёт в базу
+        relation.set_cached_value(user, profile)
+        profiles[name] = profile
+    return profiles
+
+
+def staff_employee_required(view_func):
+    """Like ``user_passes_test`` for staff or employees, using ``request.principal``."""
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if not request.principal.has_staff_access:
+            return redirect_to_login(request.get_full_path())
+        return view_func(request, *args, **kwargs)
+    return wrapper
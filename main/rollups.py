@@ -0,0 +1,181 @@
+"""Materialized rental rollups.
+
+Revenue, rental count and total rental days are kept per day, week and month
+in ``RentalRollup``; rental counts per car type live in ``CarTypeRollup``.
+A rental is attributed to the bucket of its local start date.  Signals in
+``main.signals`` apply each rental change as a delta, move the car type
+counts when a car or a car model changes type, and the ``backfill_rollups``
+command rebuilds everything from scratch.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q, Sum
+from django.db.models.functions import Coalesce
+
+from .availability import to_local_date
+from .models import Car, CarType, CarTypeRollup, Rental, RentalRollup
+
+PERIODS = ('day', 'week', 'month')
+
+
+def bucket_start(period, day):
+    if period == 'week':
+        return day - timedelta(days=day.weekday())
+    if period == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def rental_contribution(rental):
+    """Return the ``(day, car_type_id, days, revenue)`` a rental adds to rollups."""
+    car_type_id = (
+        Car.objects.filter(pk=rental.car_id).values_list('model__car_type_id', flat=True).first()
+    )
+    return (
+        to_local_date(rental.start_date),
+        car_type_id,
+        rental.days,
+        Decimal(str(rental.final_amount or 0)),
+    )
+
+
+def stored_contribution(pk):
+    """Contribution of a rental as currently stored in the database."""
+    row = Rental.objects.filter(pk=pk).values_list(
+        'start_date', 'car__model__car_type_id', 'days', 'final_amount'
+    ).first()
+    if row is None:
+        return None
+    start, car_type_id, days, amount = row
+    return (to_local_date(start), car_type_id, days, Decimal(str(amount or 0)))
+
+
+def _upsert(model, lookup, **deltas):
+    updates = {field: F(field) + value for field, value in deltas.items()}
+    if model.objects.filter(**lookup).update(**updates):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, **deltas)
+    except IntegrityError:
+        # Строку успел создать параллельный запрос
+        model.objects.filter(**lookup).update(**updates)
+
+
+def apply_contribution(contribution, sign=1):
+    day, car_type_id, days, revenue = contribution
+    for period in PERIODS:
+        start = bucket_start(period, day)
+        _upsert(
+            RentalRollup,
+            {'period': period, 'bucket_start': start},
+            rental_count=sign,
+            total_days=sign * days,
+            revenue=sign * revenue,
+        )
+        if car_type_id is not None:
+            _upsert(
+                CarTypeRollup,
+                {'period': period, 'bucket_start': start, 'car_type_id': car_type_id},
+                rental_count=sign,
+            )
+
+
+def move_car_type(rentals, old_type_id, new_type_id):
+    """Move the car type counts of ``rentals`` from ``old_type_id`` to ``new_type_id``."""
+    counts = defaultdict(int)
+    for start in rentals.values_list('start_date', flat=True).iterator(chunk_size=2000):
+        day = to_local_date(start)
+        for period in PERIODS:
+            counts[(period, bucket_start(period, day))] += 1
+    for (period, start), count in counts.items():
+        for car_type_id, sign in ((old_type_id, -1), (new_type_id, 1)):
+            if car_type_id is not None:
+                _upsert(
+                    CarTypeRollup,
+                    {'period': period, 'bucket_start': start, 'car_type_id': car_type_id},
+                    rental_count=sign * count,
+                )
+
+
+def aggregate_rentals(queryset):
+    """Aggregate rentals into ``(totals, type_counts)`` dictionaries keyed by bucket."""
+    totals = defaultdict(lambda: [0, 0, Decimal('0.00')])
+    type_counts = defaultdict(int)
+    rows = queryset.values_list('start_date', 'days', 'final_amount', 'car__model__car_type_id')
+    for start, days, amount, car_type_id in rows.iterator(chunk_size=2000):
+        day = to_local_date(start)
+        for period in PERIODS:
+            key = (period, bucket_start(period, day))
+            bucket = totals[key]
+            bucket[0] += 1
+            bucket[1] += days
+            bucket[2] += amount or 0
+            if car_type_id is not None:
+                type_counts[key + (car_type_id,)] += 1
+    return dict(totals), dict(type_counts)
+
+
+def merge_aggregates(parts):
+    totals = defaultdict(lambda: [0, 0, Decimal('0.00')])
+    type_counts = defaultdict(int)
+    for part_totals, part_types in parts:
+        for key, (count, days, revenue) in part_totals.items():
+            bucket = totals[key]
+            bucket[0] += count
+            bucket[1] += days
+            bucket[2] += revenue
+        for key, count in part_types.items():
+            type_counts[key] += count
+    return totals, type_counts
+
+
+@transaction.atomic
+def replace_rollups(totals, type_counts):
+    RentalRollup.objects.all().delete()
+    CarTypeRollup.objects.all().delete()
+    RentalRollup.objects.bulk_create([
+        RentalRollup(period=period, bucket_start=start, rental_count=count, total_days=days, revenue=revenue)
+        for (period, start), (count, days, revenue) in totals.items()
+    ], batch_size=1000)
+    CarTypeRollup.objects.bulk_create([
+        CarTypeRollup(period=period, bucket_start=start, car_type_id=car_type_id, rental_count=count)
+        for (period, start, car_type_id), count in type_counts.items()
+    ], batch_size=1000)
+
+
+def rebuild():
+    replace_rollups(*aggregate_rentals(Rental.objects.all()))
+
+
+def totals(since=None):
+    """Overall rental count, revenue and average duration read from monthly rollups."""
+    rollups = RentalRollup.objects.filter(period='month')
+    if since:
+        rollups = rollups.filter(bucket_start__gte=bucket_start('month', since))
+    result = rollups.aggregate(
+        rental_count=Coalesce(Sum('rental_count'), 0),
+        total_days=Coalesce(Sum('total_days'), 0),
+        revenue=Sum('revenue'),
+    )
+    result['revenue'] = result['revenue'] or 0
+    result['avg_days'] = result['total_days'] / result['rental_count'] if result['rental_count'] else 0
+    return result
+
+
+def car_type_popularity():
+    return CarType.objects.annotate(
+        rental_count=Coalesce(Sum('rollups__rental_count', filter=Q(rollups__period='month')), 0)
+    ).order_by('-rental_count')
+
+
+def series(period, since=None, until=None):
+    rollups = RentalRollup.objects.filter(period=period)
+    if since:
+        rollups = rollups.filter(bucket_start__gte=bucket_start(period, since))
+    if until:
+        rollups = rollups.filter(bucket_start__lte=until)
+    return rollups.order_by('bucket_start')
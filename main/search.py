@@ -0,0 +1,176 @@
+"""Site search backed by an SQLite FTS5 virtual table.
+
+``main_search_index`` (created in migration 0013) holds one row per
+searchable object: car models, news articles and FAQ entries.  Rows are
+written by the model signals in ``main.signals`` and can be rebuilt from
+scratch with ``manage.py rebuild_search_index``.  Queries are ranked with
+``bm25`` (title matches weigh more than body matches) and every search term
+is matched as a prefix, so ``toy cam`` finds "Toyota Camry".
+"""
+import re
+from dataclasses import dataclass
+
+from django.db import connection, transaction
+from django.urls import reverse
+from django.utils.html import escape
+from django.utils.http import urlencode
+from django.utils.safestring import mark_safe
+
+from .models import Article, CarModel, FAQ
+
+TABLE = 'main_search_index'
+TITLE_WEIGHT = 10.0
+BODY_WEIGHT = 1.0
+SNIPPET_TOKENS = 16
+# Маркеры совпадений в snippet(): текст экранируется уже после FTS5
+MARK_START, MARK_END = '\x02', '\x03'
+
+
+def car_model_document(car_model):
+    return f'{car_model.manufacturer} {car_model.name}', car_model.description
+
+
+def article_document(article):
+    return article.title, article.content
+
+
+def faq_document(faq):
+    return faq.question, faq.answer
+
+
+SOURCES = {
+    'car_model': (CarModel, car_model_document),
+    'article': (Article, article_document),
+    'faq': (FAQ, faq_document),
+}
+KINDS = {model: kind for kind, (model, _) in SOURCES.items()}
+KIND_LABELS = {'car_model': 'Автомобили', 'article': 'Новости', 'faq': 'FAQ'}
+
+
+@dataclass
+class SearchResult:
+    kind: str
+    object_id: int
+    title: str
+    snippet: str
+    rank: float
+    url: str = ''
+
+    @property
+    def label(self):
+        return KIND_LABELS[self.kind]
+
+
+def index(instance):
+    kind = KINDS[type(instance)]
+    title, body = SOURCES[kind][1](instance)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE} WHERE kind = %s AND object_id = %s', [kind, instance.pk])
+        cursor.execute(
+            f'INSERT INTO {TABLE} (kind, object_id, title, body) VALUES (%s, %s, %s, %s)',
+            [kind, instance.pk, title, body],
+        )
+
+
+def remove(instance):
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE} WHERE kind = %s AND object_id = %s',
+                       [KINDS[type(instance)], instance.pk])
+
+
+def table_exists():
+    return TABLE in connection.introspection.table_names()
+
+
+def in_sync():
+    """Whether the index holds as many rows of each kind as its source table.
+
+    A cheap check for bulk changes that bypass the signals (``flush``,
+    ``loaddata``, raw SQL); an edit missed by the signals is not detected.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT kind, COUNT(*) FROM {TABLE} GROUP BY kind')
+        indexed = dict(cursor.fetchall())
+    return all(indexed.get(kind, 0) == model.objects.count() for kind, (model, _) in SOURCES.items())
+
+
+@transaction.atomic
+def rebuild(chunk_size=2000, log=None):
+    """Re-index every source, streaming rows in chunks; returns the row count."""
+    total = 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE}')
+        for kind, (model, document) in SOURCES.items():
+            batch = []
+            for instance in model.objects.order_by('pk').iterator(chunk_size=chunk_size):
+                batch.append((kind, instance.pk, *document(instance)))
+                if len(batch) >= chunk_size:
+                    total += _insert(cursor, batch)
+                    batch = []
+            total += _insert(cursor, batch)
+            if log:
+                log(f'{kind}: indexed')
+        # Слияние сегментов FTS5 после массовой вставки ускоряет последующие запросы
+        cursor.execute(f"INSERT INTO {TABLE} ({TABLE}) VALUES ('optimize')")
+    return total
+
+
+def _insert(cursor, rows):
+    if rows:
+        cursor.executemany(f'INSERT INTO {TABLE} (kind, object_id, title, body) VALUES (%s, %s, %s, %s)', rows)
+    return len(rows)
+
+
+def build_query(text):
+    """FTS5 query in which every word of ``text`` must match as a prefix.
+
+    Terms are quoted, so FTS5 operators typed by the user are treated as words.
+    """
+    terms = re.findall(r'\w+', text or '')
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def search(text, kinds=None, limit=20):
+    query = build_query(text)
+    if not query:
+        return []
+    sql = (
+        f"SELECT kind, object_id, title, "
+        f"snippet({TABLE}, 3, %s, %s, '…', %s), "
+        f"bm25({TABLE}, 0, 0, %s, %s) AS rank "
+        f"FROM {TABLE} WHERE {TABLE} MATCH %s"
+    )
+    params = [MARK_START, MARK_END, SNIPPET_TOKENS, TITLE_WEIGHT, BODY_WEIGHT, query]
+    if kinds:
+        sql += f" AND kind IN ({', '.join(['%s'] * len(kinds))})"
+        params.extend(kinds)
+    sql += ' ORDER BY rank LIMIT %s'
+    params.append(limit)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+    results = [
+        SearchResult(kind, int(object_id), title, highlight(snippet), rank)
+        for kind, object_id, title, snippet, rank in rows
+    ]
+    attach_urls(results)
+    return results
+
+
+def attach_urls(results):
+    # Модели машин ведут в каталог с фильтром по производителю: одним запросом на все
+    car_model_ids = [result.object_id for result in results if result.kind == 'car_model']
+    manufacturers = dict(
+        CarModel.objects.filter(pk__in=car_model_ids).values_list('pk', 'manufacturer')
+    ) if car_model_ids else {}
+    for result in results:
+        if result.kind == 'article':
+            result.url = reverse('main:article_detail', kwargs={'pk': result.object_id})
+        elif result.kind == 'faq':
+            result.url = f"{reverse('main:faq')}#heading{result.object_id}"
+        elif result.object_id in manufacturers:
+            result.url = f"{reverse('main:car_list')}?{urlencode({'manufacturer': manufacturers[result.object_id]})}"
+
+
+def highlight(snippet):
+    return mark_safe(escape(snippet).replace(MARK_START, '<mark>').replace(MARK_END, '</mark>'))
@@ -1,9 +1,18 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models import DEFERRED
+from django.db.models.signals import (
+    post_init, pre_save, post_save, pre_delete, post_delete, post_migrate, m2m_changed
+)
 from django.dispatch import receiver
 from django.contrib.auth.models import User
-from .models import Client
+from .models import Client, Car, CarModel, CarType, Rental, Article, FAQ, Employee, CompanyInfo, Promo, Review
+from . import rollups, billing, facets, search, images, storage, fragments
 from datetime import date
 
+AVAILABILITY_FIELDS = {'car', 'start_date', 'expected_return_date', 'status'}
+BILLING_FIELDS = {'base_amount', 'promo_code'}
+IMAGE_FIELDS = {Car: 'image', Article: 'image', Employee: 'photo'}
+
 @receiver(post_save, sender=User)
 def create_client(sender, instance, created, **kwargs):
     if created:
@@ -18,4 +27,236 @@ def create_client(sender, instance, created, **kwargs):
 
 @receiver(post_save, sender=User)
 def save_client(sender, instance, **kwargs):
-    instance.client.save() 
\ No newline at end of file
+    instance.client.save()
+
+@receiver(pre_save, sender=Rental)
+def remember_rollup_contribution(sender, instance, raw, **kwargs):
+    if raw:
+        return
+    instance._rollup_contribution = rollups.stored_contribution(instance.pk) if instance.pk else None
+
+@receiver(post_save, sender=Rental)
+def update_rollups_on_rental_save(sender, instance, raw, **kwargs):
+    if raw:
+        return
+    old = getattr(instance, '_rollup_contribution', None)
+    new = rollups.rental_contribution(instance)
+    if old == new:
+        return
+    if old is not None:
+        rollups.apply_contribution(old, sign=-1)
+    rollups.apply_contribution(new)
+    instance._rollup_contribution = new
+
+@receiver(pre_delete, sender=Rental)
+def update_rollups_on_rental_delete(sender, instance, **kwargs):
+    # pre_delete: при каскадном удалении машины её тип ещё доступен
+    contribution = rollups.stored_contribution(instance.pk)
+    if contribution is not None:
+        rollups.apply_contribution(contribution, sign=-1)
+
+# Регистрируется после приёмников сводок: refresh_invoice сохраняет final_amount
+# повторно, и к этому моменту вклад первого сохранения в сводки уже учтён
+@receiver(post_save, sender=Rental)
+def refresh_invoice_on_rental_save(sender, instance, created, raw, update_fields, **kwargs):
+    if raw:
+        return
+    if created:
+        billing.refresh_invoice(instance)
+    elif update_fields is None or BILLING_FIELDS & set(update_fields):
+        billing.refresh_if_stale(instance)
+
+@receiver(m2m_changed, sender=Rental.penalties.through)
+def refresh_invoice_on_penalties_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == 'pre_clear':
+        # После clear() со стороны штрафа pk_set пуст, поэтому аренды запоминаем заранее
+        instance._cleared_rental_ids = list(instance.rental_set.values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        billing.refresh_invoice(instance)
+    elif action == 'post_clear':
+        billing.refresh_invoices(getattr(instance, '_cleared_rental_ids', []))
+    elif pk_set:
+        billing.refresh_invoices(pk_set)
+
+@receiver(pre_save, sender=Car)
+def remember_facet_key(sender, instance, raw, **kwargs):
+    if raw:
+        return
+    instance._facet_key = facets.stored_key(instance.pk) if instance.pk else None
+
+@receiver(post_save, sender=Car)
+def update_facets_on_car_save(sender, instance, raw, **kwargs):
+    if raw:
+        return
+    old, new = getattr(instance, '_facet_key', None), facets.stored_key(instance.pk)
+    instance._facet_key = new
+    if old != new:
+        facets.move(old, new)
+    if old is not None and old[0] != new[0]:
+        # Машина сменила тип вместе с моделью: её аренды переходят в сводку нового типа
+        rollups.move_car_type(Rental.objects.filter(car=instance), old[0], new[0])
+
+@receiver(pre_delete, sender=Car)
+def update_facets_on_car_delete(sender, instance, **kwargs):
+    # pre_delete: при каскадном удалении модели или типа они ещё в базе
+    facets.move(facets.stored_key(instance.pk), None)
+
+@receiver(pre_save, sender=CarModel)
+def remember_model_facets(sender, instance, raw, **kwargs):
+    if raw or not instance.pk:
+        return
+    instance._facet_key = CarModel.objects.filter(pk=instance.pk).values_list(
+        'car_type_id', 'car_type__name', 'manufacturer').first()
+
+@receiver(post_save, sender=CarModel)
+def update_facets_on_model_save(sender, instance, raw, **kwargs):
+    old = getattr(instance, '_facet_key', None)
+    if raw or old is None:
+        return
+    new = (instance.car_type_id, instance.car_type.name, instance.manufacturer)
+    instance._facet_key = new
+    if old != new:
+        # Все машины модели переходят в новый тип и к новому производителю
+        facets.move((*old, None, None), (*new, None, None), Car.objects.filter(model=instance).count())
+    if old[0] != new[0]:
+        rollups.move_car_type(Rental.objects.filter(car__model=instance), old[0], new[0])
+
+@receiver(post_save, sender=CarType)
+def update_facets_on_type_save(sender, instance, created, raw, **kwargs):
+    if not raw and not created:
+        facets.rename_type(instance.pk, instance.name)
+
+@receiver(post_save, sender=CarModel)
+@receiver(post_save, sender=Article)
+@receiver(post_save, sender=FAQ)
+def update_search_index(sender, instance, raw, **kwargs):
+    if not raw:
+        search.index(instance)
+
+@receiver(post_delete, sender=CarModel)
+@receiver(post_delete, sender=Article)
+@receiver(post_delete, sender=FAQ)
+def remove_from_search_index(sender, instance, **kwargs):
+    search.remove(instance)
+
+@receiver(pre_save, sender=Car)
+@receiver(pre_save, sender=Article)
+@receiver(pre_save, sender=Employee)
+def record_image_dimensions(sender, instance, raw, **kwargs):
+    if raw:
+        return
+    field = IMAGE_FIELDS[sender]
+    fieldfile = getattr(instance, field)
+    width_field, height_field = images.dimension_fields(field)
+    if not fieldfile:
+        dimensions = (None, None)
+    elif not fieldfile._committed or getattr(instance, width_field) is None:
+        dimensions = images.read_dimensions(fieldfile)
+    else:
+        return
+    setattr(instance, width_field, dimensions[0])
+    setattr(instance, height_field, dimensions[1])
+
+@receiver(post_save, sender=Car)
+@receiver(post_save, sender=Article)
+@receiver(post_save, sender=Employee)
+def render_image_derivatives(sender, instance, raw, **kwargs):
+    field = IMAGE_FIELDS[sender]
+    fieldfile, width = getattr(instance, field), getattr(instance, images.dimension_fields(field)[0])
+    if not raw and fieldfile and width:
+        pk = instance.pk
+        transaction.on_commit(lambda: schedule_image_derivatives(sender, pk, fieldfile, width))
+
+def schedule_image_derivatives(sender, pk, fieldfile, width):
+    future = images.schedule(fieldfile, width)
+    if future is not None:
+        # Закешированные фрагменты с этим фото ещё без srcset
+        future.add_done_callback(lambda future: fragments.bump(sender, pk))
+
+@receiver(post_init, sender=Car)
+@receiver(post_init, sender=Article)
+@receiver(post_init, sender=Employee)
+def remember_stored_file(sender, instance, **kwargs):
+    # Имя файла запоминается при загрузке из базы (как делает ImageField с width_field),
+    # чтобы при сохранении не читать его отдельным запросом
+    value = instance.__dict__.get(IMAGE_FIELDS[sender], DEFERRED)
+    if instance.pk is None:
+        instance._stored_file = None
+    elif isinstance(value, str) or value is None:
+        instance._stored_file = value
+
+@receiver(pre_save, sender=Car)
+@receiver(pre_save, sender=Article)
+@receiver(pre_save, sender=Employee)
+def load_stored_file(sender, instance, raw, **kwargs):
+    if raw or hasattr(instance, '_stored_file'):
+        return
+    # Поле было отложено (only/defer) или задано файлом при создании объекта
+    field = IMAGE_FIELDS[sender]
+    instance._stored_file = (
+        sender.objects.filter(pk=instance.pk).values_list(field, flat=True).first() if instance.pk else None
+    )
+
+@receiver(post_save, sender=Car)
+@receiver(post_save, sender=Article)
+@receiver(post_save, sender=Employee)
+def count_stored_file_references(sender, instance, raw, **kwargs):
+    if raw:
+        return
+    old, new = getattr(instance, '_stored_file', None), getattr(instance, IMAGE_FIELDS[sender]).name
+    instance._stored_file = new
+    if old != new:
+        storage.acquire(new)
+        storage.release(old)
+
+@receiver(post_delete, sender=Car)
+@receiver(post_delete, sender=Article)
+@receiver(post_delete, sender=Employee)
+def release_stored_file(sender, instance, **kwargs):
+    storage.release(getattr(instance, IMAGE_FIELDS[sender]).name)
+
+@receiver(post_save, sender=Car)
+@receiver(post_delete, sender=Car)
+@receiver(post_save, sender=CarModel)
+@receiver(post_delete, sender=CarModel)
+@receiver(post_save, sender=CarType)
+@receiver(post_delete, sender=CarType)
+@receiver(post_save, sender=Article)
+@receiver(post_delete, sender=Article)
+@receiver(post_save, sender=FAQ)
+@receiver(post_delete, sender=FAQ)
+@receiver(post_save, sender=CompanyInfo)
+@receiver(post_delete, sender=CompanyInfo)
+@receiver(post_save, sender=Employee)
+@receiver(post_delete, sender=Employee)
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+@receiver(post_save, sender=Promo)
+@receiver(post_delete, sender=Promo)
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+@receiver(post_save, sender=Rental)
+@receiver(post_delete, sender=Rental)
+def invalidate_fragments(sender, instance, update_fields=None, **kwargs):
+    if sender is User and update_fields is not None and set(update_fields) <= {'last_login'}:
+        return  # вход пользователя не меняет показываемых данных
+    if sender is Rental and update_fields is not None and not AVAILABILITY_FIELDS & set(update_fields):
+        return  # страницы показывают только занятость машин
+    # pk запоминается сразу: после delete() он обнуляется
+    pk = instance.pk
+    transaction.on_commit(lambda: fragments.bump(sender, pk))
+
+@receiver(post_migrate)
+def reset_caches(sender, **kwargs):
+    # flush и migrate меняют данные в обход сигналов моделей
+    facets.invalidate()
+    fragments.reset()
+
+@receiver(post_migrate)
+def rebuild_search_index(sender, **kwargs):
+    # flush не очищает виртуальную таблицу FTS5: индекс пересобирается, только если разошёлся с данными
+    if sender.name == 'main' and search.table_exists() and not search.in_sync():
+        search.rebuild()
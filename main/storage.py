@@ -0,0 +1,133 @@
+"""Content-addressed storage for uploaded photos.
+
+Uploads are stored under ``MEDIA_CONTENT_DIR`` by the SHA-256 of their
+bytes (``content/ab/ab12….jpg``) instead of the name they were uploaded
+with.  Uploading a file that is already stored writes nothing and returns
+the existing name, so identical photos of cars, articles and employees
+share one file on disk.  Because a name always refers to the same bytes,
+its URL never changes meaning and is served with a one-year ``immutable``
+``Cache-Control`` header.
+
+Sharing files means they cannot be deleted together with one model row.
+``StoredFile`` keeps a reference count per file; the model signals call
+``acquire`` and ``release`` when a photo is set, replaced or its row is
+deleted, and the file (with its derivatives) is removed once nothing refers
+to it.  ``manage.py dedupe_media`` moves files uploaded before this storage
+into it and recounts the references.
+
+``CompressedStaticFilesStorage`` writes ``.gz``/``.br`` variants of the
+collected static files during ``collectstatic``; ``main.fileserving`` serves
+them to clients that accept them.
+"""
+import hashlib
+import os
+import posixpath
+import tempfile
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import StaticFilesStorage
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db import transaction
+from django.db.models import F
+
+HASH_CHUNK_SIZE = 64 * 1024
+EXTENSION_ALIASES = {'.jpeg': '.jpg'}
+
+
+def content_name(digest, original_name):
+    """Storage name for a file with SHA-256 ``digest`` uploaded as ``original_name``."""
+    ext = os.path.splitext(original_name)[1].lower()
+    ext = EXTENSION_ALIASES.get(ext, ext)
+    return posixpath.join(settings.MEDIA_CONTENT_DIR, digest[:2], f'{digest}{ext}')
+
+
+def is_content_name(name):
+    return bool(name) and name.startswith(settings.MEDIA_CONTENT_DIR + '/')
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    def get_available_name(self, name, max_length=None):
+        # Имя всё равно заменяется хешем содержимого в _save
+        return name
+
+    def _save(self, name, content):
+        directory = self.path(settings.MEDIA_CONTENT_DIR)
+        os.makedirs(directory, exist_ok=True)
+        # Хеш считается за тот же проход, что и запись во временный файл
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.upload')
+        digest = hashlib.sha256()
+        try:
+            with os.fdopen(fd, 'wb') as tmp:
+                if hasattr(content, 'seek'):
+                    content.seek(0)
+                for chunk in content.chunks(HASH_CHUNK_SIZE):
+                    digest.update(chunk)
+                    tmp.write(chunk)
+            name = content_name(digest.hexdigest(), name)
+            path = self.path(name)
+            if os.path.exists(path):
+                os.remove(tmp_path)
+                return name
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if self.file_permissions_mode is not None:
+                os.chmod(tmp_path, self.file_permissions_mode)
+            # Одинаковое содержимое, поэтому гонка двух загрузок безопасна
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return name
+
+
+class CompressedStaticFilesStorage(StaticFilesStorage):
+    def post_process(self, paths, dry_run=False, **options):
+        from .fileserving import compress_file
+
+        if dry_run:
+            return
+        for name in paths:
+            yield name, name, bool(compress_file(self.path(name)))
+
+
+def acquire(name):
+    """Count one more model field referring to ``name``."""
+    from .models import StoredFile
+
+    if not is_content_name(name):
+        return
+    stored, created = StoredFile.objects.get_or_create(
+        name=name, defaults={'size': stored_size(name), 'ref_count': 1}
+    )
+    if not created:
+        StoredFile.objects.filter(pk=stored.pk).update(ref_count=F('ref_count') + 1)
+
+
+def release(name):
+    """Drop one reference to ``name``; the last one removes the file after commit."""
+    from .models import StoredFile
+
+    if not is_content_name(name):
+        return
+    StoredFile.objects.filter(name=name, ref_count__gt=0).update(ref_count=F('ref_count') - 1)
+    deleted, _ = StoredFile.objects.filter(name=name, ref_count=0).delete()
+    if deleted:
+        transaction.on_commit(lambda: remove_unreferenced(name))
+
+
+def remove_unreferenced(name):
+    from . import images
+    from .models import StoredFile
+
+    # Тот же файл мог быть загружен снова, пока транзакция завершалась
+    if StoredFile.objects.filter(name=name).exists():
+        return
+    default_storage.delete(name)
+    images.remove_derivatives(name)
+
+
+def stored_size(name):
+    try:
+        return default_storage.size(name)
+    except OSError:
+        return 0
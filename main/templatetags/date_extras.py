@@ -2,7 +2,6 @@ from django import template
 from django.utils import timezone
 import calendar
 from datetime import datetime, date
-import pytz
 
 register = template.Library()
 
@@ -21,6 +20,7 @@ def format_datetime(dt, tz=None):
     if not dt:
         return ''
     if tz and isinstance(dt, datetime):
+        import pytz
         dt = dt.astimezone(pytz.timezone(tz))
     return dt.strftime('%d/%m/%Y %H:%M:%S')
 
@@ -30,6 +30,7 @@ def format_date(dt, tz=None):
         return ''
     if isinstance(dt, datetime):
         if tz:
+            import pytz
             dt = dt.astimezone(pytz.timezone(tz))
         return dt.strftime('%d/%m/%Y')
     elif isinstance(dt, date):
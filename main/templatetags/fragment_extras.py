@@ -0,0 +1,55 @@
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+
+from main import fragments
+
+register = template.Library()
+
+
+class FragmentNode(template.Node):
+    def __init__(self, nodelist, name, dependencies, vary_on):
+        self.nodelist = nodelist
+        self.name = name
+        self.dependencies = dependencies
+        self.vary_on = vary_on
+
+    def render(self, context):
+        key = fragments.fragment_key(
+            self.name.resolve(context),
+            [dependency.resolve(context) for dependency in self.dependencies],
+            [value.resolve(context) for value in self.vary_on],
+        )
+        html = cache.get(key)
+        if html is None:
+            html = self.nodelist.render(context)
+            cache.set(key, html, settings.FRAGMENT_CACHE_TIMEOUT)
+        return html
+
+
+@register.tag
+def cachefragment(parser, token):
+    """Cache the enclosed fragment until one of its dependencies changes.
+
+    Usage::
+
+        {% cachefragment "car_card" car "main.CarType" vary request.user.is_staff %}
+            ...
+        {% endcachefragment %}
+
+    Dependencies are model instances or ``"app.Model"`` labels; values after
+    ``vary`` are added to the key without being tracked (user role, page number).
+    """
+    bits = token.split_contents()
+    if len(bits) < 2:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' tag requires a fragment name")
+    nodelist = parser.parse(('endcachefragment',))
+    parser.delete_first_token()
+    args = bits[2:]
+    split = args.index('vary') if 'vary' in args else len(args)
+    return FragmentNode(
+        nodelist,
+        parser.compile_filter(bits[1]),
+        [parser.compile_filter(bit) for bit in args[:split]],
+        [parser.compile_filter(bit) for bit in args[split + 1:]],
+    )
@@ -0,0 +1,19 @@
+from django import template
+
+from main import images
+
+register = template.Library()
+
+@register.inclusion_tag('main/includes/responsive_image.html')
+def responsive_image(instance, field='image', sizes='100vw', alt='', css_class='', style='', loading='lazy'):
+    """<picture> with WebP/JPEG derivatives of ``instance.<field>`` and a lazy-loaded <img>."""
+    fieldfile = getattr(instance, field)
+    width_field, height_field = images.dimension_fields(field)
+    return {
+        'image': images.sources(fieldfile, getattr(instance, width_field), getattr(instance, height_field)),
+        'sizes': sizes,
+        'alt': alt,
+        'css_class': css_class,
+        'style': style,
+        'loading': loading,
+    }
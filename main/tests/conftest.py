@@ -1,5 +1,18 @@
+import copy
+
 import pytest
+from django.conf import settings
+from django.core.cache import cache
 from django.core.management import call_command
+from django.test import override_settings
+
+@pytest.fixture(autouse=True, scope='session')
+def isolated_cache(tmp_path_factory):
+    # Общий кеш (L2) тестов лежит во временном каталоге, а не в CACHE_DIR dev-сервера
+    caches = copy.deepcopy(settings.CACHES)
+    caches['default']['OPTIONS']['L2']['LOCATION'] = str(tmp_path_factory.mktemp('cache'))
+    with override_settings(CACHES=caches):
+        yield
 
 @pytest.fixture(autouse=True)
 def enable_db_access_for_all_tests(db):
@@ -8,4 +21,6 @@ def enable_db_access_for_all_tests(db):
 @pytest.fixture(autouse=True)
 def clean_database():
     call_command('flush', '--no-input')
-    yield 
\ No newline at end of file
+    # Файловый кеш переживает тест, поэтому очищается перед каждым тестом
+    cache.clear()
+    yield
@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta
+from django.test import TransactionTestCase
+from django.contrib.auth.models import User
+from django.utils import timezone
+from main.availability import busy_car_ids, rental_day_span
+from main.forms import RentalForm
+from main.models import Car, CarType, CarModel, Rental
+
+
+def midnight(day):
+    return timezone.make_aware(datetime.combine(day, datetime.min.time()))
+
+
+class TestAvailability(TransactionTestCase):
+    def setUp(self):
+        car_type = CarType.objects.create(name='Sedan', description='Family car')
+        car_model = CarModel.objects.create(
+            name='Camry',
+            manufacturer='Toyota',
+            car_type=car_type,
+            description='Reliable family sedan'
+        )
+        self.car = Car.objects.create(
+            license_plate='ABC123', model=car_model, year=2020, value=25000.00, daily_rate=50.00
+        )
+        self.other_car = Car.objects.create(
+            license_plate='XYZ789', model=car_model, year=2021, value=30000.00, daily_rate=60.00
+        )
+        self.client_obj = User.objects.create_user(
+            username='testuser_availability', password='testpass123'
+        ).client
+        self.today = timezone.localdate()
+
+    def create_rental(self, start, end, status='active', car=None):
+        return Rental.objects.create(
+            car=car or self.car,
+            client=self.client_obj,
+            start_date=midnight(start),
+            days=(end - start).days,
+            expected_return_date=midnight(end),
+            base_amount=100,
+            final_amount=100,
+            status=status
+        )
+
+    def test_rental_day_span_midnight_end_is_exclusive(self):
+        start = self.today + timedelta(days=2)
+        self.assertEqual(
+            rental_day_span(midnight(start), midnight(start + timedelta(days=3))),
+            (start, start + timedelta(days=3))
+        )
+        self.assertEqual(
+            rental_day_span(midnight(start), midnight(start) + timedelta(days=3, hours=5)),
+            (start, start + timedelta(days=4))
+        )
+
+    def busy(self, start, end):
+        return set(Car.objects.filter(pk__in=busy_car_ids(start, end)).values_list('pk', flat=True))
+
+    def test_busy_car_ids(self):
+        start = self.today + timedelta(days=5)
+        self.create_rental(start, start + timedelta(days=3))
+        self.create_rental(start, start + timedelta(days=3), status='cancelled', car=self.other_car)
+
+        self.assertEqual(self.busy(start + timedelta(days=1), start + timedelta(days=2)), {self.car.pk})
+        self.assertEqual(self.busy(start - timedelta(days=2), start + timedelta(days=1)), {self.car.pk})
+        self.assertEqual(self.busy(start + timedelta(days=3), start + timedelta(days=6)), set())
+
+    def test_rental_form_rejects_overlapping_dates(self):
+        start = self.today + timedelta(days=3)
+        data = {'car': self.car.pk, 'start_date': start, 'end_date': start + timedelta(days=2), 'days': 3}
+        self.create_rental(start, start + timedelta(days=3))
+        form = RentalForm(data)
+        self.assertFalse(form.is_valid())
+        self.assertIn(start.strftime('%d.%m.%Y'), str(form.errors))
+
+        Rental.objects.filter(car=self.car).update(status='cancelled')
+        self.assertTrue(RentalForm(data).is_valid())
@@ -0,0 +1,40 @@
+from io import StringIO
+from django.test import TransactionTestCase
+from django.core.management import call_command
+from main import benchmarks
+
+
+class TestBenchmarks(TransactionTestCase):
+    def test_percentile_uses_nearest_rank(self):
+        values = list(range(1, 101))
+        self.assertEqual(benchmarks.percentile(values, 50), 50)
+        self.assertEqual(benchmarks.percentile(values, 95), 95)
+        self.assertEqual(benchmarks.percentile([7], 99), 7)
+
+    def test_compare_flags_slowdowns_and_extra_queries(self):
+        baseline = {'small': {
+            'rental_form_clean': {'p50_ms': 10.0, 'queries': 3},
+            'car_list': {'p50_ms': 10.0, 'queries': 5},
+        }}
+        results = {'small': {
+            'rental_form_clean': {'p50_ms': 12.5, 'queries': 3},
+            'car_list': {'p50_ms': 11.5, 'queries': 6},
+            'statistics': {'p50_ms': 99.0, 'queries': 9},
+        }}
+        regressions = benchmarks.compare(results, baseline, tolerance=0.2)
+        self.assertEqual(len(regressions), 2)
+        self.assertIn('small/rental_form_clean: p50', regressions[0])
+        self.assertIn('small/car_list: 6 queries', regressions[1])
+
+    def test_noise_floor_ignores_tiny_differences(self):
+        baseline = {'small': {'calculate_final_amount': {'p50_ms': 0.1, 'queries': 2}}}
+        results = {'small': {'calculate_final_amount': {'p50_ms': 0.3, 'queries': 2}}}
+        self.assertEqual(benchmarks.compare(results, baseline, 0.2, noise_floor_ms=0.5), [])
+
+    def test_all_benchmarks_run_on_generated_dataset(self):
+        call_command('generate_dataset', cars=5, clients=10, rentals=40, workers=1, stdout=StringIO())
+        results = benchmarks.run_all(iterations=2, warmup=1)
+        self.assertEqual(set(results), set(benchmarks.BENCHMARKS))
+        for result in results.values():
+            self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+            self.assertGreater(result['queries'], 0)
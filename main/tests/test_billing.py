@@ -0,0 +1,105 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+from django.test import TransactionTestCase
+from django.contrib.auth.models import User
+from django.urls import reverse
+from django.utils import timezone
+from main import billing, rollups
+from main.models import Car, CarType, CarModel, Employee, Invoice, Penalty, Promo, Rental
+
+
+class TestBilling(TransactionTestCase):
+    def setUp(self):
+        car_type = CarType.objects.create(name='Sedan', description='Family car')
+        car_model = CarModel.objects.create(name='Camry', manufacturer='Toyota', car_type=car_type, description='')
+        self.car = Car.objects.create(
+            license_plate='ABC123', model=car_model, year=2020, value=25000.00, daily_rate=50.00
+        )
+        self.client_obj = User.objects.create_user(username='testuser_billing', password='testpass123').client
+        self.promo = Promo.objects.create(
+            code='SAVE10', description='10% off', discount_percent=10,
+            valid_from=timezone.now() - timedelta(days=1), valid_until=timezone.now() + timedelta(days=30)
+        )
+        self.late = Penalty.objects.create(name='Late return', amount=Decimal('20.00'))
+        self.dirty = Penalty.objects.create(name='Dirty interior', amount=Decimal('15.50'))
+
+    def create_rental(self, promo=None):
+        start = timezone.make_aware(datetime.combine(timezone.localdate() + timedelta(days=1), datetime.min.time()))
+        return Rental.objects.create(
+            car=self.car, client=self.client_obj, start_date=start, days=4,
+            expected_return_date=start + timedelta(days=4),
+            base_amount=Decimal('200.00'), final_amount=Decimal('200.00'),
+            status='active', promo_code=promo
+        )
+
+    def test_invoice_is_created_with_rental(self):
+        rental = self.create_rental(promo=self.promo)
+        invoice = Invoice.objects.get(rental=rental)
+        self.assertEqual(list(invoice.lines.values_list('kind', 'amount')), [
+            ('base', Decimal('200.00')), ('discount', Decimal('-20.00')),
+        ])
+        self.assertEqual(invoice.total_amount, Decimal('180.00'))
+        rental.refresh_from_db()
+        self.assertEqual(rental.final_amount, Decimal('180.00'))
+
+    def test_penalty_changes_recompute_invoice(self):
+        rental = self.create_rental(promo=self.promo)
+        rental.penalties.add(self.late, self.dirty)
+        invoice = Invoice.objects.get(rental=rental)
+        self.assertEqual(invoice.penalty_amount, Decimal('35.50'))
+        self.assertEqual(invoice.total_amount, Decimal('215.50'))
+        self.assertEqual(invoice.lines.filter(kind='penalty').count(), 2)
+
+        self.late.rental_set.remove(rental)
+        self.assertEqual(Invoice.objects.get(rental=rental).total_amount, Decimal('195.50'))
+        self.dirty.rental_set.clear()
+        rental.refresh_from_db()
+        self.assertEqual(rental.final_amount, Decimal('180.00'))
+        self.assertEqual(rollups.totals()['revenue'], Decimal('180.00'))
+
+    def test_promo_change_on_save_recomputes_invoice(self):
+        rental = self.create_rental()
+        rental.promo_code = self.promo
+        rental.save()
+        self.assertEqual(Invoice.objects.get(rental=rental).discount_amount, Decimal('20.00'))
+
+    def test_invoice_is_created_lazily_for_bulk_rentals(self):
+        rental = self.create_rental(promo=self.promo)
+        Invoice.objects.all().delete()
+        rental = Rental.objects.get(pk=rental.pk)
+        self.assertEqual(rental.calculate_final_amount(), Decimal('180.00'))
+        self.assertTrue(Invoice.objects.filter(rental=rental).exists())
+
+    def test_employee_update_keeps_promo_discount(self):
+        rental = self.create_rental(promo=self.promo)
+        staff = User.objects.create_user(username='staff_billing', password='testpass123', is_staff=True)
+        Employee.objects.create(
+            user=staff, position='Manager', phone='+375 (29) 123-45-67',
+            email='staff@example.com', birth_date=datetime(1990, 1, 1).date()
+        )
+        self.client.force_login(staff)
+        response = self.client.post(reverse('main:employee_rental_update', kwargs={'pk': rental.pk}), {
+            'status': 'completed', 'actual_return_date': '', 'penalties': [self.late.pk],
+        })
+        self.assertEqual(response.status_code, 302)
+        rental.refresh_from_db()
+        self.assertEqual(rental.final_amount, Decimal('200.00'))  # 200 - 20 + 20
+
+    def test_complete_rental_page_reads_snapshot(self):
+        rental = self.create_rental(promo=self.promo)
+        staff = User.objects.create_user(username='staff_complete', password='testpass123', is_staff=True)
+        self.client.force_login(staff)
+        url = reverse('main:complete_rental', kwargs={'pk': rental.pk})
+        response = self.client.get(url)
+        self.assertEqual(response.context['final_amount'], Decimal('180.00'))
+        self.assertEqual(response.context['discount_amount'], Decimal('20.00'))
+
+        self.client.post(url, {'penalties': [self.dirty.pk], 'notes': ''})
+        rental.refresh_from_db()
+        self.assertEqual(rental.status, 'completed')
+        self.assertEqual(rental.final_amount, Decimal('195.50'))
+        self.assertEqual(billing.get_invoice(rental).penalty_amount, Decimal('15.50'))
+
+        response = self.client.get(reverse('main:rental_detail', kwargs={'pk': rental.pk}))
+        self.assertContains(response, 'Dirty interior')
+        self.assertContains(response, '-$20.00')
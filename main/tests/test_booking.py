@@ -0,0 +1,91 @@
+from datetime import datetime, timedelta
+from django.test import TransactionTestCase
+from django.contrib.auth.models import User
+from django.utils import timezone
+from main.booking import book_rental, release_slots, BookingConflict
+from main.models import Car, CarType, CarModel, Rental, RentalSlot
+
+
+def midnight(day):
+    return timezone.make_aware(datetime.combine(day, datetime.min.time()))
+
+
+class TestBookingLedger(TransactionTestCase):
+    def setUp(self):
+        car_type = CarType.objects.create(name='Sedan', description='Family car')
+        car_model = CarModel.objects.create(
+            name='Camry',
+            manufacturer='Toyota',
+            car_type=car_type,
+            description='Reliable family sedan'
+        )
+        self.car = Car.objects.create(
+            license_plate='ABC123', model=car_model, year=2020, value=25000.00, daily_rate=50.00
+        )
+        self.client_obj = User.objects.create_user(
+            username='testuser_booking', password='testpass123'
+        ).client
+        self.start = timezone.localdate() + timedelta(days=3)
+
+    def make_rental(self, start, days):
+        return Rental(
+            car=self.car,
+            client=self.client_obj,
+            start_date=midnight(start),
+            days=days,
+            expected_return_date=midnight(start + timedelta(days=days)),
+            base_amount=50 * days,
+            final_amount=50 * days,
+            status='active'
+        )
+
+    def test_book_rental_reserves_one_slot_per_day(self):
+        rental = self.make_rental(self.start, 3)
+        book_rental(rental)
+        self.assertEqual(
+            list(RentalSlot.objects.filter(rental=rental).order_by('day').values_list('day', flat=True)),
+            [self.start + timedelta(days=i) for i in range(3)]
+        )
+
+    def test_overlapping_booking_is_rejected(self):
+        book_rental(self.make_rental(self.start, 3))
+        overlapping = self.make_rental(self.start + timedelta(days=2), 2)
+        with self.assertRaises(BookingConflict):
+            book_rental(overlapping)
+        self.assertIsNone(overlapping.pk)
+        self.assertEqual(Rental.objects.count(), 1)
+        self.assertEqual(RentalSlot.objects.count(), 3)
+
+    def test_adjacent_booking_is_allowed(self):
+        book_rental(self.make_rental(self.start, 3))
+        book_rental(self.make_rental(self.start + timedelta(days=3), 2))
+        self.assertEqual(RentalSlot.objects.count(), 5)
+
+    def test_release_slots_from_return_date(self):
+        rental = self.make_rental(self.start, 4)
+        book_rental(rental)
+        released = release_slots(rental, self.start + timedelta(days=1))
+        self.assertEqual(released, 3)
+        book_rental(self.make_rental(self.start + timedelta(days=1), 2))
+
+    def test_reactivated_rental_reserves_its_days_again(self):
+        from django.urls import reverse
+        staff = User.objects.create_user(username='staff_booking', password='x', is_staff=True)
+        self.client.force_login(staff)
+        rental = self.make_rental(self.start, 3)
+        book_rental(rental)
+        url = reverse('main:employee_rental_update', args=[rental.pk])
+
+        self.client.post(url, {'status': 'cancelled', 'actual_return_date': ''})
+        self.assertFalse(RentalSlot.objects.filter(rental=rental).exists())
+        self.client.post(url, {'status': 'active', 'actual_return_date': ''})
+        self.assertEqual(RentalSlot.objects.filter(rental=rental).count(), 3)
+
+        # Пока аренда была отменена, её дни заняла другая
+        self.client.post(url, {'status': 'cancelled', 'actual_return_date': ''})
+        book_rental(self.make_rental(self.start + timedelta(days=1), 2))
+        response = self.client.post(url, {'status': 'active', 'actual_return_date': ''})
+        self.assertEqual(response.status_code, 200)
+        rental.refresh_from_db()
+        self.assertEqual(rental.status, 'cancelled')
+        self.assertFalse(RentalSlot.objects.filter(rental=rental).exists())
@@ -0,0 +1,103 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+from django.test import TransactionTestCase
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils import timezone
+from main import facets
+from main.models import Car, CarType, CarModel, FacetCount, Rental
+
+
+class TestCarCatalog(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.sedan = CarType.objects.create(name='Sedan', description='Family car')
+        self.suv = CarType.objects.create(name='SUV', description='Sport Utility Vehicle')
+        self.camry = CarModel.objects.create(name='Camry', manufacturer='Toyota', car_type=self.sedan, description='')
+        self.x5 = CarModel.objects.create(name='X5', manufacturer='BMW', car_type=self.suv, description='')
+        self.cheap = Car.objects.create(license_plate='AAA111', model=self.camry, year=2015, value=10000, daily_rate=30)
+        self.mid = Car.objects.create(license_plate='BBB222', model=self.camry, year=2020, value=20000, daily_rate=50)
+        self.luxury = Car.objects.create(license_plate='CCC333', model=self.x5, year=2023, value=60000, daily_rate=120)
+
+    def plates(self, **params):
+        response = self.client.get(reverse('main:car_list'), params)
+        self.assertEqual(response.status_code, 200)
+        return [car.license_plate for car in response.context['cars']]
+
+    def test_filters(self):
+        self.assertEqual(self.plates(type=self.sedan.pk, sort='price_desc'), ['BBB222', 'AAA111'])
+        self.assertEqual(self.plates(manufacturer='BMW'), ['CCC333'])
+        self.assertEqual(self.plates(price_min=40, price_max=150, sort='price_asc'), ['BBB222', 'CCC333'])
+        self.assertEqual(self.plates(year_min=2016, sort='year_desc'), ['CCC333', 'BBB222'])
+        self.assertEqual(len(self.plates(price_min='not-a-number')), 3)
+
+    def test_availability_window_excludes_booked_cars(self):
+        start = timezone.localdate() + timedelta(days=5)
+        start_at = timezone.make_aware(datetime.combine(start, datetime.min.time()))
+        Rental.objects.create(
+            car=self.mid, client=User.objects.create_user(username='catalog_user', password='x').client,
+            start_date=start_at, days=3, expected_return_date=start_at + timedelta(days=3),
+            base_amount=150, final_amount=150, status='active'
+        )
+        window = {'available_from': start + timedelta(days=1), 'available_to': start + timedelta(days=2)}
+        self.assertEqual(sorted(self.plates(**window)), ['AAA111', 'CCC333'])
+        later = {'available_from': start + timedelta(days=3), 'available_to': start + timedelta(days=6)}
+        self.assertEqual(len(self.plates(**later)), 3)
+
+    def counts(self, facet):
+        return dict(FacetCount.objects.filter(facet=facet, count__gt=0).values_list('value', 'count'))
+
+    def test_car_changes_update_counts(self):
+        snapshot = facets.get()
+        self.assertEqual(snapshot.total, 3)
+        self.assertEqual(snapshot.type_choices, [(self.suv.pk, 'SUV', 1), (self.sedan.pk, 'Sedan', 2)])
+        self.assertEqual((snapshot.price_min, snapshot.price_max), (Decimal('30.00'), Decimal('120.00')))
+
+        Car.objects.create(license_plate='DDD444', model=self.x5, year=2024, value=90000, daily_rate=200)
+        self.cheap.daily_rate = 35
+        self.cheap.save()
+        self.luxury.delete()
+        # Счётчики правятся на месте, закешированный снимок сбрасывается
+        self.assertEqual(self.counts('rate'), {'3500': 1, '5000': 1, '20000': 1})
+        self.assertEqual(self.counts('type'), {str(self.sedan.pk): 2, str(self.suv.pk): 1})
+        self.assertIsNone(cache.get(facets.CACHE_KEY))
+        snapshot = facets.get()
+        self.assertEqual(snapshot.total, 3)
+        self.assertEqual(snapshot.manufacturers, {'Toyota': 2, 'BMW': 1})
+        self.assertEqual((snapshot.price_min, snapshot.price_max), (Decimal('35.00'), Decimal('200.00')))
+        self.assertEqual(snapshot.year_max, 2024)
+
+        facets.get()
+        self.mid.is_available = False
+        self.mid.save()  # значения фасетов не изменились
+        self.assertIsNotNone(cache.get(facets.CACHE_KEY))
+
+    def test_car_model_change_moves_counts(self):
+        facets.get()
+        self.camry.manufacturer = 'Lexus'
+        self.camry.car_type = self.suv
+        self.camry.save()
+        self.assertEqual(self.counts('type'), {str(self.suv.pk): 3})
+        self.assertIsNone(cache.get(facets.CACHE_KEY))
+        self.assertEqual(dict(facets.get().manufacturers), {'Lexus': 2, 'BMW': 1})
+        self.suv.name = 'Crossover'
+        self.suv.save()
+        self.assertEqual(facets.get().type_choices, [(self.suv.pk, 'Crossover', 3)])
+
+    def test_single_facet_request_costs_one_query(self):
+        url = reverse('main:car_list')
+        self.client.get(url)  # прогрев индекса фасетов
+        with self.assertNumQueries(1):
+            self.client.get(url, {'type': self.sedan.pk, 'sort': 'price_asc'})
+        with self.assertNumQueries(2):  # диапазон цен требует COUNT(*)
+            self.client.get(url, {'price_min': 40})
+
+    def test_availability_window_is_a_subquery(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        start = timezone.localdate() + timedelta(days=5)
+        with CaptureQueriesContext(connection) as queries:
+            self.plates(available_from=start, available_to=start + timedelta(days=2))
+        car_query = next(q['sql'] for q in queries if 'NOT ("main_car"."id" IN (SELECT' in q['sql'])
+        self.assertIn('"main_rental"', car_query)
@@ -0,0 +1,56 @@
+import os
+import tempfile
+from django.test import TransactionTestCase, override_settings
+from main import charts
+
+
+class TestCharts(TransactionTestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def test_chart_name_depends_on_data(self):
+        self.assertEqual(
+            charts.chart_name('availability', {'available': 1, 'rented': 2}),
+            charts.chart_name('availability', {'rented': 2, 'available': 1})
+        )
+        self.assertNotEqual(
+            charts.chart_name('availability', {'available': 1, 'rented': 2}),
+            charts.chart_name('availability', {'available': 2, 'rented': 1})
+        )
+
+    def test_chart_is_rendered_once_and_served_by_url(self):
+        with override_settings(CHART_ROOT=self.tmpdir.name, CHART_URL='/media/charts/', CHART_RENDER_WORKERS=0):
+            data = {'names': ['Sedan', 'SUV'], 'counts': [3, 1]}
+            url = charts.chart_url('car_types', data)
+            name = charts.chart_name('car_types', data)
+            self.assertEqual(url, f'/media/charts/{name}')
+            path = os.path.join(self.tmpdir.name, name)
+            with open(path, 'rb') as f:
+                self.assertEqual(f.read(8), b'\x89PNG\r\n\x1a\n')
+
+            inode = os.stat(path).st_ino  # повторный рендеринг заменил бы файл новым
+            self.assertEqual(charts.chart_url('car_types', data), url)
+            self.assertEqual(os.stat(path).st_ino, inode)
+
+    def test_chart_rendered_in_process_pool(self):
+        self.addCleanup(charts.shutdown)
+        with override_settings(CHART_ROOT=self.tmpdir.name, CHART_URL='/media/charts/', CHART_RENDER_WORKERS=1):
+            data = {'available': 3, 'rented': 1}
+            path = os.path.join(self.tmpdir.name, charts.chart_name('availability', data))
+            # Запрос не ждёт рендеринга: график появится на странице позже
+            self.assertIsNone(charts.chart_url('availability', data))
+            future = charts._pending.get(path)
+            if future is not None:
+                future.result(timeout=30)
+            self.assertTrue(os.path.exists(path))
+            self.assertEqual(charts.chart_url('availability', data), f'/media/charts/{os.path.basename(path)}')
+
+    def test_prune_keeps_recently_used_charts(self):
+        with override_settings(CHART_ROOT=self.tmpdir.name, CHART_MAX_FILES=2):
+            for age, name in enumerate(['new.png', 'mid.png', 'old.png']):
+                path = os.path.join(self.tmpdir.name, name)
+                open(path, 'wb').close()
+                os.utime(path, (1000 - age, 1000 - age))
+            self.assertEqual(charts.prune(), 1)
+            self.assertEqual(sorted(os.listdir(self.tmpdir.name)), ['mid.png', 'new.png'])
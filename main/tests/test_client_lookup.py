@@ -0,0 +1,59 @@
+from django.contrib.auth.models import User
+from django.test import TransactionTestCase
+from django.urls import reverse
+from main import lookup
+
+
+class TestClientLookup(TransactionTestCase):
+    def setUp(self):
+        self.ivan = self.make_client('ivan', 'Ivan', 'Petrov', 'Ivan.Petrov@Example.com', '+375 (29) 123-45-67')
+        self.maria = self.make_client('maria', 'Maria', 'Ivanova', 'maria@example.com', '+375 (33) 765-43-21')
+        self.staff = User.objects.create_user(username='staff', password='pass', is_staff=True)
+
+    def make_client(self, username, first_name, last_name, email, phone):
+        client = User.objects.create_user(
+            username=username, first_name=first_name, last_name=last_name, email=email
+        ).client
+        client.phone = phone
+        client.save()
+        return client
+
+    def ids(self, text, **kwargs):
+        return [client.pk for client in lookup.search(text, **kwargs)]
+
+    def test_normalized_columns(self):
+        self.ivan.refresh_from_db()
+        self.assertEqual(self.ivan.phone_digits, '375291234567')
+        self.assertEqual(self.ivan.email_lower, 'ivan.petrov@example.com')
+        self.ivan.user.last_name = 'Sidorov'
+        self.ivan.user.save()
+        self.ivan.refresh_from_db()
+        self.assertEqual(self.ivan.last_name_lower, 'sidorov')
+
+    def test_prefix_matching(self):
+        self.assertEqual(self.ids('IVAN'), [self.ivan.pk, self.maria.pk])
+        self.assertEqual(self.ids('ivan pet'), [self.ivan.pk])
+        self.assertEqual(self.ids('petrov ivan'), [self.ivan.pk])
+        self.assertEqual(self.ids('maria@'), [self.maria.pk])
+        self.assertEqual(self.ids('29 123'), [self.ivan.pk])
+        self.assertEqual(self.ids('+375 (33) 76'), [self.maria.pk])
+        self.assertEqual(self.ids('etrov'), [])
+        self.assertEqual(self.ids('2'), [])
+
+    def test_keyset_pages(self):
+        first = lookup.lookup('ivan', limit=1)
+        self.assertEqual([row['id'] for row in first['results']], [self.ivan.pk])
+        self.assertEqual(first['next_after'], self.ivan.pk)
+        second = lookup.lookup('ivan', after=first['next_after'], limit=1)
+        self.assertEqual([row['id'] for row in second['results']], [self.maria.pk])
+        self.assertIsNone(second['next_after'])
+
+    def test_lookup_endpoint(self):
+        url = reverse('main:employee_client_lookup')
+        self.client.force_login(self.ivan.user)
+        self.assertEqual(self.client.get(url, {'q': 'ivan'}).status_code, 302)
+        self.client.force_login(self.staff)
+        response = self.client.get(url, {'q': 'ivanova'})
+        self.assertEqual(response.json()['results'][0]['name'], 'Maria Ivanova')
+        response = self.client.get(reverse('main:employee_clients'), {'search': '29 12'})
+        self.assertEqual(list(response.context['clients']), [self.ivan])
@@ -0,0 +1,56 @@
+from datetime import timedelta
+from unittest import mock
+from django.contrib.auth.models import User
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from main.models import Article, Car, CarModel, CarType, Promo
+
+
+class TestConditionalGet(TransactionTestCase):
+    def setUp(self):
+        car_type = CarType.objects.create(name='Sedan', description='')
+        self.car_model = CarModel.objects.create(name='Camry', manufacturer='Toyota', car_type=car_type, description='')
+        self.car = Car.objects.create(license_plate='AB0001', model=self.car_model, year=2020, value=1, daily_rate=50)
+
+    def test_unchanged_article_costs_one_query(self):
+        article = Article.objects.create(title='News', content='...')
+        url = reverse('main:article_detail', args=[article.pk])
+        response = self.client.get(url)
+        self.assertTrue(response.has_header('Last-Modified'))
+        with self.assertNumQueries(1):
+            response = self.client.get(url, headers={'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+        etag = response['ETag']
+        article.title = 'Updated news'
+        article.save()
+        response = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertContains(response, 'Updated news')
+
+    def test_car_detail_revalidates_on_related_changes_and_role(self):
+        url = reverse('main:car_detail', args=[self.car.pk])
+        response = self.client.get(url)
+        etag, last_modified = response['ETag'], response['Last-Modified']
+        self.assertEqual(self.client.get(url, headers={'If-Modified-Since': last_modified}).status_code, 304)
+
+        # Для сотрудника страница другая (кнопки управления)
+        self.client.force_login(User.objects.create_user(username='staff', password='pass', is_staff=True))
+        self.assertEqual(self.client.get(url, headers={'If-None-Match': etag}).status_code, 200)
+        self.client.logout()
+
+        self.car_model.description = 'Reliable'
+        self.car_model.save()
+        self.assertEqual(self.client.get(url, headers={'If-None-Match': etag}).status_code, 200)
+
+    @override_settings(PAGE_CACHE_VIEWS={})  # в кеше страниц начало акции видно через PAGE_CACHE_TIMEOUT
+    def test_promo_list_changes_when_a_promo_starts(self):
+        now = timezone.now()
+        Promo.objects.create(code='SOON', description='', discount_percent=10,
+                             valid_from=now + timedelta(hours=1), valid_until=now + timedelta(days=1))
+        url = reverse('main:promos')
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, headers={'If-None-Match': etag}).status_code, 304)
+        with mock.patch('main.conditional.timezone.now', return_value=now + timedelta(hours=2)):
+            response = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,75 @@
+import csv
+import json
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+from main.models import Car, CarType, CarModel, Penalty, Promo, Rental
+
+
+class TestExports(TransactionTestCase):
+    def setUp(self):
+        car_type = CarType.objects.create(name='Sedan', description='')
+        car_model = CarModel.objects.create(name='Camry', manufacturer='Toyota', car_type=car_type, description='')
+        self.car = Car.objects.create(license_plate='AB0001', model=car_model, year=2020, value=20000, daily_rate=50)
+        self.customer = User.objects.create_user(username='ivan', first_name='Иван', last_name='Petrov').client
+        promo = Promo.objects.create(
+            code='SAVE10', description='', discount_percent=10,
+            valid_from=timezone.now() - timedelta(days=90), valid_until=timezone.now() + timedelta(days=90)
+        )
+        now = timezone.now()
+        self.old = self.make_rental(now - timedelta(days=40))
+        self.recent = self.make_rental(now - timedelta(days=5), promo_code=promo)
+        self.recent.penalties.add(Penalty.objects.create(name='Late', amount=30))
+        self.staff = User.objects.create_user(username='staff', password='x', is_staff=True)
+
+    def make_rental(self, start, **kwargs):
+        return Rental.objects.create(
+            car=self.car, client=self.customer, start_date=start, days=2,
+            expected_return_date=start + timedelta(days=2),
+            base_amount=100, final_amount=100, status='completed', **kwargs
+        )
+
+    def export(self, kind, **params):
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('main:employee_export', kwargs={'kind': kind}), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_rental_csv_with_invoice_totals_and_date_range(self):
+        since = (timezone.localdate() - timedelta(days=10)).isoformat()
+        rows = list(csv.DictReader(StringIO(self.export('rentals', date_from=since))))
+        self.assertEqual([int(row['id']) for row in rows], [self.recent.pk])
+        row = rows[0]
+        self.assertEqual((row['promo_code'], row['discount_amount'], row['penalty_amount'], row['final_amount']),
+                         ('SAVE10', '10.00', '30.00', '120.00'))
+        self.assertEqual(row['client_first_name'], 'Иван')
+
+    def test_jsonl_and_validation(self):
+        lines = self.export('cars', format='jsonl').splitlines()
+        self.assertEqual(json.loads(lines[0])['license_plate'], 'AB0001')
+        self.client.force_login(self.staff)
+        url = reverse('main:employee_export', kwargs={'kind': 'rentals'})
+        self.assertEqual(self.client.get(url, {'date_from': '2026-02-01', 'date_to': '2026-01-01'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('main:employee_export', kwargs={'kind': 'users'})).status_code, 404)
+
+    def test_requires_staff(self):
+        self.client.force_login(self.customer.user)
+        response = self.client.get(reverse('main:employee_export', kwargs={'kind': 'clients'}))
+        self.assertNotEqual(response.status_code, 200)
+
+    def test_command_writes_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'clients.jsonl')
+            out = StringIO()
+            call_command('export_data', 'clients', '--format', 'jsonl', '--output', path, '--chunk-size', '1', stdout=out)
+            self.assertIn('Exported 2 clients', out.getvalue())
+            with open(path, encoding='utf-8') as exported:
+                usernames = [json.loads(line)['username'] for line in exported]
+        self.assertEqual(usernames, ['ivan', 'staff'])
@@ -0,0 +1,77 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from django.core.cache import cache
+from django.test import TransactionTestCase, override_settings
+from main.external import ExternalContent, parse_cat_fact
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    status = 200
+    delay = 0
+    hits = 0
+
+    def do_GET(self):
+        type(self).hits += 1
+        if self.delay:
+            time.sleep(self.delay)
+        body = json.dumps({'fact': 'Cats sleep a lot.'}).encode()
+        self.send_response(self.status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestExternalContent(TransactionTestCase):
+    def setUp(self):
+        StubHandler.status, StubHandler.delay, StubHandler.hits = 200, 0, 0
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+        settings_override = override_settings(
+            EXTERNAL_CONTENT_URLS={'stub_fact': f'http://127.0.0.1:{self.server.server_port}/fact'},
+            EXTERNAL_CONTENT_TIMEOUT=(0.5, 0.5),
+            EXTERNAL_CONTENT_FAILURE_THRESHOLD=2,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        cache.clear()
+        self.source = ExternalContent('stub_fact', parse_cat_fact, ttl=60, fallback='fallback')
+
+    def test_cold_cache_returns_fallback_and_refreshes_in_background(self):
+        self.assertEqual(self.source.get(), 'fallback')
+        self.source._future.result(timeout=5)
+        self.assertEqual(self.source.get(), 'Cats sleep a lot.')
+        self.assertEqual(StubHandler.hits, 1)
+
+    def test_stale_value_is_served_while_revalidating(self):
+        cache.set(self.source.cache_key, {'value': 'old fact', 'fetched_at': time.time() - 120})
+        StubHandler.delay = 0.3
+        started = time.monotonic()
+        self.assertEqual(self.source.get(), 'old fact')
+        self.assertLess(time.monotonic() - started, 0.2)
+        self.source._future.result(timeout=5)
+        self.assertEqual(self.source.get(), 'Cats sleep a lot.')
+
+    def test_timeout_counts_as_failure(self):
+        StubHandler.delay = 1
+        self.assertIsNone(self.source.refresh())
+        self.assertEqual(self.source.breaker.failures, 1)
+
+    def test_circuit_breaker_stops_calling_failing_upstream(self):
+        StubHandler.status = 500
+        for _ in range(2):
+            future = self.source.refresh_async()
+            self.assertIsNotNone(future)
+            self.assertIsNone(future.result(timeout=5))
+        self.assertTrue(self.source.breaker.is_open)
+        self.assertIsNone(self.source.refresh_async())
+        self.assertEqual(StubHandler.hits, 2)
+        self.assertEqual(self.source.get(), 'fallback')
@@ -0,0 +1,65 @@
+import gzip
+import os
+import tempfile
+from django.test import TransactionTestCase, override_settings
+from main import fileserving
+
+
+class TestFileServing(TransactionTestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.static_root = tmpdir.name
+        settings_override = override_settings(STATIC_ROOT=self.static_root, MEDIA_ROOT=self.static_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.body = b'body { color: red; }\n' * 100
+        self.path = os.path.join(self.static_root, 'site.css')
+        with open(self.path, 'wb') as f:
+            f.write(self.body)
+
+    def get(self, **headers):
+        return self.client.get('/static/site.css', headers=headers)
+
+    def test_etag_and_conditional_get(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.body)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=3600')
+        self.assertEqual(self.get(if_none_match=response['ETag']).status_code, 304)
+        self.assertEqual(self.get(if_modified_since=response['Last-Modified']).status_code, 304)
+
+    def test_range_requests(self):
+        response = self.get(range='bytes=5-9')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 5-9/{len(self.body)}')
+        self.assertEqual(b''.join(response.streaming_content), self.body[5:10])
+        self.assertEqual(b''.join(self.get(range='bytes=-3').streaming_content), self.body[-3:])
+        self.assertEqual(self.get(range=f'bytes={len(self.body)}-').status_code, 416)
+        # Файл изменился с тех пор, как клиент получил часть: отдаётся целиком
+        self.assertEqual(self.get(range='bytes=0-1', if_range='"stale"').status_code, 200)
+
+    def test_precompressed_variant(self):
+        written = fileserving.compress_file(self.path)
+        self.assertIn(self.path + '.gz', written)
+        self.assertEqual(fileserving.compress_file(self.path), [])  # уже актуален
+        response = self.get(accept_encoding='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), self.body)
+        self.assertFalse(self.get(accept_encoding='gzip;q=0').has_header('Content-Encoding'))
+
+    @override_settings(FILE_SERVING_SENDFILE='x-accel-redirect')
+    def test_sendfile_handoff(self):
+        response = self.client.get('/media/site.css')
+        self.assertEqual(response['X-Accel-Redirect'], '/protected/media/site.css')
+        self.assertEqual(response.content, b'')
+        self.assertTrue(response.has_header('ETag'))
+
+    def test_path_outside_document_root_is_not_found(self):
+        with self.assertNoLogs('django.request', level='ERROR'):
+            self.assertEqual(self.client.get('/media/../manage.py').status_code, 404)
+            self.assertEqual(self.client.get('/static/%2e%2e/manage.py').status_code, 404)
+            self.assertEqual(self.client.get('/static/site.css%00').status_code, 404)
@@ -0,0 +1,71 @@
+from django.contrib.auth.models import User
+from django.template import Context, Template
+from django.test import TransactionTestCase
+from django.urls import reverse
+from main import fragments
+from main.models import FAQ, Article, Car, CarModel, CarType
+
+CARDS = Template(
+    "{% load fragment_extras %}{% for car in cars %}"
+    "{% cachefragment 'card' car 'main.CarType' vary staff %}[{{ car.license_plate }} {{ renders }}]{% endcachefragment %}"
+    "{% endfor %}"
+)
+
+
+class RenderCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __str__(self):
+        self.count += 1
+        return ''
+
+
+class TestFragmentCache(TransactionTestCase):
+    def setUp(self):
+        self.sedan = CarType.objects.create(name='Sedan', description='')
+        car_model = CarModel.objects.create(name='Camry', manufacturer='Toyota', car_type=self.sedan, description='')
+        self.first = Car.objects.create(license_plate='AB0001', model=car_model, year=2020, value=1, daily_rate=50)
+        self.second = Car.objects.create(license_plate='AB0002', model=car_model, year=2020, value=1, daily_rate=50)
+        self.renders = RenderCounter()
+
+    def render(self, staff=False):
+        return CARDS.render(Context({'cars': Car.objects.order_by('pk'), 'renders': self.renders, 'staff': staff}))
+
+    def test_only_changed_cards_are_rerendered(self):
+        self.assertEqual(self.render(), '[AB0001 ][AB0002 ]')
+        self.render()
+        self.assertEqual(self.renders.count, 2)
+
+        self.first.license_plate = 'AB0009'
+        self.first.save()
+        Article.objects.create(title='Unrelated', content='...')
+        self.assertEqual(self.render(), '[AB0009 ][AB0002 ]')
+        self.assertEqual(self.renders.count, 3)
+
+        self.render(staff=True)
+        self.assertEqual(self.renders.count, 5)
+
+        self.sedan.name = 'Saloon'
+        self.sedan.save()
+        self.render()
+        self.assertEqual(self.renders.count, 7)
+
+        fragments.reset()
+        self.render()
+        self.assertEqual(self.renders.count, 9)
+
+    def test_pages_show_changes(self):
+        FAQ.objects.create(question='Deposit?', answer='No.')
+        self.assertContains(self.client.get(reverse('main:faq')), 'Deposit?')
+        faq = FAQ.objects.create(question='Insurance?', answer='Yes.')
+        self.assertContains(self.client.get(reverse('main:faq')), 'Insurance?')
+        faq.delete()
+        self.assertNotContains(self.client.get(reverse('main:faq')), 'Insurance?')
+
+        user = User.objects.create_user(username='anna', password='x')
+        self.client.login(username='anna', password='x')  # last_login не сбрасывает фрагменты
+        version = fragments.versions([fragments.dependency_key('auth.User')])
+        user.refresh_from_db()
+        user.save(update_fields=['last_login'])
+        self.assertEqual(fragments.versions([fragments.dependency_key('auth.User')]), version)
@@ -0,0 +1,71 @@
+import os
+import tempfile
+from io import BytesIO, StringIO
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.template import Context, Template
+from django.test import TransactionTestCase, override_settings
+from PIL import Image
+from main import images
+from main.models import Article
+
+
+def jpeg_upload(width, height, name='photo.jpg'):
+    exif = Image.Exif()
+    exif[0x0112] = 6  # Orientation: повернуть на 90°
+    exif[0x010F] = 'SecretCam'
+    buffer = BytesIO()
+    Image.new('RGB', (width, height), 'red').save(buffer, format='JPEG', exif=exif)
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+
+class TestImageDerivatives(TransactionTestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        media = tmpdir.name
+        settings_override = override_settings(
+            MEDIA_ROOT=media, IMAGE_DERIVATIVE_ROOT=os.path.join(media, 'derivatives'),
+            IMAGE_DERIVATIVE_URL='/media/derivatives/', IMAGE_DERIVATIVE_WIDTHS=(320, 640, 1280),
+            IMAGE_DERIVATIVE_WORKERS=0,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_upload_records_dimensions_and_renders_derivatives(self):
+        article = Article.objects.create(title='Summer', content='...', image=jpeg_upload(900, 500))
+        article.refresh_from_db()
+        self.assertEqual((article.image_width, article.image_height), (500, 900))
+        self.assertEqual(images.derivative_widths(500), [320, 500])
+
+        path = images.derivative_path(article.image.name, 320, 'jpeg')
+        with Image.open(path) as derivative:
+            # Ориентация применена к пикселям, EXIF удалён
+            self.assertEqual(derivative.size, (320, 576))
+            self.assertNotIn('exif', derivative.info)
+        self.assertTrue(os.path.exists(images.derivative_path(article.image.name, 500, 'webp')))
+
+        html = Template("{% load image_extras %}{% responsive_image article 'image' sizes='50vw' alt='Summer' %}").render(
+            Context({'article': article})
+        )
+        self.assertIn('<source type="image/webp"', html)
+        self.assertIn('-500w.webp 500w', html)
+        self.assertIn('loading="lazy"', html)
+        self.assertIn('width="500" height="900"', html)
+
+    def test_backfill_command(self):
+        article = Article.objects.create(title='Old', content='...', image=jpeg_upload(400, 300))
+        Article.objects.filter(pk=article.pk).update(image_width=None, image_height=None)
+        for name in os.listdir(os.path.dirname(images.derivative_path(article.image.name, 320, 'jpeg'))):
+            os.remove(os.path.join(os.path.dirname(images.derivative_path(article.image.name, 320, 'jpeg')), name))
+
+        html = Template("{% load image_extras %}{% responsive_image article %}").render(
+            Context({'article': Article.objects.get()})
+        )
+        self.assertIn(f'src="{article.image.url}"', html)
+
+        out = StringIO()
+        call_command('generate_image_derivatives', workers=1, stdout=out)
+        self.assertIn('Rendered 2 derivatives for 1 images', out.getvalue())
+        article.refresh_from_db()
+        self.assertEqual((article.image_width, article.image_height), (300, 400))
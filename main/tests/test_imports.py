@@ -0,0 +1,88 @@
+import os
+import tempfile
+from io import StringIO
+from django.core.management import call_command
+from django.test import TransactionTestCase
+from django.utils import timezone
+from main import imports, search
+from main.models import Car, CarType, CarModel, Client, Invoice, Promo, Rental
+
+
+def run(kind, text, fmt='csv', **kwargs):
+    return imports.IMPORTERS[kind](**kwargs).run(imports.read_rows(StringIO(text), fmt))
+
+
+class TestImports(TransactionTestCase):
+    def setUp(self):
+        self.sedan = CarType.objects.create(name='Sedan', description='')
+        self.camry = CarModel.objects.create(name='Camry', manufacturer='Toyota', car_type=self.sedan, description='')
+
+    def test_car_models_are_indexed_for_search(self):
+        report = run('car_models', 'name,manufacturer,car_type,description\n'
+                                   'Octavia,Skoda,Sedan,Liftback\nCamry,Toyota,Sedan,Dup\nX5,BMW,SUV,Crossover\n')
+        self.assertEqual(report.imported, 1)
+        self.assertEqual([errors for _, errors in report.errors], [
+            {'name': ['This car model already exists.']}, {'car_type': ['Unknown car type.']},
+        ])
+        self.assertEqual([result.title for result in search.search('octa')], ['Skoda Octavia'])
+
+    def test_cars_in_chunks_with_row_errors(self):
+        report = run('cars', (
+            'license_plate,manufacturer,model,year,value,daily_rate,is_available\n'
+            'AB0001,Toyota,Camry,2020,20000,50,True\n'
+            'AB0002,Toyota,Camry,2020,-5,fifty,True\n'
+            'AB0001,Toyota,Camry,2021,20000,55,True\n'
+            'AB0003,Lada,Vesta,2021,9000,25,False\n'
+            'AB0004,,,2022,21000,60,False\n'
+        ), chunk_size=2)
+        self.assertEqual(report.imported, 1)
+        self.assertEqual([line for line, _ in report.errors], [3, 4, 5, 6])
+        self.assertIn('license_plate', report.errors[1][1])
+        self.assertIn('model', report.errors[2][1])
+        self.assertEqual(list(Car.objects.values_list('license_plate', flat=True)), ['AB0001'])
+
+        lines = f'{{"license_plate": "AB0005", "model_id": {self.camry.pk}, "year": 2022, "value": 1, "daily_rate": 9}}\n{{oops\n'
+        report = run('cars', lines, fmt='jsonl')
+        self.assertEqual(report.imported, 1)
+        self.assertIn('Invalid JSON', report.errors[0][1]['__all__'][0])
+
+    def test_clients_and_rentals_with_invoices(self):
+        report = run('clients', 'username,first_name,last_name,email,phone,birth_date,address\n'
+                                'ivan,Ivan,Petrov,Ivan@Example.com,+375 (29) 123-45-67,1990-01-01,Minsk\n'
+                                'kid,Kid,Young,,+375 (29) 000-00-01,2020-01-01,Minsk\n')
+        self.assertEqual(report.imported, 1)
+        self.assertIn('__all__', report.errors[0][1])  # Client.clean: младше 18 лет
+        client = Client.objects.get(user__username='ivan')
+        self.assertEqual((client.email_lower, client.phone_digits), ('ivan@example.com', '375291234567'))
+        self.assertFalse(client.user.has_usable_password())
+
+        Car.objects.create(license_plate='AB0001', model=self.camry, year=2020, value=20000, daily_rate=50)
+        Promo.objects.create(code='SAVE10', description='', discount_percent=10,
+                             valid_from=timezone.now(), valid_until=timezone.now())
+        report = run('rentals', (
+            'license_plate,client_username,promo_code,start_date,expected_return_date,'
+            'actual_return_date,days,status,base_amount\n'
+            'AB0001,ivan,SAVE10,2024-03-01 10:00:00+00:00,2024-03-03 10:00:00+00:00,,2,completed,100\n'
+            'AB0001,ivan,,2024-04-01 10:00:00+00:00,2024-04-03 10:00:00+00:00,,2,active,100\n'
+            'ZZ9999,nobody,,2024-05-01 10:00:00+00:00,2024-05-03 10:00:00+00:00,,2,completed,100\n'
+        ))
+        self.assertEqual(report.imported, 1)
+        self.assertIn('status', report.errors[0][1])
+        self.assertEqual(set(report.errors[1][1]), {'license_plate', 'client_username'})
+        rental = Rental.objects.get()
+        self.assertEqual(rental.final_amount, 90)
+        self.assertEqual(Invoice.objects.get(rental=rental).lines.count(), 2)
+
+    def test_command_dry_run_and_error_report(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'cars.csv')
+            errors = os.path.join(directory, 'errors.csv')
+            with open(path, 'w') as source:
+                source.write('license_plate,manufacturer,model,year,value,daily_rate\n'
+                             'AB0001,Toyota,Camry,2020,20000,50\nAB0002,Toyota,Camry,,20000,50\n')
+            out = StringIO()
+            call_command('import_data', 'cars', path, '--dry-run', '--errors', errors, stdout=out, stderr=StringIO())
+            self.assertIn('Validated 1 cars, 1 rows rejected', out.getvalue())
+            self.assertFalse(Car.objects.exists())
+            with open(errors) as report:
+                self.assertEqual(report.read().splitlines()[1], '3,year,This field is required.')
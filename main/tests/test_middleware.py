@@ -0,0 +1,55 @@
+import json
+from django.test import TransactionTestCase, Client as TestClient
+from django.urls import reverse
+from main.models import CarType
+
+
+class TestPerformanceMiddleware(TransactionTestCase):
+    def setUp(self):
+        self.http = TestClient()
+        CarType.objects.create(name='Sedan', description='Family car')
+
+    def test_server_timing_header(self):
+        response = self.http.get(reverse('main:car_list'))
+        timing = response['Server-Timing']
+        for metric in ('db;dur=', 'cache;desc=', 'tpl;dur=', 'http;dur=', 'total;dur='):
+            self.assertIn(metric, timing)
+        self.assertNotIn('db;dur=0.0;desc="0 queries"', timing)
+
+    def test_structured_log_line_keyed_by_url_name(self):
+        with self.assertLogs('main.performance', level='INFO') as logs:
+            self.http.get(reverse('main:car_list'))
+        record = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(record['url_name'], 'main:car_list')
+        self.assertEqual(record['status'], 200)
+        self.assertGreater(record['db_queries'], 0)
+        self.assertGreater(record['template_ms'], 0)
+        self.assertEqual(record['http_calls'], 0)
+
+    def test_cache_lookups_are_counted_by_the_backend(self):
+        from django.core.cache import cache
+        from main import instrumentation
+        metrics = instrumentation.RequestMetrics()
+        token = instrumentation.activate(metrics)
+        try:
+            cache.set('metrics-test', 1)
+            cache.get('metrics-test')
+            cache.get('metrics-test-missing')
+            cache.get_or_set('metrics-test-computed', lambda: 2)
+        finally:
+            instrumentation.deactivate(token)
+        self.assertEqual((metrics.cache_hits, metrics.cache_misses), (1, 2))
+
+    def test_http_calls_on_the_request_thread_are_counted(self):
+        from unittest import mock
+        from main import external, instrumentation
+        metrics = instrumentation.RequestMetrics()
+        token = instrumentation.activate(metrics)
+        try:
+            with mock.patch.object(external, 'get_session') as get_session:
+                get_session.return_value.get.return_value.json.return_value = {'fact': 'Cats purr.'}
+                self.assertEqual(external.cat_facts.refresh(), 'Cats purr.')
+        finally:
+            instrumentation.deactivate(token)
+        self.assertEqual(metrics.as_dict()['http_calls'], 1)
+        self.assertIn('desc="1 calls"', metrics.server_timing(0.01))
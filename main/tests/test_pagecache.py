@@ -0,0 +1,44 @@
+from unittest import mock
+from django.contrib.auth.models import User
+from django.db import OperationalError
+from django.test import TransactionTestCase
+from django.urls import reverse
+from main.models import FAQ
+from main.views import FAQListView
+
+
+class TestAnonymousPageCache(TransactionTestCase):
+    def setUp(self):
+        FAQ.objects.create(question='How to rent?', answer='Online.')
+
+    def test_anonymous_page_is_cached_until_content_changes(self):
+        response = self.client.get(reverse('main:faq'))
+        self.assertEqual(response['X-Page-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('main:faq'))
+        self.assertEqual(response['X-Page-Cache'], 'HIT')
+        self.assertContains(response, 'How to rent?')
+
+        FAQ.objects.create(question='Is insurance included?', answer='Yes.')
+        response = self.client.get(reverse('main:faq'))
+        self.assertEqual(response['X-Page-Cache'], 'MISS')
+        self.assertContains(response, 'Is insurance included?')
+
+    def test_authenticated_requests_bypass_the_cache(self):
+        self.client.get(reverse('main:faq'))
+        self.client.force_login(User.objects.create_user(username='anna', password='pass'))
+        response = self.client.get(reverse('main:faq'))
+        self.assertFalse(response.has_header('X-Page-Cache'))
+        self.assertContains(response, 'Logout')
+
+    def test_last_good_page_is_served_when_rendering_fails(self):
+        self.client.get(reverse('main:faq'))
+        FAQ.objects.create(question='Is insurance included?', answer='Yes.')
+        locked = OperationalError('database is locked')
+        with mock.patch.object(FAQListView, 'get_queryset', side_effect=locked), \
+                self.assertLogs('main.pagecache', level='WARNING'):
+            response = self.client.get(reverse('main:faq'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Page-Cache'], 'STALE')
+        self.assertContains(response, 'How to rent?')
+        self.assertNotContains(response, 'Is insurance included?')
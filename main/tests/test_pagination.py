@@ -0,0 +1,75 @@
+from datetime import timedelta
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+from main.models import Car, CarType, CarModel, Rental
+from main.pagination import decode_cursor, encode_cursor
+
+
+class TestKeysetPagination(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        car_type = CarType.objects.create(name='Sedan', description='')
+        car_model = CarModel.objects.create(name='Camry', manufacturer='Toyota', car_type=car_type, description='')
+        car = Car.objects.create(license_plate='AB0001', model=car_model, year=2020, value=20000, daily_rate=50)
+        client = User.objects.create_user(username='client', password='x').client
+        start = timezone.now().replace(microsecond=123456) - timedelta(days=60)
+        # Пары аренд с одинаковой датой начала проверяют второй ключ (id)
+        self.rentals = [
+            Rental.objects.create(
+                car=car, client=client, start_date=start + timedelta(days=i // 2), days=1,
+                expected_return_date=start + timedelta(days=i // 2 + 1),
+                base_amount=50, final_amount=50, status='completed'
+            )
+            for i in range(25)
+        ]
+        self.expected = [rental.pk for rental in sorted(self.rentals, key=lambda r: (r.start_date, r.pk), reverse=True)]
+        staff = User.objects.create_user(username='staff', password='x', is_staff=True)
+        self.client.force_login(staff)
+
+    def get(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_walks_all_pages_forward_and_back(self):
+        url = reverse('main:employee_rentals')
+        response = self.get(url)
+        seen = [rental.pk for rental in response.context['rentals']]
+        self.assertFalse(response.context['page_obj'].has_previous)
+        pages = [response]
+        while response.context['page_obj'].has_next:
+            response = self.get(url + response.context['page_obj'].next_url)
+            seen += [rental.pk for rental in response.context['rentals']]
+            pages.append(response)
+        self.assertEqual(seen, self.expected)
+        self.assertEqual(len(pages), 2)
+
+        previous = self.get(url + pages[-1].context['page_obj'].previous_url)
+        self.assertEqual([rental.pk for rental in previous.context['rentals']], self.expected[:20])
+        self.assertFalse(previous.context['page_obj'].has_previous)
+
+    def test_filters_survive_in_links(self):
+        response = self.get(reverse('main:rental_list') + '?status=completed')
+        self.assertIn('status=completed', response.context['page_obj'].next_url)
+
+    def test_approximate_count_is_cached(self):
+        url = reverse('main:reviews')
+        self.assertEqual(self.get(url).context['page_obj'].count, 0)
+        User.objects.get(username='client').client.review_set.create(rating=5, text='Great')
+        page = self.get(url).context['page_obj']
+        self.assertEqual((page.count, page.count_is_approximate), (0, True))
+
+    def test_cursor_round_trip_and_invalid_cursor(self):
+        rental = self.rentals[3]
+        fields = ('-start_date', '-id')
+        self.assertEqual(decode_cursor(encode_cursor([rental.start_date, rental.pk]), Rental, fields),
+                         [rental.start_date, rental.pk])
+        self.assertEqual(self.client.get(reverse('main:employee_rentals'), {'cursor': 'garbage'}).status_code, 404)
+        for values in (['notadate', 1], [{'a': 1}, 1], [None, 1], [str(rental.start_date), 'x']):
+            response = self.client.get(reverse('main:employee_rentals'), {'cursor': encode_cursor(values)})
+            self.assertEqual(response.status_code, 404)
+        response = self.client.get(reverse('main:reviews'), {'cursor': encode_cursor(['notadate', 1])})
+        self.assertEqual(response.status_code, 404)
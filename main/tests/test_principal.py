@@ -0,0 +1,48 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from django.contrib.auth.models import AnonymousUser, User
+from django.db import connection
+from django.test import TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from main import principal
+from main.models import Car, CarModel, CarType, Employee, Rental
+
+
+class TestPrincipal(TransactionTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='anna', password='pass')
+        Employee.objects.create(user=self.user, position='Manager', phone='+375 (29) 123-45-67',
+                                email='anna@example.com', birth_date=date(1990, 1, 1))
+
+    def test_profiles_load_once_and_only_when_needed(self):
+        user = User.objects.get(pk=self.user.pk)
+        resolved = principal.Principal(user)
+        with self.assertNumQueries(1):
+            self.assertTrue(resolved.has_staff_access)
+            self.assertTrue(hasattr(user, 'employee'))
+            self.assertEqual(user.client, resolved.client)
+        self.assertFalse(resolved.is_staff)
+
+        staff = User.objects.create_user(username='boss', password='pass', is_staff=True)
+        with self.assertNumQueries(0):
+            self.assertTrue(principal.Principal(staff).has_staff_access)
+            self.assertFalse(principal.Principal(AnonymousUser()).has_staff_access)
+
+    def test_rental_detail_fetches_rental_once(self):
+        car_type = CarType.objects.create(name='Sedan', description='')
+        car_model = CarModel.objects.create(name='Camry', manufacturer='Toyota', car_type=car_type, description='')
+        car = Car.objects.create(license_plate='AB0001', model=car_model, year=2020, value=1, daily_rate=50)
+        start = timezone.now() + timedelta(days=1)
+        rental = Rental.objects.create(
+            car=car, client=self.user.client, start_date=start, days=2, expected_return_date=start + timedelta(days=2),
+            base_amount=Decimal('100.00'), final_amount=Decimal('100.00'), status='active',
+        )
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('main:rental_detail', args=[rental.pk]))
+        self.assertEqual(response.status_code, 200)
+        rental_selects = [q['sql'] for q in queries if q['sql'].startswith('SELECT "main_rental"."id"')]
+        self.assertEqual(len(rental_selects), 1)
+
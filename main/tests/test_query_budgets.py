@@ -0,0 +1,98 @@
+from datetime import timedelta
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TransactionTestCase, Client as TestClient
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from main.models import Car, CarType, CarModel, Employee, Rental, Review
+
+
+class QueryBudgetTestCase(TransactionTestCase):
+    """Fails when a page's query count grows with the number of rows it renders."""
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.http.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def assertQueriesDoNotGrow(self, url, add_rows, rows=3):
+        add_rows(rows)
+        self.count_queries(url)  # прогрев: сессия, кеши
+        baseline = self.count_queries(url)
+        add_rows(rows)
+        self.count_queries(url)  # новые строки могут сбросить кеши (например, фасеты каталога)
+        grown = self.count_queries(url)
+        self.assertEqual(
+            grown, baseline,
+            f'{url}: {baseline} queries with {rows} rows, {grown} with {rows * 2}'
+        )
+
+
+class TestListQueryBudgets(QueryBudgetTestCase):
+    def setUp(self):
+        self.http = TestClient()
+        self.staff = User.objects.create_user(username='staff_budget', password='testpass123', is_staff=True)
+        self.counter = 0
+
+    def add_cars(self, n):
+        cars = []
+        for _ in range(n):
+            self.counter += 1
+            car_type = CarType.objects.create(name=f'Type {self.counter}', description='')
+            car_model = CarModel.objects.create(
+                name=f'Model {self.counter}', manufacturer=f'Maker {self.counter}',
+                car_type=car_type, description=''
+            )
+            cars.append(Car.objects.create(
+                license_plate=f'AB{self.counter:04d}', model=car_model,
+                year=2020, value=20000, daily_rate=40 + self.counter
+            ))
+        return cars
+
+    def add_rentals(self, n):
+        start = timezone.now() - timedelta(days=30)
+        for car in self.add_cars(n):
+            client = User.objects.create_user(username=f'client_budget_{car.pk}', password='x').client
+            Rental.objects.create(
+                car=car, client=client, start_date=start, days=2,
+                expected_return_date=start + timedelta(days=2),
+                base_amount=100, final_amount=100, status='active'
+            )
+
+    def add_reviews(self, n):
+        for _ in range(n):
+            self.counter += 1
+            client = User.objects.create_user(username=f'reviewer_{self.counter}', password='x').client
+            Review.objects.create(client=client, rating=5, text='Great')
+
+    def test_car_list(self):
+        self.assertQueriesDoNotGrow(reverse('main:car_list'), self.add_cars)
+
+    def test_rental_list(self):
+        self.http.login(username='staff_budget', password='testpass123')
+        self.assertQueriesDoNotGrow(reverse('main:rental_list'), self.add_rentals)
+
+    def test_employee_rental_list(self):
+        self.http.login(username='staff_budget', password='testpass123')
+        self.assertQueriesDoNotGrow(reverse('main:employee_rentals'), self.add_rentals)
+
+    def test_employee_dashboard(self):
+        Employee.objects.create(
+            user=self.staff, position='Manager', phone='+375 (29) 111-22-33',
+            email='staff@example.com', birth_date='1990-01-01'
+        )
+        self.http.login(username='staff_budget', password='testpass123')
+        self.assertQueriesDoNotGrow(reverse('main:employee_dashboard'), self.add_rentals)
+
+    def test_employee_client_list(self):
+        self.http.login(username='staff_budget', password='testpass123')
+        self.assertQueriesDoNotGrow(reverse('main:employee_clients'), self.add_rentals)
+
+    def test_reviews(self):
+        self.assertQueriesDoNotGrow(reverse('main:reviews'), self.add_reviews)
+
+    def test_rental_form_car_choices(self):
+        self.http.login(username='staff_budget', password='testpass123')
+        self.assertQueriesDoNotGrow(reverse('main:rental_create'), self.add_cars)
@@ -0,0 +1,113 @@
+from datetime import datetime, timedelta
+from io import StringIO
+from decimal import Decimal
+from django.test import TransactionTestCase
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.utils import timezone
+from main import rollups
+from main.models import Car, CarType, CarModel, Rental, RentalRollup, CarTypeRollup
+
+
+def rollup_snapshot():
+    return (
+        sorted(RentalRollup.objects.values_list('period', 'bucket_start', 'rental_count', 'total_days', 'revenue')),
+        sorted(CarTypeRollup.objects.values_list('period', 'bucket_start', 'car_type_id', 'rental_count')),
+    )
+
+
+class TestRentalRollups(TransactionTestCase):
+    def setUp(self):
+        self.sedan = CarType.objects.create(name='Sedan', description='Family car')
+        self.suv = CarType.objects.create(name='SUV', description='Sport Utility Vehicle')
+        self.sedan_car = Car.objects.create(
+            license_plate='ABC123',
+            model=CarModel.objects.create(name='Camry', manufacturer='Toyota', car_type=self.sedan, description=''),
+            year=2020, value=25000.00, daily_rate=50.00
+        )
+        self.suv_car = Car.objects.create(
+            license_plate='XYZ789',
+            model=CarModel.objects.create(name='RAV4', manufacturer='Toyota', car_type=self.suv, description=''),
+            year=2021, value=30000.00, daily_rate=70.00
+        )
+        self.client_obj = User.objects.create_user(username='testuser_rollups', password='testpass123').client
+
+    def create_rental(self, car, start, days, amount):
+        start = timezone.make_aware(datetime.combine(start, datetime.min.time()))
+        return Rental.objects.create(
+            car=car,
+            client=self.client_obj,
+            start_date=start,
+            days=days,
+            expected_return_date=start + timedelta(days=days),
+            base_amount=amount,
+            final_amount=amount,
+            status='completed'
+        )
+
+    def test_bucket_start(self):
+        day = datetime(2025, 5, 15).date()  # четверг
+        self.assertEqual(rollups.bucket_start('day', day), day)
+        self.assertEqual(rollups.bucket_start('week', day), datetime(2025, 5, 12).date())
+        self.assertEqual(rollups.bucket_start('month', day), datetime(2025, 5, 1).date())
+
+    def test_incremental_updates(self):
+        day = datetime(2025, 5, 15).date()
+        rental = self.create_rental(self.sedan_car, day, 2, Decimal('100.00'))
+        self.create_rental(self.suv_car, day + timedelta(days=20), 4, Decimal('280.00'))
+
+        totals = rollups.totals()
+        self.assertEqual(totals['rental_count'], 2)
+        self.assertEqual(totals['revenue'], Decimal('380.00'))
+        self.assertEqual(totals['avg_days'], 3)
+
+        rental.final_amount = Decimal('150.00')
+        rental.save()
+        self.assertEqual(rollups.totals()['revenue'], Decimal('430.00'))
+        may = RentalRollup.objects.get(period='month', bucket_start=datetime(2025, 5, 1).date())
+        self.assertEqual(may.rental_count, 1)
+
+        rental.delete()
+        self.assertEqual(rollups.totals()['rental_count'], 1)
+        popularity = {car_type.name: car_type.rental_count for car_type in rollups.car_type_popularity()}
+        self.assertEqual(popularity, {'Sedan': 0, 'SUV': 1})
+
+    def test_backfill_matches_incremental(self):
+        day = datetime(2025, 1, 30).date()
+        for offset in range(0, 60, 7):
+            self.create_rental(self.sedan_car if offset % 2 else self.suv_car, day + timedelta(days=offset), 3, Decimal('90.00'))
+        incremental = rollup_snapshot()
+
+        RentalRollup.objects.all().delete()
+        call_command('backfill_rollups', chunk_size=3, workers=1, stdout=StringIO())
+        self.assertEqual(rollup_snapshot(), incremental)
+
+    def test_car_type_changes_move_rentals(self):
+        day = datetime(2025, 3, 10).date()
+        for offset in (0, 1, 40):
+            self.create_rental(self.sedan_car, day + timedelta(days=offset), 2, Decimal('100.00'))
+        self.create_rental(self.suv_car, day, 2, Decimal('140.00'))
+
+        self.sedan_car.model = self.suv_car.model
+        self.sedan_car.save()
+        popularity = {car_type.name: car_type.rental_count for car_type in rollups.car_type_popularity()}
+        self.assertEqual(popularity, {'Sedan': 0, 'SUV': 4})
+
+        camry = CarModel.objects.get(name='Camry')
+        self.sedan_car.model = camry
+        self.sedan_car.save()
+        camry.car_type = self.suv
+        camry.save()
+        # Пустые строки после переноса остаются, пересборка их не создаёт
+        incremental = [row for row in rollup_snapshot()[1] if row[3]]
+        rollups.rebuild()
+        self.assertEqual(rollup_snapshot()[1], incremental)
+
+    def test_migration_fills_rollups(self):
+        from importlib import import_module
+        from django.apps import apps
+        self.create_rental(self.sedan_car, datetime(2025, 3, 10).date(), 2, Decimal('100.00'))
+        incremental = rollup_snapshot()
+        RentalRollup.objects.all().delete()
+        import_module('main.migrations.0020_fill_rental_rollups').fill_rollups(apps, None)
+        self.assertEqual(rollup_snapshot(), incremental)
@@ -0,0 +1,75 @@
+from io import StringIO
+from django.test import TransactionTestCase
+from django.core.management import call_command
+from django.db import connection
+from django.urls import reverse
+from main import search
+from main.models import Article, CarType, CarModel, FAQ
+
+
+class TestSearch(TransactionTestCase):
+    def setUp(self):
+        sedan = CarType.objects.create(name='Sedan', description='Family car')
+        self.camry = CarModel.objects.create(
+            name='Camry', manufacturer='Toyota', car_type=sedan, description='Reliable family sedan'
+        )
+        self.article = Article.objects.create(
+            title='Summer road trips', content='Why a Toyota is the best choice for a <b>family</b> trip'
+        )
+        self.faq = FAQ.objects.create(question='Can I return the car late?', answer='Late returns are charged.')
+
+    def kinds(self, text, **kwargs):
+        return [(result.kind, result.object_id) for result in search.search(text, **kwargs)]
+
+    def test_prefix_matching_and_title_ranking(self):
+        # Совпадение в заголовке (модель) важнее совпадения в тексте статьи
+        self.assertEqual(self.kinds('toy'), [('car_model', self.camry.pk), ('article', self.article.pk)])
+        self.assertEqual(self.kinds('toy cam'), [('car_model', self.camry.pk)])
+        self.assertEqual(self.kinds('late', kinds=['faq']), [('faq', self.faq.pk)])
+
+    def test_user_input_is_not_parsed_as_fts_syntax(self):
+        self.assertEqual(self.kinds('"toyota" OR NEAR('), [])
+        self.assertEqual(self.kinds('  '), [])
+
+    def test_index_follows_saves_and_deletes(self):
+        self.camry.name = 'Corolla'
+        self.camry.save()
+        self.assertEqual(self.kinds('camry'), [])
+        self.assertEqual(self.kinds('corol'), [('car_model', self.camry.pk)])
+        self.faq.delete()
+        self.assertEqual(self.kinds('late'), [])
+
+    def test_snippet_is_escaped_and_highlighted(self):
+        result = search.search('family', kinds=['article'])[0]
+        self.assertIn('<mark>family</mark>', result.snippet)
+        self.assertIn('&lt;b&gt;', result.snippet)
+        self.assertEqual(result.url, reverse('main:article_detail', kwargs={'pk': self.article.pk}))
+
+    def test_rebuild_command(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {search.TABLE}')
+        self.assertEqual(self.kinds('toyota'), [])
+        out = StringIO()
+        call_command('rebuild_search_index', chunk_size=1, stdout=out)
+        self.assertIn('Indexed 3 documents', out.getvalue())
+        self.assertEqual(len(self.kinds('toyota')), 2)
+
+    def test_search_view(self):
+        response = self.client.get(reverse('main:search'), {'q': 'camr'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([result.title for result in response.context['results']], ['Toyota Camry'])
+        self.assertContains(response, '?manufacturer=Toyota')
+
+    def test_post_migrate_rebuilds_only_a_stale_index(self):
+        from unittest import mock
+        from django.apps import apps
+        from main import signals
+        config = apps.get_app_config('main')
+        with mock.patch.object(search, 'rebuild') as rebuild:
+            signals.rebuild_search_index(sender=config)
+            rebuild.assert_not_called()
+        FAQ.objects.all()._raw_delete(connection.alias)  # как flush: мимо сигналов
+        self.assertFalse(search.in_sync())
+        signals.rebuild_search_index(sender=config)
+        self.assertEqual(self.kinds('late'), [])
+        self.assertTrue(search.in_sync())
@@ -0,0 +1,29 @@
+from io import StringIO
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TransactionTestCase, override_settings
+from main.management.commands.startup_budget import parse_importtime
+
+
+class TestStartupBudget(TransactionTestCase):
+    def test_parse_importtime(self):
+        output = (
+            'import time: self [us] | cumulative | imported package\n'
+            'import time:       120 |        120 |   _io\n'
+            'import time:      2500 |       4000 | main.views\n'
+        )
+        self.assertEqual(parse_importtime(output), {'_io': (120, 120), 'main.views': (2500, 4000)})
+
+    def test_heavy_modules_are_not_imported_at_startup(self):
+        stdout = StringIO()
+        call_command('startup_budget', budget_ms=60000, stdout=stdout)
+        self.assertIn('within budget', stdout.getvalue())
+
+    @override_settings(STARTUP_FORBIDDEN_IMPORTS=['django.urls'])
+    def test_forbidden_import_fails(self):
+        with self.assertRaises(CommandError):
+            call_command('startup_budget', budget_ms=60000, stdout=StringIO())
+
+    def test_budget_exceeded_fails(self):
+        with self.assertRaises(CommandError):
+            call_command('startup_budget', budget_ms=0.001, stdout=StringIO())
@@ -0,0 +1,79 @@
+import os
+import tempfile
+from io import StringIO
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TransactionTestCase, override_settings
+from main.models import Article, Car, CarModel, CarType, Employee, StoredFile
+
+
+class TestContentAddressedStorage(TransactionTestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.media = tmpdir.name
+        settings_override = override_settings(
+            MEDIA_ROOT=self.media, IMAGE_DERIVATIVE_ROOT=os.path.join(self.media, 'derivatives'),
+            IMAGE_DERIVATIVE_WORKERS=0,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        car_type = CarType.objects.create(name='Sedan', description='')
+        self.car_model = CarModel.objects.create(name='Camry', manufacturer='Toyota', car_type=car_type, description='')
+
+    def make_car(self, plate, **kwargs):
+        return Car.objects.create(license_plate=plate, model=self.car_model, year=2020, value=20000, daily_rate=50,
+                                  **kwargs)
+
+    def stored_files(self):
+        return sorted(
+            os.path.relpath(os.path.join(directory, name), self.media)
+            for directory, _, names in os.walk(os.path.join(self.media, 'content')) for name in names
+        )
+
+    def test_identical_uploads_share_one_reference_counted_file(self):
+        car = self.make_car('AB0001', image=SimpleUploadedFile('dodge.jpg', b'same bytes'))
+        article = Article.objects.create(title='News', content='...', image=SimpleUploadedFile('DODGE.JPEG', b'same bytes'))
+        self.assertEqual(car.image.name, article.image.name)
+        self.assertRegex(car.image.name, r'^content/[0-9a-f]{2}/[0-9a-f]{64}\.jpg$')
+        self.assertEqual(self.stored_files(), [car.image.name])
+        self.assertEqual(StoredFile.objects.get().ref_count, 2)
+
+        car.delete()
+        self.assertEqual(StoredFile.objects.get().ref_count, 1)
+        self.assertTrue(os.path.exists(article.image.path))
+
+        old = article.image.name
+        article.image = SimpleUploadedFile('new.jpg', b'other bytes')
+        article.save()
+        self.assertEqual(self.stored_files(), [article.image.name])
+        self.assertFalse(StoredFile.objects.filter(name=old).exists())
+
+    def test_content_urls_are_immutable(self):
+        car = self.make_car('AB0001', image=SimpleUploadedFile('car.jpg', b'bytes'))
+        response = self.client.get(car.image.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+
+    def test_dedupe_command_moves_legacy_files(self):
+        os.makedirs(os.path.join(self.media, 'cars'))
+        for name in ('dodge.jpg', 'dodge_WeteDpj.jpg'):
+            with open(os.path.join(self.media, 'cars', name), 'wb') as f:
+                f.write(b'dodge')
+        first, second = self.make_car('AB0001'), self.make_car('AB0002')
+        Car.objects.filter(pk=first.pk).update(image='cars/dodge.jpg')
+        Car.objects.filter(pk=second.pk).update(image='cars/dodge_WeteDpj.jpg')
+        employee = Employee.objects.create(user=User.objects.create_user(username='anna'), position='Manager',
+                                           phone='+375 (29) 123-45-67', email='a@example.com', birth_date='1990-01-01')
+        employee.photo.save('ava.jpg', ContentFile(b'dodge'))
+        StoredFile.objects.all().delete()
+
+        out = StringIO()
+        call_command('dedupe_media', '--delete-originals', stdout=out, stderr=StringIO())
+        self.assertIn('Moved 2 photos into 1 stored files', out.getvalue())
+        names = set(Car.objects.values_list('image', flat=True))
+        self.assertEqual(names, {employee.photo.name})
+        self.assertEqual(StoredFile.objects.get().ref_count, 3)
+        self.assertEqual(os.listdir(os.path.join(self.media, 'cars')), [])
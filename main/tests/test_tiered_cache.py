@@ -0,0 +1,61 @@
+import threading
+import time
+from django.core.cache import cache, caches
+from django.test import TransactionTestCase
+from main import tiered_cache
+
+
+class TestTieredCache(TransactionTestCase):
+    def setUp(self):
+        cache.reset_stats()
+
+    def forget_l1(self):
+        tiered_cache._stores['default'].clear()
+
+    def test_levels_and_stats(self):
+        cache.set('greeting', {'text': 'hi'})
+        value = cache.get('greeting')
+        value['text'] = 'changed'  # копия, а не закешированный объект
+        self.forget_l1()
+        self.assertEqual(cache.get('greeting'), {'text': 'hi'})  # из L2
+        self.assertEqual(cache.get('greeting'), {'text': 'hi'})  # снова из L1
+        self.assertIsNone(cache.get('missing'))
+
+        stats = {row['key']: row for row in cache.stats()}
+        self.assertEqual((stats['greeting']['l1_hits'], stats['greeting']['l2_hits']), (2, 1))
+        self.assertEqual(stats['missing']['misses'], 1)
+        self.assertEqual(stats['greeting']['hit_rate'], 1.0)
+
+        cache.delete('greeting')
+        self.assertIsNone(cache.get('greeting'))
+
+    def test_get_or_set_is_single_flight(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return 42
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(caches['default'].get_or_set('answer', compute, 60)))
+                   for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, [42] * 5)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(cache.get('answer'), 42)
+
+    def test_expired_value_is_served_while_another_worker_recomputes(self):
+        cache.set('report', tiered_cache.Fresh('old', time.time() - 1), 60)
+        self.assertIsNone(cache.get('report'))
+        # Другой процесс уже пересчитывает значение
+        cache.add('report:single-flight', 'other-worker', 30)
+        self.assertEqual(cache.get_or_set('report', lambda: 'new', 60), 'old')
+
+        cache.delete('report:single-flight')
+        self.assertEqual(cache.get_or_set('report', lambda: 'new', 60), 'new')
+        self.assertEqual(cache.get('report'), 'new')
+        self.assertEqual({row['key']: row for row in cache.stats()}['report']['recomputes'], 1)
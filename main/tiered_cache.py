@@ -0,0 +1,293 @@
+"""Two-level cache backend: a per-process LRU in front of a shared cache.
+
+``TieredCache`` keeps the most recently used entries of the process in
+memory (L1, ``L1_MAX_ENTRIES``) and stores everything in a shared backend
+(L2, by default ``FileBasedCache``), so workers share computed values and
+those survive a restart.  Writes go to both levels.  A worker does not see
+another worker's writes in its L1, so L1 entries live at most
+``L1_TIMEOUT`` seconds; that is the bound on cross-process staleness.
+
+``get_or_set`` with a callable is single-flight: when a key is missing or
+expired, the worker that takes the lock in L2 recomputes it.  Others serve
+the expired value for up to ``STALE_TIMEOUT`` seconds or, when there is
+none, wait for the result (at most ``LOCK_TIMEOUT`` seconds).
+
+Hits per level, misses and recomputations are counted per key in each
+process; ``stats()`` reports them with the hit rate.  Each lookup is also
+reported to the metrics of the current request (``main.instrumentation``).
+
+The default L2, ``FileCache``, is ``FileBasedCache`` that checks
+``MAX_ENTRIES`` every ``CULL_EVERY`` writes instead of on each one: the
+check lists the whole cache directory, which made a write cost milliseconds
+once the cache held a few thousand entries.
+"""
+import itertools
+import os
+import pickle
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.utils.module_loading import import_string
+
+from . import instrumentation
+
+DEFAULT_L2 = {'BACKEND': 'main.tiered_cache.FileCache'}
+OTHER_KEYS = '<other>'
+WAIT_INTERVAL = 0.05
+
+_MISSING = object()
+
+# Как у LocMemCache: экземпляры бэкенда создаются на каждый поток, а L1 и
+# статистика общие для процесса
+_stores = {}
+_stats = {}
+_locks = {}
+_flight_locks = {}
+_cull_counters = {}
+
+
+class Fresh:
+    """A value stored by ``get_or_set`` with the time it stops being fresh."""
+    __slots__ = ('value', 'fresh_until')
+
+    def __init__(self, value, fresh_until):
+        self.value = value
+        self.fresh_until = fresh_until
+
+    def __getstate__(self):
+        return self.value, self.fresh_until
+
+    def __setstate__(self, state):
+        self.value, self.fresh_until = state
+
+
+class FileCache(FileBasedCache):
+    def __init__(self, dir, params):
+        super().__init__(dir, params)
+        self._cull_every = max(int(params.get('OPTIONS', {}).get('CULL_EVERY', 100)), 1)
+        self._writes = _cull_counters.setdefault(self._dir, itertools.count(1))
+
+    def _cull(self):
+        # Между проверками кеш может превысить MAX_ENTRIES не более чем на CULL_EVERY записей
+        if next(self._writes) % self._cull_every == 0:
+            super()._cull()
+
+
+class KeyStats:
+    __slots__ = ('l1_hits', 'l2_hits', 'misses', 'recomputes')
+
+    def __init__(self):
+        self.l1_hits = self.l2_hits = self.misses = self.recomputes = 0
+
+    @property
+    def lookups(self):
+        return self.l1_hits + self.l2_hits + self.misses
+
+    def as_dict(self, key):
+        lookups = self.lookups
+        return {
+            'key': key, 'lookups': lookups, 'l1_hits': self.l1_hits, 'l2_hits': self.l2_hits,
+            'misses': self.misses, 'recomputes': self.recomputes,
+            'hit_rate': (self.l1_hits + self.l2_hits) / lookups if lookups else 0.0,
+        }
+
+
+class TieredCache(BaseCache):
+    def __init__(self, name, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.l1_max_entries = options.get('L1_MAX_ENTRIES', 1000)
+        self.l1_timeout = options.get('L1_TIMEOUT', 5)
+        self.lock_timeout = options.get('LOCK_TIMEOUT', 30)
+        self.stale_timeout = options.get('STALE_TIMEOUT', 60)
+        self.stats_max_keys = options.get('STATS_MAX_KEYS', 1000)
+
+        l2 = {**DEFAULT_L2, **options.get('L2', {})}
+        backend = import_string(l2['BACKEND'])
+        self.l2 = backend(l2.get('LOCATION', ''), {
+            'TIMEOUT': params.get('TIMEOUT', 300), 'KEY_PREFIX': params.get('KEY_PREFIX', ''),
+            'VERSION': params.get('VERSION', 1), 'KEY_FUNCTION': params.get('KEY_FUNCTION'),
+            'OPTIONS': l2.get('OPTIONS', {}),
+        })
+        self._l1 = _stores.setdefault(name, OrderedDict())
+        self._stats = _stats.setdefault(name, {})
+        self._lock = _locks.setdefault(name, threading.Lock())
+        self._flight_lock = _flight_locks.setdefault(name, threading.Lock())
+
+    # L1
+
+    def _l1_get(self, made_key):
+        with self._lock:
+            entry = self._l1.get(made_key)
+            if entry is None:
+                return _MISSING
+            expires_at, pickled = entry
+            if expires_at <= time.monotonic():
+                del self._l1[made_key]
+                return _MISSING
+            self._l1.move_to_end(made_key)
+        return pickle.loads(pickled)
+
+    def _l1_set(self, made_key, value, timeout):
+        l1_timeout = self.l1_timeout if timeout is None else min(timeout, self.l1_timeout)
+        if l1_timeout <= 0:
+            self._l1_delete(made_key)
+            return
+        # Значение хранится в pickle, как в LocMemCache: изменение объекта,
+        # полученного из кеша, не меняет закешированную копию
+        pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._l1[made_key] = (time.monotonic() + l1_timeout, pickled)
+            self._l1.move_to_end(made_key)
+            while len(self._l1) > self.l1_max_entries:
+                self._l1.popitem(last=False)
+
+    def _l1_delete(self, made_key):
+        with self._lock:
+            self._l1.pop(made_key, None)
+
+    # Статистика
+
+    def _record(self, key, field):
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                if len(self._stats) >= self.stats_max_keys:
+                    key = OTHER_KEYS
+                stats = self._stats.setdefault(key, KeyStats())
+            setattr(stats, field, getattr(stats, field) + 1)
+
+    def stats(self):
+        """Per-key counters of this process, most looked-up keys first."""
+        with self._lock:
+            rows = [stats.as_dict(key) for key, stats in self._stats.items()]
+        return sorted(rows, key=lambda row: row['lookups'], reverse=True)
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats.clear()
+
+    # Cache API
+
+    def _get_entry(self, key, version=None, record=True):
+        """Stored value of ``key`` (a ``Fresh`` for ``get_or_set`` keys) or ``_MISSING``."""
+        made_key = self.make_and_validate_key(key, version=version)
+        value = self._l1_get(made_key)
+        if value is not _MISSING:
+            if record:
+                self._record(key, 'l1_hits')
+                instrumentation.record_cache(True)
+            return value
+        value = self.l2.get(key, _MISSING, version=version)
+        if value is _MISSING:
+            if record:
+                self._record(key, 'misses')
+                instrumentation.record_cache(False)
+            return _MISSING
+        if record:
+            self._record(key, 'l2_hits')
+            instrumentation.record_cache(True)
+        self._l1_set(made_key, value, self.l1_timeout)
+        return value
+
+    def get(self, key, default=None, version=None):
+        value = self._get_entry(key, version)
+        if isinstance(value, Fresh):
+            return value.value if value.fresh_until > time.time() else default
+        return default if value is _MISSING else value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        made_key = self.make_and_validate_key(key, version=version)
+        self.l2.set(key, value, timeout, version=version)
+        self._l1_set(made_key, value, self._seconds(timeout))
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        # L1 не участвует: add служит блокировкой между процессами
+        made_key = self.make_and_validate_key(key, version=version)
+        added = self.l2.add(key, value, timeout, version=version)
+        if added:
+            self._l1_set(made_key, value, self._seconds(timeout))
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        self._l1_delete(self.make_and_validate_key(key, version=version))
+        return self.l2.touch(key, timeout, version=version)
+
+    def delete(self, key, version=None):
+        self._l1_delete(self.make_and_validate_key(key, version=version))
+        return self.l2.delete(key, version=version)
+
+    def has_key(self, key, version=None):
+        return self.get(key, _MISSING, version=version) is not _MISSING
+
+    def incr(self, key, delta=1, version=None):
+        self._l1_delete(self.make_and_validate_key(key, version=version))
+        return self.l2.incr(key, delta, version=version)
+
+    def get_many(self, keys, version=None):
+        found = {}
+        for key in keys:
+            value = self.get(key, _MISSING, version=version)
+            if value is not _MISSING:
+                found[key] = value
+        return found
+
+    def clear(self):
+        with self._lock:
+            self._l1.clear()
+        self.l2.clear()
+
+    def close(self, **kwargs):
+        self.l2.close(**kwargs)
+
+    def get_or_set(self, key, default, timeout=DEFAULT_TIMEOUT, version=None):
+        entry = self._get_entry(key, version)
+        now = time.time()
+        if entry is not _MISSING and not (isinstance(entry, Fresh) and entry.fresh_until <= now):
+            return entry.value if isinstance(entry, Fresh) else entry
+        if self._acquire(key, version):
+            try:
+                return self._recompute(key, default, timeout, version)
+            finally:
+                self.l2.delete(self._lock_key(key), version=version)
+        if entry is not _MISSING:
+            return entry.value  # пересчитывает другой процесс, отдаём устаревшее
+        deadline = time.monotonic() + self.lock_timeout
+        while time.monotonic() < deadline:
+            time.sleep(WAIT_INTERVAL)
+            entry = self._get_entry(key, version, record=False)
+            if entry is not _MISSING:
+                return entry.value if isinstance(entry, Fresh) else entry
+            if not self.l2.has_key(self._lock_key(key), version=version):
+                break
+        # Владелец блокировки не успел или упал
+        return self._recompute(key, default, timeout, version)
+
+    def _recompute(self, key, default, timeout, version):
+        self._record(key, 'recomputes')
+        value = default() if callable(default) else default
+        seconds = self._seconds(timeout)
+        if seconds is None:
+            self.set(key, Fresh(value, float('inf')), None, version=version)
+        elif seconds > 0:
+            self.set(key, Fresh(value, time.time() + seconds), seconds + self.stale_timeout, version=version)
+        return value
+
+    def _acquire(self, key, version):
+        lock_key, token = self._lock_key(key), f'{os.getpid()}:{uuid.uuid4().hex}'
+        with self._flight_lock:  # потоки процесса берут блокировку по очереди
+            if not self.l2.add(lock_key, token, self.lock_timeout, version=version):
+                return False
+        # add в FileBasedCache не атомарен между процессами: при гонке побеждает последняя запись
+        return self.l2.get(lock_key, version=version) == token
+
+    @staticmethod
+    def _lock_key(key):
+        return f'{key}:single-flight'
+
+    def _seconds(self, timeout):
+        return self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
@@ -17,6 +17,9 @@ urlpatterns = [
     # Dictionary
     re_path(r'^faq/$', views.FAQListView.as_view(), name='faq'),
     
+    # Search
+    re_path(r'^search/$', views.SearchView.as_view(), name='search'),
+
     # Contacts
     re_path(r'^contacts/$', views.ContactsView.as_view(), name='contacts'),
     
@@ -69,7 +72,9 @@ urlpatterns = [
     re_path(r'^employee/rentals/(?P<pk>\d+)/update/$', views.EmployeeRentalUpdateView.as_view(), name='employee_rental_update'),
     re_path(r'^employee/clients/$', views.EmployeeClientListView.as_view(), name='employee_clients'),
     re_path(r'^employee/clients/create/$', views.employee_client_create, name='employee_client_create'),
+    re_path(r'^employee/clients/lookup/$', views.employee_client_lookup, name='employee_client_lookup'),
     re_path(r'^employee/clients/(?P<pk>\d+)/$', views.EmployeeClientDetailView.as_view(), name='employee_client_detail'),
+    re_path(r'^employee/export/(?P<kind>\w+)/$', views.ExportView.as_view(), name='employee_export'),
 
     # Car model management URLs
     re_path(r'^car-models/add/$', views.CarModelCreateView.as_view(), name='car_model_create'),
@@ -5,39 +5,43 @@ from django.views.generic import (
 from django.contrib.auth.views import LoginView as AuthLoginView, LogoutView as AuthLogoutView, PasswordChangeView
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.urls import reverse_lazy
-from django.db.models import Avg, Count, Sum, Q, Min, Max
+from django.db.models import Q
 from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
 from .models import (
     Car, CarModel, CarType, Client, Rental, Article, CompanyInfo,
     FAQ, Employee, JobVacancy, Review, Promo
 )
 from .forms import (
     RegistrationForm, EmployeeRegistrationForm, RentalForm, ClientForm,
-    CarForm, CarModelForm, CarTypeForm, RentalCompleteForm
+    CarForm, CarModelForm, CarTypeForm, RentalCompleteForm, ExportForm
 )
+from .booking import book_rental, release_slots, reserve_slots, BookingConflict
+from . import rollups, charts, billing, facets, search, lookup, exports, fileserving, storage
+from .filters import CarFilter
+from .pagination import PrecountedPaginator, KeysetPaginationMixin
+from .principal import staff_employee_required
+from .conditional import ConditionalGetMixin, cached_latest_update, latest, promos_changed_at
+from .external import cat_facts, programming_jokes
 from django.contrib import messages
 from django.views import View
-from django.contrib.auth.decorators import login_required, user_passes_test
+from django.conf import settings
+from django.core.cache import cache
+from django.http import JsonResponse, StreamingHttpResponse, HttpResponseBadRequest, Http404
+from django.contrib.auth.decorators import login_required
 from django.contrib.auth import logout
 from django.db import transaction
 from django.contrib.auth.models import User, Group
 import logging
 from django.core.exceptions import PermissionDenied
-import requests
-from django.core.cache import cache
 from datetime import datetime, timedelta
 import re
-import pytz
-import matplotlib
-matplotlib.use('Agg')  # Use non-interactive backend
-import matplotlib.pyplot as plt
-import matplotlib.patches as patches
-import io
-import base64
-from decimal import Decimal
 
 logger = logging.getLogger(__name__)
 
+DERIVATIVE_PREFIX = settings.IMAGE_DERIVATIVE_URL[len(settings.MEDIA_URL):]
+CACHE_STATS_ROWS = 20
+
 # Create your views here.
 
 class HomeView(TemplateView):
@@ -47,48 +51,9 @@ class HomeView(TemplateView):
         context = super().get_context_data(**kwargs)
         context['latest_article'] = Article.objects.order_by('-created_at').first()
         
-        # Get cat fact from cache or API
-        today = datetime.now().date().isoformat()
-        cat_cache_key = f'cat_fact_{today}'
-        cat_fact = cache.get(cat_cache_key)
-        
-        if not cat_fact:
-            try:
-                response = requests.get('https://catfact.ninja/fact')
-                if response.status_code == 200:
-                    cat_fact = response.json()['fact']
-                    # Cache the fact for 24 hours
-                    cache.set(cat_cache_key, cat_fact, 60 * 60 * 24)
-                else:
-                    cat_fact = "Did you know? Cats are amazing!"
-            except Exception as e:
-                cat_fact = "Did you know? Cats are amazing!"
-        
-        context['cat_fact'] = cat_fact
-
-        # Get programming joke from cache or API
-        joke_cache_key = 'programming_joke'
-        joke_data = cache.get(joke_cache_key)
-        
-        if not joke_data:
-            try:
-                response = requests.get('https://official-joke-api.appspot.com/jokes/programming/random')
-                if response.status_code == 200:
-                    joke = response.json()[0]  # API returns array with one joke
-                    joke_data = {
-                        'setup': joke['setup'],
-                        'punchline': joke['punchline'],
-                        'updated': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                    }
-                    # Cache the joke for 1 hour
-                    cache.set(joke_cache_key, joke_data, 60 * 60)
-                else:
-                    joke_data = None
-            except Exception as e:
-                print(f"Exception occurred: {str(e)}")
-                joke_data = None
-        
-        context['joke_data'] = joke_data
+        # Внешний контент берётся из кеша, обновление идёт в фоне
+        context['cat_fact'] = cat_facts.get()
+        context['joke_data'] = programming_jokes.get()
         return context
 
 class AboutView(TemplateView):
@@ -96,26 +61,52 @@ class AboutView(TemplateView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['company_info'] = CompanyInfo.objects.first()
+        # Запрос выполняется, только если фрагмент с информацией о компании не закеширован
+        context['company_info'] = SimpleLazyObject(CompanyInfo.objects.first)
         return context
 
-class ArticleListView(ListView):
+class ArticleListView(ConditionalGetMixin, ListView):
     model = Article
     template_name = 'main/news.html'
     context_object_name = 'articles'
     ordering = ['-created_at']
     paginate_by = 10
+    conditional_dependencies = ['main.Article']
+
+    def get_last_modified(self):
+        return cached_latest_update(Article)
 
-class ArticleDetailView(DetailView):
+class ArticleDetailView(ConditionalGetMixin, DetailView):
     model = Article
     template_name = 'main/article_detail.html'
     context_object_name = 'article'
 
+    def get_conditional_dependencies(self):
+        return [Article(pk=self.kwargs['pk'])]
+
+    def get_last_modified(self):
+        # Несуществующая статья: None, и DetailView отвечает 404
+        return Article.objects.filter(pk=self.kwargs['pk']).values_list('updated_at', flat=True).first()
+
 class FAQListView(ListView):
     model = FAQ
     template_name = 'main/faq.html'
     context_object_name = 'faqs'
 
+class SearchView(TemplateView):
+    template_name = 'main/search.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        query = self.request.GET.get('q', '').strip()
+        kind = self.request.GET.get('kind')
+        kinds = [kind] if kind in search.KIND_LABELS else None
+        context['query'] = query
+        context['kind'] = kind if kinds else ''
+        context['kind_labels'] = search.KIND_LABELS
+        context['results'] = search.search(query, kinds=kinds) if query else []
+        return context
+
 class ContactsView(TemplateView):
     template_name = 'main/contacts.html'
 
@@ -134,12 +125,17 @@ class JobVacancyListView(ListView):
     context_object_name = 'vacancies'
     queryset = JobVacancy.objects.filter(is_active=True)
 
-class ReviewListView(ListView):
+class ReviewListView(ConditionalGetMixin, KeysetPaginationMixin, ListView):
     model = Review
     template_name = 'main/reviews.html'
     context_object_name = 'reviews'
-    ordering = ['-created_at']
+    keyset_fields = ('-created_at', '-id')
     paginate_by = 10
+    queryset = Review.objects.for_listing()
+    conditional_dependencies = ['main.Review', 'auth.User']
+
+    def get_last_modified(self):
+        return cached_latest_update(Review)
 
 class ReviewCreateView(LoginRequiredMixin, CreateView):
     model = Review
@@ -151,10 +147,14 @@ class ReviewCreateView(LoginRequiredMixin, CreateView):
         form.instance.client = self.request.user.client
         return super().form_valid(form)
 
-class PromoListView(ListView):
+class PromoListView(ConditionalGetMixin, ListView):
     model = Promo
     template_name = 'main/promos.html'
     context_object_name = 'promos'
+    conditional_dependencies = ['main.Promo']
+
+    def get_last_modified(self):
+        return promos_changed_at()
 
     def get_queryset(self):
         now = timezone.now()
@@ -168,7 +168,8 @@ class StaffEmployeeRequiredMixin(UserPassesTestMixin):
     def test_func(self):
         if not self.request.user.is_authenticated:
             return False
-        return self.request.user.is_staff or (hasattr(self.request.user, 'employee') and self.request.user.employee)
+        # Роль и профиль сотрудника определены один раз за запрос (main.principal)
+        return self.request.principal.has_staff_access
 
     def handle_no_permission(self):
         if not self.request.user.is_authenticated:
@@ -244,37 +245,45 @@ class CarTypeUpdateView(LoginRequiredMixin, StaffEmployeeRequiredMixin, UpdateVi
         messages.success(self.request, 'Тип автомобиля обновлен!')
         return super().form_valid(form)
 
-class CarListView(ListView):
+class CarListView(ConditionalGetMixin, ListView):
     model = Car
     template_name = 'main/car_list_new.html'
     context_object_name = 'cars'
     paginate_by = 12
+    paginator_class = PrecountedPaginator
+
+    def get_conditional_dependencies(self):
+        dependencies = ['main.Car', 'main.CarModel', 'main.CarType']
+        if self.request.user.is_authenticated:
+            dependencies.append('main.Promo')
+        return dependencies
+
+    def get_last_modified(self):
+        # Свободные даты зависят от аренд, у которых нет отметки изменения
+        if self.request.GET.get('available_from') or self.request.GET.get('available_to'):
+            return None
+        last_modified = cached_latest_update(Car, CarModel, CarType)
+        if self.request.user.is_authenticated:
+            last_modified = latest(last_modified, promos_changed_at())
+        return last_modified
 
     def get_queryset(self):
-        queryset = Car.objects.all()
-        
-        # Фильтрация по типу автомобиля
-        car_type = self.request.GET.get('type')
-        if car_type:
-            queryset = queryset.filter(model__car_type__id=car_type)
-        
-        # Сортировка по цене
-        sort = self.request.GET.get('sort')
-        if sort == 'price_asc':
-            queryset = queryset.order_by('daily_rate')
-        elif sort == 'price_desc':
-            queryset = queryset.order_by('-daily_rate')
-        else:
-            queryset = queryset.order_by('model__name')  # По умолчанию сортируем по названию модели
-        
-        return queryset
+        self.filterset = CarFilter(self.request.GET, queryset=Car.objects.for_catalog())
+        self.facets = facets.get()
+        return self.filterset.qs
+
+    def get_paginator(self, queryset, per_page, **kwargs):
+        # Когда фильтр сводится к одному фасету, COUNT(*) уже известен из индекса
+        known_count = self.facets.count_for(self.filterset.active_filters)
+        return super().get_paginator(queryset, per_page, known_count=known_count, **kwargs)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['car_types'] = CarType.objects.all()
-        context['manufacturers'] = CarModel.objects.values_list('manufacturer', flat=True).distinct()
-        context['min_price'] = Car.objects.aggregate(Min('daily_rate'))['daily_rate__min']
-        context['max_price'] = Car.objects.aggregate(Max('daily_rate'))['daily_rate__max']
+        context['filter'] = self.filterset
+        context['facets'] = self.facets
+        query = self.request.GET.copy()
+        query.pop('page', None)
+        context['query_string'] = query.urlencode()
         
         if self.request.user.is_authenticated:
             context['active_promos'] = Promo.objects.filter(
@@ -285,12 +294,9 @@ class CarListView(ListView):
         
         return context
 
-class CarManagementView(LoginRequiredMixin, UserPassesTestMixin, TemplateView):
+class CarManagementView(LoginRequiredMixin, StaffEmployeeRequiredMixin, TemplateView):
     template_name = 'main/car_management.html'
     
-    def test_func(self):
-        return self.request.user.is_staff or (hasattr(self.request.user, 'employee') and self.request.user.employee)
-    
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['cars'] = Car.objects.all()
@@ -301,14 +307,11 @@ class CarManagementView(LoginRequiredMixin, UserPassesTestMixin, TemplateView):
         context['maintenance_cars'] = Car.objects.filter(needs_maintenance=True)
         return context
 
-class PromoManagementView(LoginRequiredMixin, UserPassesTestMixin, ListView):
+class PromoManagementView(LoginRequiredMixin, StaffEmployeeRequiredMixin, ListView):
     model = Promo
     template_name = 'main/promo_management.html'
     context_object_name = 'promos'
     
-    def test_func(self):
-        return self.request.user.is_staff or (hasattr(self.request.user, 'employee') and self.request.user.employee)
-    
     def get_queryset(self):
         return Promo.objects.all().order_by('-valid_until')
 
@@ -324,10 +327,28 @@ class ClientPromoListView(LoginRequiredMixin, ListView):
             is_active=True
         ).order_by('-discount_percent')
 
-class CarDetailView(DetailView):
+class CarDetailView(ConditionalGetMixin, DetailView):
     model = Car
     template_name = 'main/car_detail.html'
     context_object_name = 'car'
+    queryset = Car.objects.for_catalog()
+
+    def get_conditional_dependencies(self):
+        dependencies = [Car(pk=self.kwargs['pk']), 'main.CarModel', 'main.CarType']
+        if self.request.user.is_authenticated:
+            dependencies.append('main.Promo')
+        return dependencies
+
+    def get_last_modified(self):
+        row = Car.objects.filter(pk=self.kwargs['pk']).values_list(
+            'updated_at', 'model__updated_at', 'model__car_type__updated_at'
+        ).first()
+        if row is None:
+            return None
+        last_modified = latest(*row)
+        if self.request.user.is_authenticated:
+            last_modified = latest(last_modified, promos_changed_at())
+        return last_modified
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -350,22 +371,23 @@ class CarDetailView(DetailView):
         context['debug'] = {
             'is_authenticated': self.request.user.is_authenticated,
             'is_staff': self.request.user.is_staff,
-            'is_employee': hasattr(self.request.user, 'employee') and self.request.user.employee,
+            'is_employee': self.request.principal.is_employee,
             'show_management': context['show_management']
         }
         
         return context
 
-class RentalListView(LoginRequiredMixin, ListView):
+class RentalListView(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     model = Rental
     template_name = 'main/rental_list.html'
     context_object_name = 'rentals'
+    keyset_fields = ('-start_date', '-id')
     paginate_by = 10
 
     def get_queryset(self):
         if self.request.user.is_staff:
-            return Rental.objects.all().order_by('-start_date')
-        return Rental.objects.filter(client=self.request.user.client).order_by('-start_date')
+            return Rental.objects.for_listing()
+        return Rental.objects.for_listing().filter(client=self.request.user.client)
 
 class RentalCreateView(LoginRequiredMixin, CreateView):
     model = Rental
@@ -400,26 +422,34 @@ class RentalCreateView(LoginRequiredMixin, CreateView):
 
         # Применяем промокод, если он есть и валиден
         promo_code = form.cleaned_data.get('promo_code')
+        promo_message = None
         if promo_code:
             try:
                 promo = Promo.objects.get(code=promo_code)
                 if promo.is_active and timezone.now() >= promo.valid_from and timezone.now() <= promo.valid_until:
                     rental.promo_code = promo
-                    discount_multiplier = Decimal('1') - (Decimal(str(promo.discount_percent)) / Decimal('100'))
-                    rental.final_amount = rental.base_amount * discount_multiplier
-                    messages.success(
-                        self.request, 
+                    discount = billing.discount_amount(rental.base_amount, promo)
+                    rental.final_amount = rental.base_amount - discount
+                    promo_message = (
                         f'Promo code applied! You saved {promo.discount_percent}% ' +
-                        f'(${rental.base_amount - rental.final_amount:.2f})'
+                        f'(${discount:.2f})'
                     )
             except Promo.DoesNotExist:
                 messages.warning(self.request, 'Invalid promo code.')
         
         rental.status = 'active'
-        rental.save()
-        
+        try:
+            # Аренда и брони по дням сохраняются в одной транзакции
+            book_rental(rental)
+        except BookingConflict:
+            form.add_error(None, 'Автомобиль уже забронирован на выбранные даты. Пожалуйста, выберите другие даты.')
+            return self.form_invalid(form)
+
+        if promo_message:
+            messages.success(self.request, promo_message)
         messages.success(self.request, 'Rental successfully created!')
-        return super().form_valid(form)
+        self.object = rental
+        return redirect(self.get_success_url())
 
     def form_invalid(self, form):
         messages.error(self.request, 'Error creating rental. Please check the entered data.')
@@ -429,16 +459,30 @@ class RentalDetailView(LoginRequiredMixin, UserPassesTestMixin, DetailView):
     model = Rental
     template_name = 'main/rental_detail.html'
     context_object_name = 'rental'
+    queryset = Rental.objects.for_detail().prefetch_related('invoice__lines')
 
     def test_func(self):
         rental = self.get_object()
-        return self.request.user.is_staff or rental.client.user == self.request.user
+        return self.request.principal.is_staff or rental.client.user_id == self.request.user.pk
+
+    def get_object(self, queryset=None):
+        # Аренда, загруженная для проверки доступа, используется и DetailView.get
+        if not hasattr(self, 'object'):
+            self.object = super().get_object(queryset)
+        return self.object
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['invoice'] = billing.get_invoice(self.object)
+        return context
 
 class ProfileView(LoginRequiredMixin, View):
     def get(self, request, *args, **kwargs):
         # Get rentals through the client relationship
-        rentals = Rental.objects.filter(client=request.user.client).order_by('-start_date')
+        rentals = Rental.objects.select_related('car__model').filter(client=request.user.client).order_by('-start_date')
         
+        import pytz
+
         # Get timezone info
         user_timezone = request.COOKIES.get('user_timezone', 'UTC')
         current_time = timezone.now()
@@ -572,82 +616,16 @@ class StatisticsView(LoginRequiredMixin, UserPassesTestMixin, TemplateView):
     template_name = 'main/statistics.html'
 
     def test_func(self):
-        return self.request.user.is_staff
-
-    def generate_car_type_chart(self, popular_car_types):
-        """Generate bar chart for car type popularity"""
-        if not popular_car_types:
-            return None
-            
-        plt.figure(figsize=(10, 6))
-        names = [car_type.name for car_type in popular_car_types]
-        counts = [car_type.rental_count for car_type in popular_car_types]
-        
-        bars = plt.bar(names, counts, color='#3498db', alpha=0.7, edgecolor='#2980b9', linewidth=1)
-        plt.title('Car Type Popularity', fontsize=16, fontweight='bold', pad=20)
-        plt.xlabel('Car Types', fontsize=12)
-        plt.ylabel('Number of Rentals', fontsize=12)
-        plt.xticks(rotation=45, ha='right')
-        plt.grid(axis='y', alpha=0.3)
-        
-        # Add value labels on bars
-        for bar, count in zip(bars, counts):
-            plt.text(bar.get_x() + bar.get_width()/2, bar.get_height() + 0.1,
-                    str(count), ha='center', va='bottom', fontweight='bold')
-        
-        plt.tight_layout()
-        
-        # Convert to base64 string
-        buffer = io.BytesIO()
-        plt.savefig(buffer, format='png', dpi=100, bbox_inches='tight')
-        buffer.seek(0)
-        image_png = buffer.getvalue()
-        buffer.close()
-        plt.close()
-        
-        return base64.b64encode(image_png).decode()
-
-    def generate_availability_chart(self, available_cars, total_cars):
-        """Generate pie chart for car availability"""
-        if total_cars == 0:
-            return None
-            
-        rented_cars = total_cars - available_cars
-        labels = ['Available', 'Rented']
-        sizes = [available_cars, rented_cars]
-        colors = ['#2ecc71', '#e74c3c']
-        
-        plt.figure(figsize=(8, 8))
-        wedges, texts, autotexts = plt.pie(sizes, labels=labels, colors=colors, autopct='%1.1f%%',
-                                          startangle=90, textprops={'fontsize': 12})
-        
-        # Customize text
-        for autotext in autotexts:
-            autotext.set_color('white')
-            autotext.set_fontweight('bold')
-            autotext.set_fontsize(14)
-        
-        plt.title('Car Availability', fontsize=16, fontweight='bold', pad=20)
-        plt.axis('equal')
-        
-        # Convert to base64 string
-        buffer = io.BytesIO()
-        plt.savefig(buffer, format='png', dpi=100, bbox_inches='tight')
-        buffer.seek(0)
-        image_png = buffer.getvalue()
-        buffer.close()
-        plt.close()
-        
-        return base64.b64encode(image_png).decode()
+        return self.request.principal.is_staff
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         
-        # Rental statistics
-        rentals = Rental.objects.all()
-        context['total_rentals'] = rentals.count()
-        context['total_revenue'] = rentals.aggregate(Sum('final_amount'))['final_amount__sum'] or 0
-        context['avg_rental_duration'] = rentals.aggregate(Avg('days'))['days__avg'] or 0
+        # Rental statistics (из предрассчитанных сводок)
+        rental_totals = rollups.totals()
+        context['total_rentals'] = rental_totals['rental_count']
+        context['total_revenue'] = rental_totals['revenue']
+        context['avg_rental_duration'] = rental_totals['avg_days']
         
         # Car statistics
         cars = Car.objects.all()
@@ -655,25 +633,32 @@ class StatisticsView(LoginRequiredMixin, UserPassesTestMixin, TemplateView):
         context['available_cars'] = cars.filter(is_available=True).count()
         
         # Most popular car types
-        popular_car_types = (
-            CarType.objects.annotate(rental_count=Count('carmodel__car__rental'))
-            .order_by('-rental_count')
-        )
+        popular_car_types = list(rollups.car_type_popularity())
         context['popular_car_types'] = popular_car_types
         
         # Client statistics
-        clients = Client.objects.all()
-        context['total_clients'] = clients.count()
+        total_clients = Client.objects.count()
+        context['total_clients'] = total_clients
         context['avg_client_rentals'] = (
-            rentals.count() / clients.count() if clients.count() > 0 else 0
+            context['total_rentals'] / total_clients if total_clients > 0 else 0
         )
         
-        # Generate charts
-        context['car_type_chart'] = self.generate_car_type_chart(popular_car_types)
-        context['availability_chart'] = self.generate_availability_chart(
-            context['available_cars'], context['total_cars']
-        )
+        # Charts are rendered once per distinct data set and served as files
+        if popular_car_types:
+            context['car_type_chart'] = charts.chart_url('car_types', {
+                'names': [car_type.name for car_type in popular_car_types],
+                'counts': [car_type.rental_count for car_type in popular_car_types],
+            })
+        if context['total_cars']:
+            context['availability_chart'] = charts.chart_url('availability', {
+                'available': context['available_cars'],
+                'rented': context['total_cars'] - context['available_cars'],
+            })
         
+        # Попадания в кеш по ключам (счётчики процесса, обслужившего запрос)
+        if hasattr(cache, 'stats'):
+            context['cache_stats'] = cache.stats()[:CACHE_STATS_ROWS]
+
         # Calculate percentages for CSS bars
         context['avg_duration_percent'] = min(100, max(0, (context['avg_rental_duration'] or 0) / 30 * 100))
         context['avg_client_rentals_percent'] = min(100, max(0, (context['avg_client_rentals'] or 0) / 10 * 100))
@@ -714,9 +699,9 @@ class DeleteAccountView(LoginRequiredMixin, View):
             return redirect('main:profile')
 
 @login_required
-@user_passes_test(lambda u: u.is_staff or (hasattr(u, 'employee') and u.employee))
+@staff_employee_required
 def complete_rental(request, pk):
-    rental = get_object_or_404(Rental, pk=pk)
+    rental = get_object_or_404(Rental.objects.for_detail(), pk=pk)
     
     if request.method == 'POST':
         if rental.status == 'active':
@@ -726,10 +711,11 @@ def complete_rental(request, pk):
                 rental.status = 'completed'
                 rental.actual_return_date = timezone.now()
                 rental.car.is_available = True
-                rental.car.save()
-                rental.save()
-                form.save_m2m()  # Save penalties (ManyToMany field)
-                rental.update_final_amount()  # Update final amount with penalties
+                with transaction.atomic():
+                    rental.car.save()
+                    rental.save()
+                    release_slots(rental)
+                    form.save_m2m()  # Save penalties, the invoice is recomputed by m2m_changed
                 messages.success(request, 'Аренда успешно завершена.')
                 return redirect('main:rental_detail', pk=pk)
         else:
@@ -737,33 +723,36 @@ def complete_rental(request, pk):
     else:
         form = RentalCompleteForm(instance=rental)
     
+    invoice = billing.get_invoice(rental)
     context = {
         'form': form,
         'rental': rental,
-        'base_amount': rental.base_amount,
-        'discount_amount': rental.calculate_discount_amount(),
-        'penalty_amount': rental.calculate_penalty_amount(),
-        'final_amount': rental.calculate_final_amount(),
+        'invoice': invoice,
+        'base_amount': invoice.base_amount,
+        'discount_amount': invoice.discount_amount,
+        'penalty_amount': invoice.penalty_amount,
+        'final_amount': invoice.total_amount,
     }
     return render(request, 'main/rental_complete.html', context)
 
 @login_required
 def cancel_rental(request, pk):
-    rental = get_object_or_404(Rental, pk=pk)
+    rental = get_object_or_404(Rental.objects.for_detail(), pk=pk)
     
     if request.method == 'POST':
         if rental.status == 'active':
-            if request.user.is_staff or (hasattr(request.user, 'employee') and request.user.employee):
+            if request.principal.has_staff_access:
                 form = RentalCompleteForm(request.POST, instance=rental)
                 if form.is_valid():
                     rental = form.save(commit=False)
                     rental.status = 'cancelled'
                     rental.actual_return_date = timezone.now()
                     rental.car.is_available = True
-                    rental.car.save()
-                    rental.save()
-                    form.save_m2m()  # Save penalties (ManyToMany field)
-                    rental.update_final_amount()  # Update final amount with penalties
+                    with transaction.atomic():
+                        rental.car.save()
+                        rental.save()
+                        release_slots(rental)
+                        form.save_m2m()  # Save penalties, the invoice is recomputed by m2m_changed
                     messages.success(request, 'Аренда успешно отменена.')
                     return redirect('main:rental_detail', pk=pk)
             else:
@@ -771,21 +760,25 @@ def cancel_rental(request, pk):
                 rental.status = 'cancelled'
                 rental.actual_return_date = timezone.now()
                 rental.car.is_available = True
-                rental.car.save()
-                rental.save()
+                with transaction.atomic():
+                    rental.car.save()
+                    rental.save()
+                    release_slots(rental)
                 messages.success(request, 'Аренда отменена.')
         else:
             messages.error(request, 'Эта аренда не может быть отменена, так как она не активна.')
     else:
         form = RentalCompleteForm(instance=rental)
     
+    invoice = billing.get_invoice(rental)
     context = {
         'form': form,
         'rental': rental,
-        'base_amount': rental.base_amount,
-        'discount_amount': rental.calculate_discount_amount(),
-        'penalty_amount': rental.calculate_penalty_amount(),
-        'final_amount': rental.calculate_final_amount(),
+        'invoice': invoice,
+        'base_amount': invoice.base_amount,
+        'discount_amount': invoice.discount_amount,
+        'penalty_amount': invoice.penalty_amount,
+        'final_amount': invoice.total_amount,
     }
     return render(request, 'main/rental_cancel.html', context)
 
@@ -820,105 +813,104 @@ class EmployeeRegisterView(CreateView):
             messages.error(self.request, f'Error creating employee account: {str(e)}')
             return self.form_invalid(form)
 
-class EmployeeDashboardView(LoginRequiredMixin, UserPassesTestMixin, TemplateView):
+class EmployeeDashboardView(LoginRequiredMixin, StaffEmployeeRequiredMixin, TemplateView):
     template_name = 'main/employee_dashboard.html'
     
-    def test_func(self):
-        return self.request.user.is_staff or (hasattr(self.request.user, 'employee') and self.request.user.employee)
-    
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        employee = self.request.user.employee
         
         # Get active rentals
-        context['active_rentals'] = Rental.objects.filter(status='active').order_by('-start_date')
+        context['active_rentals'] = Rental.objects.for_listing().filter(status='active').order_by('-start_date')
         
         # Get recent clients
-        context['recent_clients'] = Client.objects.order_by('-user__date_joined')[:10]
+        context['recent_clients'] = Client.objects.for_listing().order_by('-user__date_joined')[:10]
         
         # Get statistics
-        context['total_rentals'] = Rental.objects.count()
+        rental_totals = rollups.totals()
+        context['total_rentals'] = rental_totals['rental_count']
         context['active_rentals_count'] = Rental.objects.filter(status='active').count()
-        context['total_revenue'] = Rental.objects.aggregate(Sum('final_amount'))['final_amount__sum'] or 0
+        context['total_revenue'] = rental_totals['revenue']
         
         return context
 
-class EmployeeRentalListView(LoginRequiredMixin, UserPassesTestMixin, ListView):
+class EmployeeRentalListView(LoginRequiredMixin, StaffEmployeeRequiredMixin, KeysetPaginationMixin, ListView):
     model = Rental
     template_name = 'main/employee_rental_list.html'
     context_object_name = 'rentals'
+    keyset_fields = ('-start_date', '-id')
     paginate_by = 20
     
-    def test_func(self):
-        return self.request.user.is_staff or (hasattr(self.request.user, 'employee') and self.request.user.employee)
-    
     def get_queryset(self):
-        queryset = Rental.objects.all()
+        queryset = Rental.objects.for_listing()
         status = self.request.GET.get('status')
         if status:
             queryset = queryset.filter(status=status)
-        return queryset.order_by('-start_date')
+        return queryset
 
-class EmployeeClientListView(LoginRequiredMixin, UserPassesTestMixin, ListView):
+class EmployeeClientListView(LoginRequiredMixin, StaffEmployeeRequiredMixin, KeysetPaginationMixin, ListView):
     model = Client
     template_name = 'main/employee_client_list.html'
     context_object_name = 'clients'
+    keyset_fields = ('-user__date_joined', '-user__id')
     paginate_by = 20
     
-    def test_func(self):
-        return self.request.user.is_staff or (hasattr(self.request.user, 'employee') and self.request.user.employee)
-    
     def get_queryset(self):
         search_query = self.request.GET.get('search', '')
         if search_query:
-            return Client.objects.filter(
-                Q(user__first_name__icontains=search_query) |
-                Q(user__last_name__icontains=search_query) |
-                Q(phone__icontains=search_query)
-            )
-        return Client.objects.all().order_by('-user__date_joined')
-
-class EmployeeClientDetailView(LoginRequiredMixin, UserPassesTestMixin, DetailView):
+            condition = lookup.build_condition(search_query)
+            if condition is None:
+                return Client.objects.none()
+            return Client.objects.for_listing().filter(condition)
+        return Client.objects.for_listing()
+
+    def get_keyset_fields(self):
+        # Поиск идёт по индексам lookup-полей, сортировка по pk не требует отдельного индекса
+        if self.request.GET.get('search'):
+            return ('id',)
+        return self.keyset_fields
+
+class EmployeeClientDetailView(LoginRequiredMixin, StaffEmployeeRequiredMixin, DetailView):
     model = Client
     template_name = 'main/employee_client_detail.html'
     context_object_name = 'client'
-    
-    def test_func(self):
-        return self.request.user.is_staff or (hasattr(self.request.user, 'employee') and self.request.user.employee)
+    queryset = Client.objects.for_listing()
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        client = self.get_object()
-        context['rentals'] = Rental.objects.filter(client=client).order_by('-start_date')
+        context['rentals'] = list(
+            Rental.objects.select_related('car__model').filter(client=self.object).order_by('-start_date')
+        )
         return context
 
-class EmployeeRentalUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
+class EmployeeRentalUpdateView(LoginRequiredMixin, StaffEmployeeRequiredMixin, UpdateView):
     model = Rental
     template_name = 'main/employee_rental_form.html'
     fields = ['status', 'actual_return_date', 'penalties']
     success_url = reverse_lazy('main:employee_rentals')
     
-    def test_func(self):
-        return self.request.user.is_staff or (hasattr(self.request.user, 'employee') and self.request.user.employee)
-    
     def form_valid(self, form):
         rental = form.save(commit=False)
         if rental.status == 'completed' and not rental.actual_return_date:
             rental.actual_return_date = timezone.now()
-        
-        # Recalculate final amount with penalties
-        rental.final_amount = rental.base_amount
-        if rental.penalties.exists():
-            penalty_sum = sum(penalty.amount for penalty in rental.penalties.all())
-            rental.final_amount += penalty_sum
-        
-        rental.save()
-        form.save_m2m()  # Save many-to-many relationships
+        reactivated = rental.status == 'active' and 'status' in form.changed_data
+
+        try:
+            with transaction.atomic():
+                rental.save()
+                form.save_m2m()  # Penalties changes recompute the invoice (promo discount included)
+                if rental.status != 'active':
+                    release_slots(rental, rental.actual_return_date or timezone.now())
+                elif reactivated:
+                    # Снова активная аренда должна занимать свои дни в журнале слотов
+                    reserve_slots(rental)
+        except BookingConflict:
+            form.add_error('status', 'Автомобиль уже забронирован на эти даты другой арендой.')
+            return self.form_invalid(form)
         messages.success(self.request, 'Rental updated successfully!')
         return super().form_valid(form)
 
 @login_required
-@user_passes_test(lambda u: u.is_staff or (hasattr(u, 'employee') and u.employee))
+@staff_employee_required
 def employee_rental_create(request):
     if request.method == 'POST':
         form = RentalForm(request.POST)
@@ -933,21 +925,58 @@ def employee_rental_create(request):
                 rental.base_amount = rental.car.daily_rate * rental.days
                 rental.final_amount = rental.base_amount
                 rental.status = 'active'
-                rental.save()
-                messages.success(request, 'Rental created successfully!')
-                return redirect('main:employee_rentals')
+                try:
+                    book_rental(rental)
+                except BookingConflict:
+                    form.add_error(None, 'Автомобиль уже забронирован на выбранные даты.')
+                else:
+                    messages.success(request, 'Rental created successfully!')
+                    return redirect('main:employee_rentals')
         except Client.DoesNotExist:
             messages.error(request, 'Client not found!')
     else:
         form = RentalForm()
     
-    return render(request, 'main/employee_rental_create.html', {
+    # Клиент выбирается через поиск (employee_client_lookup), а не из списка всех клиентов
+    selected_id = request.POST.get('client') or request.GET.get('client')
+    selected_client = None
+    if selected_id and selected_id.isdigit():
+        selected_client = Client.objects.for_listing().filter(pk=selected_id).first()
+    return render(request, 'main/employee_rental_form.html', {
         'form': form,
-        'clients': Client.objects.all()
+        'selected_client': selected_client,
     })
 
+class ExportView(LoginRequiredMixin, StaffEmployeeRequiredMixin, View):
+    """Streams rentals, clients or cars as CSV or JSON Lines (``?format=&date_from=&date_to=``)."""
+
+    def get(self, request, kind):
+        if kind not in exports.EXPORTS:
+            raise Http404('Unknown export')
+        form = ExportForm(request.GET)
+        if not form.is_valid():
+            return HttpResponseBadRequest(form.errors.as_text())
+        fmt = form.cleaned_data['format']
+        response = StreamingHttpResponse(
+            exports.stream(kind, fmt, form.cleaned_data['date_from'], form.cleaned_data['date_to']),
+            content_type=f'{exports.FORMATS[fmt][0]}; charset=utf-8',
+        )
+        response['Content-Disposition'] = f'attachment; filename="{exports.filename(kind, fmt)}"'
+        return response
+
+@login_required
+@staff_employee_required
+def employee_client_lookup(request):
+    after = request.GET.get('after', '')
+    limit = request.GET.get('limit', '')
+    return JsonResponse(lookup.lookup(
+        request.GET.get('q', ''),
+        after=int(after) if after.isdigit() else None,
+        limit=int(limit) if limit.isdigit() else lookup.DEFAULT_LIMIT,
+    ))
+
 @login_required
-@user_passes_test(lambda u: u.is_staff or (hasattr(u, 'employee') and u.employee))
+@staff_employee_required
 def employee_client_create(request):
     if request.method == 'POST':
         form = ClientForm(request.POST)
@@ -988,7 +1017,27 @@ def debug_user_info(request):
         'is_staff': request.user.is_staff,
         'is_superuser': request.user.is_superuser,
         'is_authenticated': request.user.is_authenticated,
-        'has_employee': hasattr(request.user, 'employee'),
+        'has_employee': request.principal.is_employee,
         'groups': [group.name for group in request.user.groups.all()],
     }
     return render(request, 'main/debug_user_info.html', context)
+
+
+def media_file(request, path):
+    # Файлы хранилища по хешу содержимого (и их производные) никогда не меняются
+    if path.startswith(DERIVATIVE_PREFIX):
+        path_in_storage = path[len(DERIVATIVE_PREFIX):]
+    else:
+        path_in_storage = path
+    content = storage.is_content_name(path_in_storage)
+    return fileserving.serve_file(
+        request, path, settings.MEDIA_ROOT,
+        cache_control=settings.MEDIA_CONTENT_CACHE_CONTROL if content else settings.FILE_SERVING_CACHE_CONTROL,
+        accel_location=settings.FILE_SERVING_ACCEL_LOCATIONS['media'],
+    )
+
+def static_file(request, path):
+    return fileserving.serve_file(
+        request, path, settings.STATIC_ROOT, cache_control=settings.FILE_SERVING_CACHE_CONTROL,
+        accel_location=settings.FILE_SERVING_ACCEL_LOCATIONS['static'],
+    )